@@ -0,0 +1,310 @@
+"""ASGI 入口（可选部署方式）：uvicorn asgi:application --port 9000
+
+/ask、/save_quiz_score、/get_quiz_scores 在事件循环中以协程方式处理：大模型流式
+回答使用 httpx 异步客户端，成绩读写使用 aiomysql，等待上游或数据库时不占用线程，
+一个进程可以同时保持数百个问答流。其余页面和接口仍交给 Flask 应用，在线程池中
+运行，行为与 `python app.py` 一致；会话沿用 Flask 的会话接口，两边互通。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, create_tables, preload_data, llm_proxy, score_writer, db
+from services.async_db import create_async_database
+from services.llm_proxy import AsyncLLMProxy, Overloaded
+from services.metrics import REQUEST_SECONDS, REQUESTS
+from services.quiz_engine import QuizError, quiz_result
+from services import quiz_state
+from services.quiz_scores import InvalidCursor, fetch_scores_page_async, record_score_async
+from services.score_writer import WriterBusy
+
+logger = logging.getLogger(__name__)
+
+async_db = create_async_database(db)
+app.extensions['async_db'] = async_db
+
+async_llm_proxy = AsyncLLMProxy(
+    llm_proxy,
+    max_concurrent=int(os.environ.get('LLM_ASYNC_MAX_CONCURRENT', 256)),
+    max_queue=int(os.environ.get('LLM_ASYNC_MAX_QUEUE', 512))
+)
+app.extensions['async_llm_proxy'] = async_llm_proxy
+
+# 其余路由在线程池中运行的Flask应用
+wsgi_application = WSGIMiddleware(app, workers=int(os.environ.get('ASGI_WSGI_WORKERS', 16)))
+
+
+class AsyncRequest:
+    """协程路由使用的请求对象"""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('utf-8', 'replace')))
+        self._receive = receive
+
+    async def body(self):
+        chunks = []
+        while True:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    async def json(self):
+        try:
+            data = json.loads(await self.body() or b'null')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    async def wait_disconnect(self):
+        while (await self._receive())['type'] != 'http.disconnect':
+            pass
+
+    def int_arg(self, name, default):
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return default
+
+    async def session(self):
+        """通过Flask的会话接口读取会话；服务端会话存储可能要访问网络，放到线程中执行"""
+        environ = {
+            'REQUEST_METHOD': self.method,
+            'PATH_INFO': self.path,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'wsgi.url_scheme': self.scope.get('scheme', 'http'),
+            'HTTP_COOKIE': self.headers.get('cookie', '')
+        }
+        return await asyncio.to_thread(app.session_interface.open_session, app, app.request_class(environ))
+
+
+def session_headers(session):
+    """通过Flask的会话接口生成保存会话所需的响应头"""
+    response = app.response_class()
+    app.session_interface.save_session(app, session, response)
+    return [(k, v) for k, v in response.headers.items() if k.lower() in ('set-cookie', 'vary')]
+
+
+async def send_json(send, data, status=200, headers=(), session=None):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(body))), *headers]
+    if session is not None:
+        headers.extend(await asyncio.to_thread(session_headers, session))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def require_login(request, send):
+    """协程路由的登录检查（对应 services.sessions.require_login）：返回登录用户名，
+    未登录时发送 401 并返回 None"""
+    user_name = (await request.session()).get('name')
+    if user_name is None:
+        await send_json(send, {"success": False, "error": "未登录"}, 401)
+    return user_name
+
+
+# ---------- 协程路由 ----------
+
+async def ask(request, send):
+    question = (await request.json()).get('question', '')
+    if not question:
+        return await send_json(send, {"error": "问题不能为空"})
+
+    try:
+        stream = await async_llm_proxy.stream(question)
+    except Overloaded as e:
+        return await send_json(send, {"error": str(e)}, 429, [('Retry-After', '5')])
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            # 禁止反向代理缓冲，保证逐字输出
+            (b'x-accel-buffering', b'no')
+        ]
+    })
+
+    async def pump():
+        async for event in stream:
+            await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    # 浏览器断开后立即停止读取上游，释放并发名额
+    streaming = asyncio.ensure_future(pump())
+    disconnected = asyncio.ensure_future(request.wait_disconnect())
+    try:
+        await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (streaming, disconnected):
+            task.cancel()
+        await asyncio.gather(streaming, disconnected, return_exceptions=True)
+        await stream.aclose()
+
+
+async def save_quiz_score(request, send):
+    user_name = await require_login(request, send)
+    if user_name is None:
+        return
+
+    try:
+        date = time.strftime('%Y-%m-%d')
+
+        async with async_db.cursor(commit=True) as cur:
+            # 成绩由服务端答题引擎判定，不再采用客户端提交的分数
+            state, step = await quiz_state.load_async(cur, user_name)
+            if state.get('saved'):
+                return await send_json(send, {"success": False, "error": "没有可保存的答题结果"}, 400)
+            result = quiz_result(state)
+            score = result['score']
+            total = result['total']
+
+            # 按 step 条件标记为已保存，同一次答题的并发或重放请求只有一个能继续
+            state['saved'] = True
+            await quiz_state.update_async(cur, user_name, state, step)
+
+            if not app.config['SCORE_WRITE_BEHIND']:
+                await record_score_async(cur, user_name, score, total, date)
+
+        if app.config['SCORE_WRITE_BEHIND']:
+            # 与 app.save_quiz_score 相同：标记提交后才排队，提交失败时撤销标记；
+            # 写日志和排队可能短暂阻塞，放到线程中执行
+            try:
+                await asyncio.to_thread(score_writer.submit, user_name, score, total, date)
+            except Exception:
+                async with async_db.cursor(commit=True) as cur:
+                    await quiz_state.unmark_saved_async(cur, user_name, state, step)
+                raise
+
+        return await send_json(send, {"success": True, "score": score, "total": total})
+    except QuizError as e:
+        return await send_json(send, {"success": False, "error": str(e)}, 400)
+    except WriterBusy as e:
+        logger.warning(f"答题得分写入队列繁忙: {str(e)}")
+        return await send_json(send, {"success": False, "error": str(e)}, 503, [('Retry-After', '1')])
+    except Exception as e:
+        logger.error(f"保存答题得分时出错: {str(e)}")
+        return await send_json(send, {"success": False, "error": str(e)}, 500)
+
+
+async def get_quiz_scores(request, send):
+    user_name = await require_login(request, send)
+    if user_name is None:
+        return
+
+    try:
+        scores, next_cursor = await fetch_scores_page_async(
+            async_db, user_name,
+            limit=request.int_arg('limit', 20),
+            cursor=request.args.get('cursor'),
+            pending=score_writer.pending_for(user_name)
+        )
+        return await send_json(send, {"success": True, "scores": scores, "next_cursor": next_cursor})
+    except InvalidCursor as e:
+        return await send_json(send, {"success": False, "error": str(e)}, 400)
+    except Exception as e:
+        logger.error(f"获取答题得分记录时出错: {str(e)}")
+        return await send_json(send, {"success": False, "error": str(e)}, 500)
+
+
+async def instrumented(handler, request, send):
+    """协程路由不经过Flask的请求钩子，在这里按同样的口径记录耗时（到开始发送响应为止）与状态码"""
+    started = time.perf_counter()
+    status = None
+
+    async def capture(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            REQUEST_SECONDS.observe(time.perf_counter() - started, handler.__name__, request.method)
+            REQUESTS.inc(handler.__name__, request.method, str(status))
+        await send(message)
+
+    try:
+        return await handler(request, capture)
+    finally:
+        if status is None:
+            REQUESTS.inc(handler.__name__, request.method, '500')
+
+
+ASYNC_ROUTES = {
+    ('POST', '/ask'): ask,
+    ('POST', '/save_quiz_score'): save_quiz_score,
+    ('GET', '/get_quiz_scores'): get_quiz_scores,
+}
+
+
+class Application:
+    def __init__(self):
+        self._started = False
+        self._start_lock = None
+
+    async def startup(self):
+        """建表、预加载数据并启动异步客户端；lifespan 不可用时在第一个请求前执行"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started:
+                return
+            await asyncio.to_thread(create_tables)
+            await asyncio.to_thread(preload_data)
+            await asyncio.to_thread(score_writer.ensure_started)
+            await async_db.start()
+            await async_llm_proxy.start()
+            self._started = True
+
+    async def shutdown(self):
+        await async_llm_proxy.close()
+        await async_db.close()
+        # 把队列中的成绩全部写入数据库
+        await asyncio.to_thread(score_writer.close)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"ASGI应用启动失败: {str(e)}", exc_info=True)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http':
+            handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+            if handler is not None:
+                if not self._started:
+                    await self.startup()
+                return await instrumented(handler, AsyncRequest(scope, receive), send)
+
+        await wsgi_application(scope, receive, send)
+
+
+application = Application()
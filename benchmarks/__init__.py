@@ -0,0 +1 @@
+"""基准测试与压测，可完全离线运行：python -m benchmarks --help"""
@@ -0,0 +1,92 @@
+"""python -m benchmarks [micro] [render] [load] [选项]
+
+不指定套件时全部运行。结果以毫秒分位数与吞吐量输出；给出 --baseline 时与基线
+对比，有指标退化超过 --tolerance 时以退出码 1 结束；--save-baseline 把本次结果
+写为新的基线。
+"""
+import argparse
+import sys
+
+from benchmarks import environment, harness
+from benchmarks.fake_llm import FakeLLMServer
+
+SUITES = ('micro', 'render', 'load')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='离线基准测试与压测')
+    parser.add_argument('suites', nargs='*', help=f"要运行的套件（{'、'.join(SUITES)}），默认全部")
+    parser.add_argument('--repeat', type=int, default=50, help='微基准与渲染基准每项的重复次数')
+    parser.add_argument('--users', type=int, default=8, help='压测的并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=20, help='压测持续秒数')
+    parser.add_argument('--ask-every', type=int, default=3, help='每多少轮答题提一次问题，0 表示不提问')
+    parser.add_argument('--url', help='压测外部已启动的服务，不在本进程内启动 app')
+    parser.add_argument('--bcrypt-rounds', type=int, default=4, help='测试环境的密码哈希强度')
+    parser.add_argument('--llm-first-token', type=float, default=0.2, help='大模型替身的首段延迟（秒）')
+    parser.add_argument('--llm-chunk-delay', type=float, default=0.02, help='大模型替身的段间延迟（秒）')
+    parser.add_argument('--llm-chunks', type=int, default=20, help='大模型替身每个回答的段数')
+    parser.add_argument('--baseline', default='benchmarks/baseline.json', help='基线文件路径')
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='判定退化的相对变化，默认 20%%')
+    parser.add_argument('--output', help='把本次结果另存为JSON')
+    args = parser.parse_args(argv)
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"未知的套件: {', '.join(sorted(unknown))}")
+    args.suites = [suite for suite in SUITES if suite in args.suites] or list(SUITES)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    llm = FakeLLMServer(chunks=args.llm_chunks, first_token_delay=args.llm_first_token,
+                        chunk_delay=args.llm_chunk_delay).start()
+    environment.prepare(llm.url, bcrypt_rounds=args.bcrypt_rounds)
+    results = {}
+    try:
+        if 'micro' in args.suites:
+            from benchmarks import micro
+            results['micro'] = micro.run(args.repeat)
+            harness.print_report('micro', results['micro'])
+
+        if 'render' in args.suites or ('load' in args.suites and not args.url):
+            # 环境变量已就绪，此时才导入 app
+            import app as application
+            application.create_tables()
+            application.preload_data()
+
+        if 'render' in args.suites:
+            from benchmarks import render
+            results['render'] = render.run(application.app, repeat=args.repeat)
+            harness.print_report('render', results['render'])
+
+        if 'load' in args.suites:
+            from benchmarks import load
+            server = None if args.url else load.LocalServer(application.app).start()
+            try:
+                results['load'] = load.run(args.url or server.url, users=args.users,
+                                           duration=args.duration, ask_every=args.ask_every)
+            finally:
+                if server:
+                    server.stop()
+            harness.print_report(f'load（{args.users} 用户，{args.duration:g} 秒）', results['load'])
+    finally:
+        llm.stop()
+
+    if args.output:
+        harness.save_baseline(args.output, results)
+
+    regressed = False
+    baseline = harness.load_baseline(args.baseline)
+    if baseline is not None:
+        rows = harness.compare(results, baseline, args.tolerance)
+        harness.print_comparison(rows)
+        regressed = any(row[-1] for row in rows)
+    if args.save_baseline:
+        harness.save_baseline(args.baseline, results)
+        print(f'\n基线已保存到 {args.baseline}')
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""离线运行环境
+
+app 在导入时按环境变量创建数据库、日志、大模型代理等组件，所以必须在导入 app 之前
+调用 prepare()：数据库默认改用临时目录中的 SQLite，大模型接口指向本地替身，
+日志与缓存都写到临时目录，并放宽登录限流。已显式设置的环境变量保持不变，
+可借此对真实的 MySQL 等服务压测。
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def prepare(llm_url, bcrypt_rounds=4):
+    """返回临时工作目录；目录在进程退出时删除
+
+    atexit 按注册的相反顺序执行，这里先于 app 注册，删除发生在 app 写完成绩、
+    关闭日志之后。
+    """
+    workdir = tempfile.mkdtemp(prefix='tea-bench-')
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    defaults = {
+        'DB_BACKEND': 'sqlite',
+        'SQLITE_PATH': os.path.join(workdir, 'bench.sqlite3'),
+        'SCORE_JOURNAL_DIR': os.path.join(workdir, 'journal'),
+        'IMAGE_DERIVATIVES_DIR': os.path.join(workdir, 'image_build'),
+        'IMAGE_CACHE_DIR': os.path.join(workdir, 'image_cache'),
+        # 不使用本地可能存在的数据快照，保证每次从同样的源文件加载
+        'DATA_SNAPSHOT_PATH': os.path.join(workdir, 'data.snapshot'),
+        'LOG_FILE': os.path.join(workdir, 'app.log'),
+        'SECRET_KEY_FILE': os.path.join(workdir, 'secret_key'),
+        # SESSION_BACKEND=sqlite 时测服务端会话存储
+        'SESSION_URL': os.path.join(workdir, 'sessions.sqlite3'),
+        'LOG_CONSOLE_LEVEL': 'WARNING',
+        'LLM_API_URL': llm_url,
+        'LLM_API_KEY': 'benchmark',
+        'BCRYPT_ROUNDS': str(bcrypt_rounds),
+        # render 测试的用户需要访问 /api/stats 与 /metrics
+        'ADMIN_USERS': 'benchmark',
+        'METRICS_TOKEN': 'benchmark',
+    }
+    for name in ('LOGIN_IP', 'LOGIN_EMAIL', 'REGISTER_IP'):
+        defaults[f'{name}_BURST'] = '1000000'
+        defaults[f'{name}_PER_MINUTE'] = '1000000'
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    return workdir
+
@@ -0,0 +1,75 @@
+"""本地的流式大模型服务替身
+
+按上游接口的格式（data: {"choices": [{"delta": {"content": ...}}]}）逐段返回，
+首段延迟与段间延迟可调，用于在不访问外网的情况下压测 /ask 的转发路径。
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer:
+    def __init__(self, chunks=20, first_token_delay=0.2, chunk_delay=0.02, host='127.0.0.1', port=0):
+        self.chunks = chunks
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1/chat/completions'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                # 代理收到结束标记后可能直接关闭连接，不必报错
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _chunk(self, data):
+                self.wfile.write(b'%X\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with server._lock:
+                    server.requests += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                time.sleep(server.first_token_delay)
+                for i in range(server.chunks):
+                    if i:
+                        time.sleep(server.chunk_delay)
+                    finish = 'stop' if i == server.chunks - 1 else None
+                    event = {'choices': [{'delta': {'content': f'茶{i}'}, 'finish_reason': finish}]}
+                    self._chunk(f'data: {json.dumps(event, ensure_ascii=False)}\n\n'.encode('utf-8'))
+                self._chunk(b'data: [DONE]\n\n')
+                self.wfile.write(b'0\r\n\r\n')
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
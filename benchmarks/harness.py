@@ -0,0 +1,136 @@
+"""计时、统计与基线对比"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# 对比基线时比较的指标，均为越小越好
+COMPARED = ('p50', 'p95')
+
+
+def summarize(samples, elapsed=None):
+    """单次耗时（秒）列表 -> 毫秒分位数与吞吐量；elapsed 为并发压测的总墙钟时间"""
+    values = np.asarray(samples, dtype=np.float64)
+    if not len(values):
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, (50, 95, 99)) * 1000
+    total = elapsed if elapsed is not None else float(values.sum())
+    return {
+        'count': int(len(values)),
+        'mean': round(float(values.mean()) * 1000, 4),
+        'p50': round(float(p50), 4),
+        'p95': round(float(p95), 4),
+        'p99': round(float(p99), 4),
+        'ops': round(len(values) / total, 1) if total > 0 else None
+    }
+
+
+def measure(fn, repeat=50, warmup=3, min_time=0.0):
+    """顺序调用 fn，至少 repeat 次且至少持续 min_time 秒，返回统计结果"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples)
+
+
+class Recorder:
+    """并发压测时各线程记录的单次耗时，按操作名分组"""
+
+    def __init__(self):
+        self._samples = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def error(self, name):
+        with self._lock:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    def timed(self, name, fn, *args, **kwargs):
+        """执行 fn 并记录耗时；fn 返回 False 或抛出异常时记为错误"""
+        t0 = time.perf_counter()
+        try:
+            ok = fn(*args, **kwargs)
+        except Exception:
+            ok = False
+        if ok is False:
+            self.error(name)
+        else:
+            self.record(name, time.perf_counter() - t0)
+        return ok
+
+    def results(self, elapsed):
+        with self._lock:
+            names = sorted(set(self._samples) | set(self._errors))
+            return {
+                name: {**summarize(self._samples.get(name, []), elapsed), 'errors': self._errors.get(name, 0)}
+                for name in names
+            }
+
+
+def print_report(title, results):
+    print(f'\n== {title} ==')
+    print(f"{'name':<48}{'count':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'ops/s':>11}")
+    for name, stats in results.items():
+        if not stats.get('count'):
+            print(f"{name:<48}{0:>8}{'-':>11}{'-':>11}{'-':>11}{'-':>11}  errors={stats.get('errors', 0)}")
+            continue
+        extra = f"  errors={stats['errors']}" if stats.get('errors') else ''
+        print(f"{name:<48}{stats['count']:>8}{stats['p50']:>11.3f}{stats['p95']:>11.3f}{stats['p99']:>11.3f}"
+              f"{stats['ops'] or 0:>11.1f}{extra}")
+
+
+def load_baseline(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, tolerance=0.2, floor_ms=0.05):
+    """与基线对比，返回 [(组, 名称, 指标, 基线, 当前, 变化比例, 是否退化)]
+
+    低于 floor_ms 的耗时抖动很大，只在超过该值时才判定退化。
+    """
+    rows = []
+    for group, entries in results.items():
+        for name, stats in entries.items():
+            old = (baseline.get(group) or {}).get(name)
+            if not old or not stats.get('count') or not old.get('count'):
+                continue
+            for metric in COMPARED:
+                before, after = old.get(metric), stats.get(metric)
+                if not before or after is None:
+                    continue
+                change = after / before - 1
+                regressed = change > tolerance and after - before > floor_ms
+                rows.append((group, name, metric, before, after, change, regressed))
+    return rows
+
+
+def print_comparison(rows):
+    print('\n== 与基线对比 ==')
+    if not rows:
+        print('（基线中没有可对比的条目）')
+        return
+    for group, name, metric, before, after, change, regressed in rows:
+        flag = '  <-- 退化' if regressed else ''
+        print(f'{group + "/" + name:<60}{metric:>5}{before:>11.3f}{after:>11.3f}{change:>+9.1%}{flag}')
@@ -0,0 +1,135 @@
+"""端到端压测：真实的 HTTP 服务、注册登录、答题保存与查询、问答流
+
+默认在本进程内以多线程 WSGI 服务启动 app；指定 url 时改为压测外部已启动的服务
+（例如 uvicorn asgi:application），此时该服务需自行指向大模型替身与测试数据库。
+每个虚拟用户各自注册并登录，然后循环：开始答题 -> 逐题作答 -> 保存成绩 ->
+查询成绩，每 ask_every 轮提一次问题（问题各不相同，不命中答案缓存）。
+"""
+import json
+import threading
+import time
+import uuid
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.harness import Recorder
+
+QUIZ_QUESTIONS = 5
+
+
+class LocalServer:
+    """在后台线程中运行的多线程 WSGI 服务"""
+
+    def __init__(self, app, host='127.0.0.1', port=0):
+        self._server = make_server(host, port, app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bench-server', daemon=True)
+
+    @property
+    def url(self):
+        return f'http://{self._server.host}:{self._server.port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+
+def ok(response):
+    return response.status_code < 400
+
+
+class VirtualUser:
+    def __init__(self, base_url, recorder, index, run_id):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.session = requests.Session()
+        self.name = f'bench-{run_id}-{index}'
+        self.email = f'{self.name}@example.com'
+        self.password = f'pw-{run_id}-{index}'
+        self.questions = 0
+
+    def post(self, path, **kwargs):
+        return self.session.post(self.base_url + path, timeout=60, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.session.get(self.base_url + path, timeout=60, **kwargs)
+
+    def sign_up(self):
+        record = self.recorder.timed
+        record('register', lambda: ok(self.post('/register', data={
+            'name': self.name, 'email': self.email, 'password': self.password})))
+        # 登录成功时重定向到首页，不跟随重定向，只计登录本身
+        return record('login', lambda: self.post('/login', data={
+            'email': self.email, 'password': self.password}, allow_redirects=False).status_code == 302)
+
+    def quiz_round(self):
+        record = self.recorder.timed
+        started = None
+
+        def start():
+            nonlocal started
+            started = self.post('/api/quiz/start', json={'count': QUIZ_QUESTIONS})
+            return ok(started)
+
+        if not record('quiz_start', start):
+            return
+        for index in range(started.json().get('total', 0)):
+            record('quiz_answer', lambda: ok(self.post('/api/quiz/answer', json={'index': index, 'answer': 0})))
+        record('save_quiz_score', lambda: ok(self.post('/save_quiz_score')))
+        record('get_quiz_scores', lambda: ok(self.get('/get_quiz_scores')))
+
+    def ask(self):
+        """问答流：分别记录首段内容到达时间与完整耗时"""
+        self.questions += 1
+        question = f'{self.name} 第{self.questions}个问题：茶马古道始于何时？ {uuid.uuid4().hex[:8]}'
+        t0 = time.perf_counter()
+        try:
+            with self.post('/ask', json={'question': question}, stream=True) as response:
+                if not ok(response):
+                    self.recorder.error('ask_total')
+                    return
+                first = None
+                failed = False
+                for line in response.iter_lines():
+                    if not line.startswith(b'data:'):
+                        continue
+                    event = json.loads(line[5:])
+                    if 'error' in event:
+                        failed = True
+                    elif 'content' in event and first is None:
+                        first = time.perf_counter() - t0
+                        self.recorder.record('ask_first_token', first)
+                if failed or first is None:
+                    self.recorder.error('ask_total')
+                else:
+                    self.recorder.record('ask_total', time.perf_counter() - t0)
+        except requests.RequestException:
+            self.recorder.error('ask_total')
+
+
+def run(base_url, users=8, duration=20.0, ask_every=3):
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        user = VirtualUser(base_url, recorder, index, run_id)
+        if not user.sign_up():
+            return
+        rounds = 0
+        while time.perf_counter() < deadline:
+            user.quiz_round()
+            rounds += 1
+            if ask_every and rounds % ask_every == 0:
+                user.ask()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), name=f'bench-user-{i}') for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.results(time.perf_counter() - started)
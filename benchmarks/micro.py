@@ -0,0 +1,132 @@
+"""数据加载、派生结构构建与查询的微基准"""
+import logging
+import os
+import tempfile
+
+from benchmarks.environment import DATA_DIR
+from benchmarks.harness import measure
+from routes.series_routes import SERIES
+from services.cultures import CultureIndex
+from services.data_snapshot import DataSnapshot, build_snapshot
+from services.datasets import create_data_store
+from services.geometry import MAX_ZOOM, RouteGeometry
+from services.log_pipeline import LogPipeline
+from services.payloads import dumps_compact
+from services.quiz_engine import QuestionBank
+from services.search import SOURCES, build_segment, search
+from services.tea_areas import TeaAreaIndex
+from services.trade_graph import TradeGraph
+
+# (数据集, 名称, 构建函数)，与各蓝图中 derive 使用的构建函数一致
+TRANSFORMS = [
+    ('historical_tea_areas', 'tea_areas_index', TeaAreaIndex),
+    ('traditional_cultures', 'culture_index', CultureIndex),
+    ('routes', 'trade_graph', TradeGraph),
+    ('spread', 'route_geometry', RouteGeometry),
+    ('tea_quiz', 'question_bank', QuestionBank),
+] + [(name, f'search_segment_{name}', build_segment(name)) for name in SOURCES] + [
+    (dataset, f'series_pyramid_{name}', build) for name, (dataset, build, _) in SERIES.items()
+]
+
+
+def bench_loading(store, repeat):
+    results = {}
+    for name in store.names():
+        dataset = store.dataset(name)
+        results[f'load/{name}'] = measure(lambda: dataset.loader(dataset.path), repeat)
+
+    # 同样的数据从二进制快照加载
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'data.snapshot')
+        build_snapshot(store, path)
+        snapshot = DataSnapshot(path)
+        for name in store.names():
+            version = store.dataset(name).source_version()
+            results[f'load_snapshot/{name}'] = measure(lambda: snapshot.load(name, version), repeat)
+    return results
+
+
+def bench_transforms(store, repeat):
+    results = {}
+    for dataset, name, build in TRANSFORMS:
+        value = store.get(dataset)
+        results[f'build/{name}'] = measure(lambda: build(value), repeat)
+    for name in store.names():
+        value = store.get(name)
+        results[f'serialize/{name}'] = measure(lambda: dumps_compact(value), repeat)
+    return results
+
+
+def bench_queries(store, repeat):
+    results = {}
+    segments = [build_segment(name)(store.get(name)) for name in SOURCES]
+    for query in ('普洱', '茶马古道', '宋代点茶 建盏'):
+        results[f'query/search:{query}'] = measure(lambda: search(segments, query, 20), repeat)
+
+    graph = TradeGraph(store.get('routes'))
+    if len(graph.names) >= 2:
+        source, target = graph.names[0], graph.names[-1]
+        results['query/trade_max_flow'] = measure(lambda: graph.max_flow(source, target), repeat)
+        results['query/trade_shortest_path'] = measure(lambda: graph.shortest_path(source, target), repeat)
+
+    geometry = RouteGeometry(store.get('spread'))
+    for zoom in (0, MAX_ZOOM):
+        results[f'query/spread_routes_zoom{zoom}'] = measure(lambda: geometry.query(None, None, zoom), repeat)
+
+    cultures = CultureIndex(store.get('traditional_cultures'))
+    results['query/culture_facets'] = measure(lambda: cultures.facets({}), repeat)
+
+    for name, (dataset, build, _) in SERIES.items():
+        pyramid = build(store.get(dataset))
+        results[f'query/series_{name}_500pts'] = measure(lambda: pyramid.query(500, None, None, 'lttb'), repeat)
+
+    prices = store.get('prices')
+    rows = prices.select()
+    results['query/prices_dynasty_stats'] = measure(lambda: prices.dynasty_stats(rows), repeat)
+    results['query/prices_moving_average'] = measure(lambda: prices.moving_average(rows, 5), repeat)
+    return results
+
+
+def bench_logging(repeat):
+    """一次日志调用在请求线程中的开销：日志管道（入队）、被采样丢弃、低于级别、同步写文件"""
+    results = {}
+    repeat = max(repeat, 2000)
+    with tempfile.TemporaryDirectory() as directory:
+        queued = logging.getLogger('benchmarks.logging.queued')
+        queued.propagate = False
+        pipeline = LogPipeline(level='INFO', console_level='CRITICAL', path=os.path.join(directory, 'queued.log'),
+                               sample_burst=0, logger=queued)
+        counter = iter(range(10 ** 9))
+        results['logging/queued'] = measure(lambda: queued.info('请求 %d 已处理', next(counter)), repeat)
+        results['logging/below_level'] = measure(lambda: queued.debug('调试信息 %d', 1), repeat)
+        pipeline.close()
+
+        sampled = logging.getLogger('benchmarks.logging.sampled')
+        sampled.propagate = False
+        pipeline = LogPipeline(level='INFO', console_level='CRITICAL', path=os.path.join(directory, 'sampled.log'),
+                               sample_burst=10, logger=sampled)
+        results['logging/sampled_out'] = measure(lambda: sampled.info('返回页面数据到模板'), repeat)
+        pipeline.close()
+
+        # 改造前的做法：请求线程直接同步写文件
+        blocking = logging.getLogger('benchmarks.logging.blocking')
+        blocking.propagate = False
+        blocking.setLevel(logging.INFO)
+        handler = logging.FileHandler(os.path.join(directory, 'blocking.log'), encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        blocking.addHandler(handler)
+        results['logging/sync_file_handler'] = measure(lambda: blocking.info('请求 %d 已处理', 1), repeat)
+        blocking.removeHandler(handler)
+        handler.close()
+    return results
+
+
+def run(repeat=50):
+    store = create_data_store(DATA_DIR, check_interval=3600)
+    store.preload()
+    results = {}
+    results.update(bench_loading(store, repeat))
+    results.update(bench_transforms(store, repeat))
+    results.update(bench_queries(store, repeat))
+    results.update(bench_logging(repeat))
+    return results
@@ -0,0 +1,80 @@
+"""逐个路由的渲染基准（Flask 测试客户端，已登录会话）
+
+页面分别测缓存命中（warm）与清空页面缓存后重新渲染（cold）；JSON 接口测
+payload 缓存命中后的耗时。带路径参数的路由用数据中的第一个有效值填充。
+"""
+from flask import url_for
+
+from benchmarks.harness import measure
+from routes import culture_routes, tea_area_routes, trade_routes
+
+# 文件下载、登出与管理接口不属于渲染
+SKIPPED = {'static', 'images.resized_image', 'media.media_file', 'logout.logout', 'metrics.profile_result'}
+
+
+def sample_args(app):
+    """endpoint -> url_for 参数（路径参数与查询参数）"""
+    with app.app_context():
+        cultures = culture_routes.get_index()
+        tea_areas = tea_area_routes.get_index()
+        graph = trade_routes.get_graph()
+    culture_id = cultures.ids[0] if cultures.ids else ''
+    dynasties = tea_areas.dynasty_names
+    region = next(iter(tea_areas.by_region), '')
+    markets = {'from': graph.names[0], 'to': graph.names[-1]} if graph.names else {}
+    return {
+        'culture_detail': {'culture_id': culture_id},
+        'cultures.culture': {'culture_id': culture_id},
+        'api.get_dataset': {'dataset': 'historical_tea_areas'},
+        'series.downsampled_series': {'name': 'prices', 'points': 500},
+        'tea_areas.dynasty_layer': {'name': dynasties[0] if dynasties else ''},
+        'tea_areas.region_history': {'region': region},
+        'tea_areas.dynasty_diff': {'from': dynasties[0], 'to': dynasties[-1]} if dynasties else {},
+        'trade.shortest_path': markets,
+        'trade.max_flow': markets,
+        'search.search_api': {'q': '普洱'},
+        'search.search_page': {'q': '普洱'},
+        'spread.routes': {'zoom': 2},
+    }
+
+
+def get_routes(app):
+    """[(endpoint, url)]，按路径排序；缺少必需参数的路由不在其中"""
+    samples = sample_args(app)
+    routes = []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+            if 'GET' not in rule.methods or rule.endpoint in SKIPPED:
+                continue
+            args = samples.get(rule.endpoint, {})
+            if not rule.arguments <= set(args):
+                continue
+            routes.append((rule.endpoint, url_for(rule.endpoint, **args)))
+    return routes
+
+
+def run(app, user_name='benchmark', repeat=50):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['name'] = user_name
+    # /metrics 需要令牌，其余接口忽略这个请求头
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    # quiz.question 读取当前答题状态，先开始一轮答题；失败时该路由照常记为错误
+    client.post('/api/quiz/start', json={})
+    page_cache = app.extensions['page_cache']
+
+    results = {}
+    for endpoint, url in get_routes(app):
+        response = client.get(url)
+        if response.status_code >= 400:
+            results[f'{endpoint} {url}'] = {'count': 0, 'errors': 1, 'status': response.status_code}
+            continue
+        results[f'warm/{endpoint}'] = measure(lambda: client.get(url), repeat)
+        if response.mimetype == 'text/html':
+            def cold():
+                page_cache.invalidate()
+                client.get(url)
+            results[f'cold/{endpoint}'] = measure(cold, repeat)
+    return results
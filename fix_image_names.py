@@ -1,8 +1,15 @@
+import argparse
 import os
 import shutil
+import time
+
+from services.images import WIDTHS, build_derivatives
 
 # 图片目录路径
-img_dir = os.path.join(os.path.dirname(__file__), 'static', 'images', 'cultures')
+images_root = os.path.join(os.path.dirname(__file__), 'static', 'images')
+img_dir = os.path.join(images_root, 'cultures')
+# 派生版本输出目录，与应用的 IMAGE_DERIVATIVES_DIR 一致
+derivatives_dir = os.environ.get('IMAGE_DERIVATIVES_DIR', os.path.join(os.path.dirname(__file__), 'image_build'))
 
 # 检查图片是否存在
 def check_and_fix_images():
@@ -43,5 +50,26 @@ def check_and_fix_images():
     else:
         print("所有必需的图片文件都已存在")
 
+
+# 生成多宽度的 AVIF/WebP/原格式版本，源文件未变化的图片跳过
+def build_image_derivatives(widths):
+    try:
+        start = time.perf_counter()
+        built, reused = build_derivatives(images_root, derivatives_dir, widths)
+    except RuntimeError as e:
+        print(f"跳过图片派生版本生成: {e}")
+        return
+    print(f"图片派生版本已写入 {derivatives_dir}：新生成 {built} 张，沿用 {reused} 张，"
+          f"耗时 {time.perf_counter() - start:.1f}s")
+
+
 if __name__ == "__main__":
-    check_and_fix_images() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="检查图片文件并生成缩放后的派生版本")
+    parser.add_argument('--check-only', action='store_true', help="只检查图片，不生成派生版本")
+    parser.add_argument('--widths', type=lambda v: tuple(sorted(int(w) for w in v.split(','))), default=WIDTHS,
+                        help="逗号分隔的宽度档位")
+    args = parser.parse_args()
+
+    check_and_fix_images()
+    if not args.check_only:
+        build_image_derivatives(args.widths)
@@ -0,0 +1,90 @@
+from flask import Blueprint, Response, jsonify, request, current_app
+from services.sessions import login_required, require_admin
+
+# 创建Blueprint
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# 题库包含答案，只能通过答题接口逐题获取
+PRIVATE_DATASETS = {'tea_quiz'}
+
+# 带版本号的URL内容不会变化，可以长期缓存；不带版本号时每次都需要用ETag协商
+IMMUTABLE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'private, no-cache'
+
+
+class NotFound(LookupError):
+    """查询的对象在数据集的这个版本中不存在"""
+
+
+def send_payload(version, payload):
+    """按协商结果发送预序列化的响应体，支持 If-None-Match → 304"""
+    encoding = payload.choose(request.accept_encodings)
+    etag = payload.etag(encoding)
+
+    if any(request.if_none_match.contains(tag) for tag in payload.etags()):
+        response = Response(status=304)
+    else:
+        response = Response(payload.variants[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding, Cookie'
+    if request.args.get('v') == version:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def send_dataset_view(dataset, key, build):
+    """按数据集版本缓存 build(数据集的值) 生成的查询结果并发送
+
+    查询参数须在 build 中对照它拿到的这个版本校验：请求期间数据集可能已经重载，
+    build 抛出 NotFound 时返回404，结果不缓存。
+    """
+    try:
+        version, payload = current_app.extensions['payload_cache'].get(dataset, build, key=key)
+    except NotFound as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    return send_payload(version, payload)
+
+
+@bp.route('/data/<dataset>')
+@login_required(api=True)
+def get_dataset(dataset):
+    data_store = current_app.extensions['data_store']
+    if dataset not in data_store.names() or dataset in PRIVATE_DATASETS:
+        return jsonify({"success": False, "error": "数据集不存在"}), 404
+
+    version, payload = current_app.extensions['payload_cache'].get(dataset)
+    return send_payload(version, payload)
+
+
+@bp.route('/stats')
+def get_stats():
+    """缓存、连接池与写入队列的运行指标，只对 ADMIN_USERS 开放"""
+    denied = require_admin()
+    if denied:
+        return denied
+
+    extensions = current_app.extensions
+    stats = {
+        "success": True,
+        "page_cache": extensions['page_cache'].stats(),
+        "db_pool": extensions['db'].metrics(),
+        "score_writer": extensions['score_writer'].metrics(),
+        "llm_proxy": extensions['llm_proxy'].metrics(),
+        "image_pipeline": extensions['image_pipeline'].metrics(),
+        "password_hasher": extensions['password_hasher'].metrics(),
+        "rate_limits": {name: limiter.metrics() for name, limiter in extensions['rate_limits'].items()},
+        "logging": extensions['log_pipeline'].metrics()
+    }
+    # 以ASGI方式部署时（asgi.py）还有异步数据库与异步问答代理
+    if 'async_db' in extensions:
+        stats["async_db"] = extensions['async_db'].metrics()
+        stats["async_llm_proxy"] = extensions['async_llm_proxy'].metrics()
+    # 使用服务端会话存储时（SESSION_BACKEND 不为 cookie）
+    if 'session_store' in extensions:
+        stats["sessions"] = extensions['session_store'].metrics()
+    return jsonify(stats)
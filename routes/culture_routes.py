@@ -0,0 +1,79 @@
+from flask import Blueprint, request, current_app
+from routes.api_routes import NotFound, send_dataset_view
+from services.cultures import FILTERS, CultureIndex
+from services.sessions import require_login
+
+# 创建Blueprint
+bp = Blueprint('cultures', __name__, url_prefix='/api/cultures')
+
+DATASET = 'traditional_cultures'
+MAX_LIMIT = 100
+DEFAULT_LIMIT = 12
+
+
+def get_index(value=None):
+    return current_app.extensions['data_store'].derive(DATASET, 'index', CultureIndex, value)
+
+
+def send_view(key, view):
+    """按数据版本缓存由索引生成的查询结果，并以ETag协商发送；view 的参数是与该版本对应的索引"""
+    return send_dataset_view(DATASET, key, lambda value: view(get_index(value)))
+
+
+def parse_filters(index, args):
+    """从查询参数取出 category/region/era；取值不存在时返回 (None, 出错的参数名)"""
+    filters = {}
+    for dimension in FILTERS:
+        value = args.get(dimension) or None
+        if value is not None and not index.is_valid(dimension, value):
+            return None, dimension
+        filters[dimension] = value
+    return filters, None
+
+
+bp.before_request(require_login)
+
+
+@bp.route('')
+def list_cultures():
+    """筛选与分页：/api/cultures?category=craft&region=全国&era=秦汉时期&offset=0&limit=12"""
+    filters = {dimension: request.args.get(dimension) or None for dimension in FILTERS}
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+
+    def view(index):
+        _, invalid = parse_filters(index, filters)
+        if invalid:
+            raise NotFound(f"{invalid} 取值不存在")
+        total, ids = index.query(filters, offset, limit)
+        return {
+            "success": True,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "filters": filters,
+            "items": [index.summary(culture_id) for culture_id in ids],
+            "facets": index.facets(filters)
+        }
+
+    key = ('cultures', 'list', *(filters[d] for d in FILTERS), offset, limit)
+    return send_view(key, view)
+
+
+@bp.route('/timeline')
+def timeline():
+    """与 [from, to] 年份区间重叠的时间轴时期及其文化（公元前为负数）"""
+    year_from = request.args.get('from', type=int)
+    year_to = request.args.get('to', type=int)
+    return send_view(('cultures', 'timeline', year_from, year_to),
+                     lambda index: {"success": True, "periods": index.timeline(year_from, year_to)})
+
+
+@bp.route('/<culture_id>')
+def culture(culture_id):
+    def view(index):
+        if culture_id not in index.by_id:
+            raise NotFound("文化项目不存在")
+        return {"success": True, "culture": index.by_id[culture_id]}
+
+    return send_view(('cultures', 'detail', culture_id), view)
@@ -1,10 +1,11 @@
-from flask import Blueprint, render_template, session, redirect
+from flask import Blueprint, render_template, redirect
+from services.sessions import current_user
 
 bp = Blueprint('home', __name__)
 
 @bp.route('/')
 def home():
-    if 'name' in session:
-        name = session['name']
+    name = current_user()
+    if name:
         return render_template('home.html', name=name)
     return redirect('/login')
\ No newline at end of file
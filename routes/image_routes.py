@@ -0,0 +1,45 @@
+from flask import Blueprint, current_app, jsonify, redirect, request, send_file, url_for
+from services.images import ImageNotFound
+
+# 创建Blueprint
+bp = Blueprint('images', __name__, url_prefix='/img')
+
+MAX_WIDTH = 4096
+# 缓存文件在取得路径之后、发送之前可能被其他线程淘汰删除，此时重新生成
+SEND_ATTEMPTS = 3
+# 地址中没有内容哈希，允许缓存一天，过期后用ETag协商
+IMAGE_CACHE_CONTROL = 'public, max-age=86400'
+
+
+@bp.route('/<path:name>')
+def resized_image(name):
+    """static/images 下图片的缩放版本：w 为目标宽度，格式按 Accept 头选择，也可用 fmt 指定"""
+    pipeline = current_app.extensions['image_pipeline']
+    width = request.args.get('w', type=int)
+    if not pipeline.enabled or width is None:
+        return redirect(url_for('static', filename=f'images/{name}'))
+    if not 1 <= width <= MAX_WIDTH:
+        return jsonify({"success": False, "error": "宽度超出范围"}), 400
+
+    fmt = request.args.get('fmt')
+    if fmt is None:
+        fmt = pipeline.negotiate(name, request.accept_mimetypes)
+    elif fmt not in pipeline.formats + ('jpeg', 'png'):
+        return jsonify({"success": False, "error": f"不支持的图片格式: {fmt}"}), 400
+
+    for attempt in range(SEND_ATTEMPTS):
+        try:
+            path, mimetype, etag = pipeline.get(name, width, fmt)
+        except ImageNotFound:
+            return jsonify({"success": False, "error": "图片不存在"}), 404
+        try:
+            # send_file 打开文件之后再被删除不影响发送
+            response = send_file(path, mimetype=mimetype, conditional=True, etag=etag)
+            break
+        except FileNotFoundError:
+            if attempt == SEND_ATTEMPTS - 1:
+                raise
+    response.headers['Cache-Control'] = IMAGE_CACHE_CONTROL
+    if 'fmt' not in request.args:
+        response.headers['Vary'] = 'Accept'
+    return response
@@ -1,34 +1,69 @@
 from flask import Blueprint, render_template, request, redirect, session, current_app
-from flask_mysqldb import MySQL
-import bcrypt
+from services.auth import HasherBusy
 import logging
+import math
 
 # 创建Blueprint
 bp = Blueprint('login', __name__)
 
+logger = logging.getLogger(__name__)
+
+
+def rate_limited(template, wait):
+    """令牌用完时在查询数据库和计算哈希之前直接拒绝"""
+    response = current_app.make_response(
+        (render_template(template, error='尝试次数过多，请稍后再试。'), 429)
+    )
+    response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response
+
+
+def busy(template):
+    response = current_app.make_response(
+        (render_template(template, error='当前访问人数过多，请稍后再试。'), 503)
+    )
+    response.headers['Retry-After'] = '5'
+    return response
+
+
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form['email']
-        password = request.form['password'].encode('utf-8')
-
-        # 获取MySQL连接
-        mysql = current_app.extensions['mysql']
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-        user = cur.fetchone()
-        cur.close()
-
-        if user:
-            hashed_password = bytes(user[3], 'utf-8')  # 指定正确的编码
-            if bcrypt.checkpw(password, hashed_password):
-                # 用户名和密码匹配，执行登录操作
-                session['name'] = user[1]
-                return redirect('/')
+        password = request.form['password']
+
+        limits = current_app.extensions['rate_limits']
+        wait = limits['login_ip'].acquire(request.remote_addr) or \
+            limits['login_email'].acquire(email.strip().lower())
+        if wait:
+            return rate_limited('login.html', wait)
+
+        # 从连接池获取连接
+        db = current_app.extensions['db']
+        hasher = current_app.extensions['password_hasher']
+        with db.cursor() as cur:
+            cur.run('user_by_email', (email,))
+            user = cur.fetchone()
+
+        try:
+            if user:
+                ok, needs_rehash = hasher.verify(password, user[2])
             else:
-                error = '无效的电子邮件或密码。'
-        else:
-            error = '无效的电子邮件或密码。'
+                hasher.verify_missing(password)
+                ok, needs_rehash = False, False
+            if ok and needs_rehash:
+                # 已存哈希的强度与当前配置不同，借这次登录按新强度重新哈希
+                new_hash = hasher.hash(password)
+                with db.cursor(commit=True) as cur:
+                    cur.run('update_password', (new_hash, user[0]))
+                hasher.count_rehash()
+        except HasherBusy:
+            return busy('login.html')
 
+        if ok:
+            # 用户名和密码匹配，执行登录操作
+            session['name'] = user[1]
+            return redirect('/')
+        error = '无效的电子邮件或密码。'
         return render_template('login.html', error=error)
-    return render_template('login.html')
\ No newline at end of file
+    return render_template('login.html')
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from werkzeug.http import is_resource_modified
+
+from services.media import MediaNotFound
+
+# 创建Blueprint
+bp = Blueprint('media', __name__, url_prefix='/media')
+
+# 地址中没有内容哈希，允许缓存一天，过期后用ETag协商
+MEDIA_CACHE_CONTROL = 'public, max-age=86400'
+
+
+def _range_applies(etag, last_modified):
+    """If-Range 与当前文件不一致时忽略 Range，整份发送"""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date >= last_modified.replace(microsecond=0)
+    return True
+
+
+@bp.route('/<path:name>')
+def media_file(name):
+    """static/videos 下的媒体文件，支持单个 Range 请求（206）与条件请求（304）"""
+    library = current_app.extensions['media_library']
+    try:
+        info = library.info(name)
+    except MediaNotFound:
+        return jsonify({"success": False, "error": "文件不存在"}), 404
+
+    last_modified = datetime.fromtimestamp(info.mtime / 1e9, tz=timezone.utc)
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': MEDIA_CACHE_CONTROL
+    }
+
+    if not is_resource_modified(request.environ, etag=info.etag, last_modified=last_modified):
+        response = Response(status=304, headers=headers)
+        response.set_etag(info.etag)
+        return response
+
+    status = 200
+    start, end = 0, info.size
+    ranges = request.range
+    # 多个范围时整份发送（协议允许），不拼装 multipart 响应
+    if ranges is not None and len(ranges.ranges) == 1 and _range_applies(info.etag, last_modified):
+        span = ranges.range_for_length(info.size)
+        if span is None:
+            headers['Content-Range'] = f"bytes */{info.size}"
+            return Response(status=416, headers=headers)
+        start, end = span
+        status = 206
+        headers['Content-Range'] = f"bytes {start}-{end - 1}/{info.size}"
+
+    if request.method == 'HEAD':
+        body = ()
+    else:
+        body = library.body(info, start, end, request.environ.get('wsgi.file_wrapper'))
+    response = Response(body, status=status, mimetype=info.mimetype, headers=headers, direct_passthrough=True)
+    response.content_length = end - start
+    response.set_etag(info.etag)
+    response.last_modified = last_modified
+    return response
@@ -0,0 +1,114 @@
+import hmac
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, g, jsonify, request, template_rendered, before_render_template
+from services.metrics import REGISTRY, REQUEST_SECONDS, REQUESTS, RENDER_SECONDS, CallbackGauge
+from services.sessions import require_admin
+
+# 创建Blueprint
+bp = Blueprint('metrics', __name__)
+
+# render_template 可能嵌套调用，按线程记录各层的开始时间
+_render_starts = threading.local()
+
+
+def components():
+    """/api/stats 中各组件的 metrics()，抓取时按需调用"""
+    extensions = current_app.extensions
+    collect = {
+        'page_cache': extensions['page_cache'].stats,
+        'db_pool': extensions['db'].metrics,
+        'score_writer': extensions['score_writer'].metrics,
+        'llm_proxy': extensions['llm_proxy'].metrics,
+        'image_pipeline': extensions['image_pipeline'].metrics,
+        'password_hasher': extensions['password_hasher'].metrics,
+        'logging': extensions['log_pipeline'].metrics,
+    }
+    for name, limiter in extensions['rate_limits'].items():
+        collect[f'rate_limit_{name}'] = limiter.metrics
+    if 'async_db' in extensions:
+        collect['async_db'] = extensions['async_db'].metrics
+        collect['async_llm_proxy'] = extensions['async_llm_proxy'].metrics
+    if 'session_store' in extensions:
+        collect['sessions'] = extensions['session_store'].metrics
+    return collect
+
+
+REGISTRY.register(CallbackGauge('app_component', '各组件的运行指标（与 /api/stats 相同）', components))
+
+
+def _before_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack is None:
+        stack = _render_starts.stack = []
+    stack.append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack:
+        RENDER_SECONDS.observe(time.perf_counter() - stack.pop(), template.name or 'string')
+
+
+@bp.record_once
+def connect_signals(state):
+    before_render_template.connect(_before_render, state.app)
+    template_rendered.connect(_rendered, state.app)
+
+
+@bp.before_app_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method)
+        REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus 抓取入口，需带 Authorization: Bearer <METRICS_TOKEN>；未配置令牌时不开放"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return Response('metrics disabled: METRICS_TOKEN is not set\n', status=404, mimetype='text/plain')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/admin/profile', methods=['POST'])
+def start_profile():
+    """开始采样：POST /admin/profile?seconds=10"""
+    denied = require_admin()
+    if denied:
+        return denied
+    profiler = current_app.extensions['profiler']
+    seconds = request.args.get('seconds', 10, type=float)
+    if not profiler.start(seconds):
+        return jsonify({"success": False, "error": "已有一轮采样在进行", **profiler.status()}), 409
+    return jsonify({"success": True, **profiler.status()}), 202
+
+
+@bp.route('/admin/profile')
+def profile_result():
+    """采样进行中返回进度；完成后返回折叠栈文本，可直接生成火焰图"""
+    denied = require_admin()
+    if denied:
+        return denied
+    profiler = current_app.extensions['profiler']
+    if profiler.running:
+        return jsonify({"success": True, **profiler.status()}), 202
+    result = profiler.result()
+    if result is None:
+        return jsonify({"success": False, "error": "尚未进行过采样"}), 404
+    response = Response(result, mimetype='text/plain')
+    response.headers['Content-Disposition'] = 'attachment; filename=profile.folded'
+    return response
@@ -0,0 +1,63 @@
+from flask import Blueprint, request, current_app
+from routes.api_routes import send_payload
+from services.sessions import require_login
+
+# 创建Blueprint
+bp = Blueprint('prices', __name__, url_prefix='/api/prices')
+
+DATASET = 'prices'
+MAX_ROWS = 10000
+MAX_WINDOW = 1000
+
+
+def parse_filters():
+    """解析筛选参数：dynasty、tea_type 可重复或以逗号分隔，from/to 为年份范围"""
+    def names(param):
+        return tuple(sorted({name for value in request.args.getlist(param) for name in value.split(',') if name}))
+
+    return (
+        names('dynasty'),
+        names('tea_type'),
+        request.args.get('from', type=int),
+        request.args.get('to', type=int)
+    )
+
+
+def send_query(kind, params, build):
+    """按 (查询类型, 参数, 数据版本) 缓存查询结果，并以ETag协商发送"""
+    filters = parse_filters()
+
+    def transform(series):
+        return {"success": True, **build(series, series.select(*filters))}
+
+    version, payload = current_app.extensions['payload_cache'].get(
+        DATASET, transform, key=('prices', kind, filters, params)
+    )
+    return send_payload(version, payload)
+
+
+bp.before_request(require_login)
+
+
+@bp.route('')
+def query_prices():
+    """列式返回筛选后的价格记录，offset/limit 分页"""
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = max(1, min(request.args.get('limit', MAX_ROWS, type=int), MAX_ROWS))
+    return send_query('rows', (offset, limit), lambda series, rows: series.rows(rows, offset, limit))
+
+
+@bp.route('/dynasty_stats')
+def dynasty_stats():
+    return send_query('dynasty_stats', (), lambda series, rows: {"stats": series.dynasty_stats(rows)})
+
+
+@bp.route('/moving_average')
+def moving_average():
+    window = max(1, min(request.args.get('window', 5, type=int), MAX_WINDOW))
+    return send_query('moving_average', (window,), lambda series, rows: series.moving_average(rows, window))
+
+
+@bp.route('/inflation')
+def inflation():
+    return send_query('inflation', (), lambda series, rows: {"indices": series.inflation_indices(rows)})
@@ -0,0 +1,86 @@
+from flask import Blueprint, jsonify, request, current_app
+from services import quiz_state
+from services.quiz_engine import (
+    QuestionBank, QuizError, start_quiz, public_question, submit_answer, quiz_result, DEFAULT_QUESTION_COUNT,
+    POINTS_PER_QUESTION
+)
+from services.sessions import current_user, require_login
+
+# 创建Blueprint
+bp = Blueprint('quiz', __name__, url_prefix='/api/quiz')
+
+
+def get_bank():
+    return current_app.extensions['data_store'].derive('tea_quiz', 'question_bank', QuestionBank)
+
+
+def get_state():
+    with current_app.extensions['db'].cursor() as cur:
+        state, _ = quiz_state.load(cur, current_user())
+    return state
+
+
+def json_body():
+    """请求体须为JSON对象，没有请求体时视为空对象"""
+    data = request.get_json(silent=True)
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise QuizError("参数错误")
+    return data
+
+
+bp.before_request(require_login)
+
+
+@bp.errorhandler(QuizError)
+def handle_quiz_error(e):
+    return jsonify({"success": False, "error": str(e)}), 400
+
+
+@bp.route('/start', methods=['POST'])
+def start():
+    data = json_body()
+    bank = get_bank()
+    state = start_quiz(
+        bank,
+        count=data.get('count', DEFAULT_QUESTION_COUNT),
+        category=data.get('category'),
+        difficulty=data.get('difficulty')
+    )
+    with current_app.extensions['db'].cursor(commit=True) as cur:
+        quiz_state.begin(cur, current_user(), state)
+    return jsonify({
+        "success": True,
+        "total": len(state['q']),
+        "points_per_question": POINTS_PER_QUESTION,
+        "question": public_question(bank, state)
+    })
+
+
+@bp.route('/question')
+def question():
+    state = get_state()
+    return jsonify({"success": True, "question": public_question(get_bank(), state)})
+
+
+@bp.route('/answer', methods=['POST'])
+def answer():
+    data = json_body()
+    try:
+        index = int(data['index'])
+        choice = int(data['answer'])
+    except (KeyError, TypeError, ValueError):
+        raise QuizError("参数错误")
+    bank = get_bank()
+    with current_app.extensions['db'].cursor(commit=True) as cur:
+        state, step = quiz_state.load(cur, current_user())
+        result = submit_answer(bank, state, index, choice)
+        # 并发或重放的作答请求读到的是同一个 step，只有一个能写入
+        quiz_state.update(cur, current_user(), state, step)
+    return jsonify({"success": True, **result})
+
+
+@bp.route('/finish', methods=['POST'])
+def finish():
+    return jsonify({"success": True, **quiz_result(get_state())})
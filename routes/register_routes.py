@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, session, current_app, flash
-from flask_mysqldb import MySQL
-import bcrypt
+from routes.login_routes import busy, rate_limited
+from services.auth import HasherBusy
+from services.db import IntegrityError
 import logging
 
 # 创建Blueprint
@@ -11,26 +12,37 @@ def register():
     if request.method == 'POST':
         name = request.form['name']
         email = request.form['email']
-        password = request.form['password'].encode('utf-8')
-        hashed_password = bcrypt.hashpw(password, bcrypt.gensalt())
+        password = request.form['password']
 
-        # 获取MySQL连接
-        mysql = current_app.extensions['mysql']
-        cur = mysql.connection.cursor()
-        # 检查用户名和邮箱是否已经存在
-        cur.execute("SELECT * FROM users WHERE name = %s OR email = %s", (name, email))
-        user = cur.fetchone()
+        wait = current_app.extensions['rate_limits']['register_ip'].acquire(request.remote_addr)
+        if wait:
+            return rate_limited('register.html', wait)
 
-        if user:
+        # 从连接池获取连接，游标在退出with时自动关闭
+        db = current_app.extensions['db']
+        # 先检查重名，已存在时不必计算哈希
+        with db.cursor() as cur:
+            cur.run('user_exists', (name, email))
+            exists = cur.fetchone() is not None
+
+        if not exists:
+            try:
+                hashed_password = current_app.extensions['password_hasher'].hash(password)
+            except HasherBusy:
+                return busy('register.html')
+            # 插入新用户；检查之后、插入之前被并发注册抢先时由唯一索引拒绝
+            try:
+                with db.cursor(commit=True) as cur:
+                    cur.run('insert_user', (name, email, hashed_password))
+            except IntegrityError:
+                exists = True
+
+        if exists:
             error = '用户名或电子邮件已存在。'
             return render_template('register.html', error=error)
         else:
-            # 插入新用户
-            cur.execute("INSERT INTO users (name, email, password) VALUES (%s, %s, %s)", (name, email, hashed_password))
-            mysql.connection.commit()
-            cur.close()
             # 不设置会话，不自动登录
             # 返回登录页面，显示成功消息
             success_message = '注册成功！请登录您的账户。'
             return render_template('login.html', success_message=success_message)
-    return render_template('register.html')
\ No newline at end of file
+    return render_template('register.html')
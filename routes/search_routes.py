@@ -0,0 +1,43 @@
+import time
+
+from flask import Blueprint, jsonify, render_template, request, session, current_app
+from services.search import MAX_QUERY_LENGTH, SOURCES, build_segment, search
+from services.sessions import login_required
+
+# 创建Blueprint
+bp = Blueprint('search', __name__)
+
+MAX_LIMIT = 50
+DEFAULT_LIMIT = 20
+
+
+def get_segments():
+    """各数据集的索引段，数据集更新后只重建对应的段"""
+    data_store = current_app.extensions['data_store']
+    return [data_store.derive(name, 'search', build_segment(name)) for name in SOURCES]
+
+
+def run_search():
+    query = request.args.get('q', '').strip()[:MAX_QUERY_LENGTH]
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    started = time.perf_counter()
+    total, results = search(get_segments(), query, limit)
+    return {
+        "query": query,
+        "total": total,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+@bp.route('/api/search')
+@login_required(api=True)
+def search_api():
+    """全文检索：/api/search?q=龙凤团茶&limit=20，标题与摘要为已转义并用 <mark> 标出命中的HTML"""
+    return jsonify({"success": True, **run_search()})
+
+
+@bp.route('/search')
+@login_required
+def search_page():
+    return render_template('search.html', user_name=session.get('name'), **run_search())
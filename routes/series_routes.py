@@ -0,0 +1,69 @@
+from flask import Blueprint, jsonify, request, current_app
+from routes.api_routes import send_payload
+from services.downsample import METHODS, SeriesPyramid
+from services.sessions import require_login
+
+# 创建Blueprint
+bp = Blueprint('series', __name__, url_prefix='/api/series')
+
+MIN_POINTS = 3
+MAX_POINTS = 5000
+DEFAULT_POINTS = 500
+
+
+def records_pyramid(x_field, y_field):
+    def build(records):
+        return SeriesPyramid([r.get(x_field) for r in records], [r.get(y_field) for r in records])
+    return build
+
+
+# 序列名 -> (数据集, 金字塔构建函数, 按行号取出各点其余字段的函数)
+SERIES = {
+    'prices': (
+        'prices',
+        lambda prices: SeriesPyramid(prices.year, prices.price),
+        lambda prices, rows: prices.rows(rows)
+    ),
+    'song_production': (
+        'song_production',
+        records_pyramid('year', 'output_ton'),
+        lambda records, rows: {"records": [records[i] for i in rows]}
+    ),
+}
+
+
+bp.before_request(require_login)
+
+
+@bp.route('/<name>')
+def downsampled_series(name):
+    """降采样后的序列：points 为目标点数，from/to 为可见的年份窗口，method 为 lttb 或 minmax"""
+    if name not in SERIES:
+        return jsonify({"success": False, "error": "序列不存在"}), 404
+    dataset, build, rows_of = SERIES[name]
+
+    points = max(MIN_POINTS, min(request.args.get('points', DEFAULT_POINTS, type=int), MAX_POINTS))
+    x_from = request.args.get('from', type=float)
+    x_to = request.args.get('to', type=float)
+    method = request.args.get('method', 'lttb')
+    if method not in METHODS:
+        return jsonify({"success": False, "error": f"不支持的降采样方法: {method}"}), 400
+
+    data_store = current_app.extensions['data_store']
+
+    def transform(value):
+        # 金字塔与 value 来自同一份数据，响应不会与缓存的版本号错位
+        pyramid = data_store.derive(dataset, 'pyramid', build, value)
+        rows, level, in_window = pyramid.query(points, x_from, x_to, method)
+        return {
+            "success": True,
+            "method": method,
+            "level": level,
+            "points_in_window": in_window,
+            **rows_of(value, rows)
+        }
+
+    version, payload = current_app.extensions['payload_cache'].get(
+        dataset, transform, key=('series', name, points, x_from, x_to, method)
+    )
+    return send_payload(version, payload)
@@ -0,0 +1,55 @@
+import math
+
+from flask import Blueprint, jsonify, request, current_app
+from routes.api_routes import send_dataset_view
+from services.geometry import MAX_ZOOM, RouteGeometry
+from services.sessions import require_login
+
+# 创建Blueprint
+bp = Blueprint('spread', __name__, url_prefix='/api/spread')
+
+DATASET = 'spread'
+# 可见范围按这么多度向外取整，平移一点不会产生新的缓存条目
+BBOX_GRID = 10
+
+
+def get_geometry(value=None):
+    return current_app.extensions['data_store'].derive(DATASET, 'geometry', RouteGeometry, value)
+
+
+def send_view(key, view):
+    """按数据版本缓存查询结果，并以ETag协商发送；view 的参数是与该版本对应的路线几何"""
+    return send_dataset_view(DATASET, key, lambda value: view(get_geometry(value)))
+
+
+def parse_bbox(text):
+    """'west,south,east,north' -> 按网格向外取整的元组；未给出时返回 None"""
+    if not text:
+        return None
+    west, south, east, north = (float(part) for part in text.split(','))
+    if not all(map(math.isfinite, (west, south, east, north))) or west > east or south > north:
+        raise ValueError(text)
+    return (math.floor(west / BBOX_GRID) * BBOX_GRID, math.floor(south / BBOX_GRID) * BBOX_GRID,
+            math.ceil(east / BBOX_GRID) * BBOX_GRID, math.ceil(north / BBOX_GRID) * BBOX_GRID)
+
+
+bp.before_request(require_login)
+
+
+@bp.route('/eras')
+def eras():
+    return send_view(('spread', 'eras'), lambda geometry: {"success": True, "eras": geometry.eras()})
+
+
+@bp.route('/routes')
+def routes():
+    """传播路线：/api/spread/routes?era=宋&bbox=60,0,140,50&zoom=2"""
+    try:
+        bbox = parse_bbox(request.args.get('bbox'))
+    except ValueError:
+        return jsonify({"success": False, "error": "bbox 应为 west,south,east,north"}), 400
+    era = request.args.get('era') or None
+    zoom = max(0, min(request.args.get('zoom', MAX_ZOOM, type=int), MAX_ZOOM))
+
+    return send_view(('spread', 'routes', era, bbox, zoom),
+                     lambda geometry: {"success": True, "era": era, "bbox": bbox, **geometry.query(era, bbox, zoom)})
@@ -0,0 +1,65 @@
+from flask import Blueprint, request, current_app
+from routes.api_routes import NotFound, send_dataset_view
+from services.tea_areas import TeaAreaIndex
+from services.sessions import require_login
+
+# 创建Blueprint
+bp = Blueprint('tea_areas', __name__, url_prefix='/api/tea_areas')
+
+DATASET = 'historical_tea_areas'
+
+
+def get_index(value=None):
+    return current_app.extensions['data_store'].derive(DATASET, 'index', TeaAreaIndex, value)
+
+
+def send_view(key, view):
+    """按数据版本缓存由索引生成的查询结果，并以ETag协商发送；view 的参数是与该版本对应的索引"""
+    return send_dataset_view(DATASET, key, lambda value: view(get_index(value)))
+
+
+def check_dynasties(index, *names):
+    if any(name not in index.dynasties for name in names):
+        raise NotFound("朝代不存在")
+
+
+bp.before_request(require_login)
+
+
+@bp.route('/dynasties')
+def dynasties():
+    """朝代列表，供地图页面按需加载各朝代图层"""
+    return send_view(('tea_areas', 'dynasties'), lambda index: {"success": True, "dynasties": index.summary()})
+
+
+@bp.route('/dynasty/<name>')
+def dynasty_layer(name):
+    def view(index):
+        check_dynasties(index, name)
+        return {"success": True, **index.layer(name)}
+
+    return send_view(('tea_areas', 'dynasty', name), view)
+
+
+@bp.route('/region/<region>')
+def region_history(region):
+    """产区（古称或今名）在各朝代的沿革"""
+    def view(index):
+        if region not in index.by_region:
+            raise NotFound("产区不存在")
+        return {"success": True, "region": region, "history": index.region_history(region)}
+
+    return send_view(('tea_areas', 'region', region), view)
+
+
+@bp.route('/diff')
+def dynasty_diff():
+    """对比两个朝代：/api/tea_areas/diff?from=唐代&to=宋代"""
+    base = request.args.get('from', '')
+    target = request.args.get('to', '')
+
+    def view(index):
+        check_dynasties(index, base, target)
+        return {"success": True, **index.diff(base, target)}
+
+    return send_view(('tea_areas', 'diff', base, target), view)
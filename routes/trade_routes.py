@@ -0,0 +1,95 @@
+from flask import Blueprint, request, current_app
+from routes.api_routes import NotFound, send_dataset_view
+from services.trade_graph import TradeGraph
+from services.sessions import require_login
+
+# 创建Blueprint
+bp = Blueprint('trade', __name__, url_prefix='/api/trade')
+
+DATASET = 'routes'
+
+
+def get_graph(value=None):
+    return current_app.extensions['data_store'].derive(DATASET, 'graph', TradeGraph, value)
+
+
+def send_view(key, view):
+    """按数据版本缓存由贸易网络生成的查询结果，并以ETag协商发送；view 的参数是与该版本对应的贸易网络"""
+    return send_dataset_view(DATASET, key, lambda value: view(get_graph(value)))
+
+
+def check_era(graph, era):
+    """era 为 None 表示全部时代"""
+    if not graph.has_era(era):
+        raise NotFound("时代不存在")
+
+
+def check_nodes(graph, *nodes):
+    if any(node not in graph.ids for node in nodes):
+        raise NotFound("市镇不存在")
+
+
+bp.before_request(require_login)
+
+
+@bp.route('/eras')
+def eras():
+    return send_view(('trade', 'eras'), lambda graph: {"success": True, "eras": graph.era_summary()})
+
+
+@bp.route('/flows')
+def flows():
+    """各市镇在某一时代的流入/流出贸易量：/api/trade/flows?era=北宋"""
+    era = request.args.get('era') or None
+
+    def view(graph):
+        check_era(graph, era)
+        return {"success": True, "era": era, "nodes": graph.node_flows(era)}
+
+    return send_view(('trade', 'flows', era), view)
+
+
+@bp.route('/subgraph')
+def subgraph():
+    """某一时代的贸易网络，可只取与某个市镇直接相连的部分：?era=北宋&node=成都"""
+    era = request.args.get('era') or None
+    node = request.args.get('node') or None
+
+    def view(graph):
+        check_era(graph, era)
+        if node is not None:
+            check_nodes(graph, node)
+        return {"success": True, "era": era, **graph.subgraph(era, node)}
+
+    return send_view(('trade', 'subgraph', era, node), view)
+
+
+def parse_query():
+    """(时代, 起点, 终点)；时代为空表示全部时代"""
+    return request.args.get('era') or None, request.args.get('from', ''), request.args.get('to', '')
+
+
+@bp.route('/path')
+def shortest_path():
+    """两个市镇之间经过路段最少的贸易路径：?from=成都&to=吐蕃&era=北宋"""
+    era, source, target = parse_query()
+
+    def view(graph):
+        check_era(graph, era)
+        check_nodes(graph, source, target)
+        return {"success": True, "era": era, "route": graph.shortest_path(source, target, era)}
+
+    return send_view(('trade', 'path', era, source, target), view)
+
+
+@bp.route('/max_flow')
+def max_flow():
+    """两个市镇之间以贸易量为容量的最大流及其分解路径"""
+    era, source, target = parse_query()
+
+    def view(graph):
+        check_era(graph, era)
+        check_nodes(graph, source, target)
+        return {"success": True, "era": era, **graph.max_flow(source, target, era)}
+
+    return send_view(('trade', 'max_flow', era, source, target), view)
@@ -0,0 +1,2 @@
+# services包初始化文件
+# 此文件使services目录成为一个可导入的Python包，存放数据层、缓存等与路由无关的服务模块
@@ -0,0 +1,186 @@
+"""静态资源清单：内容哈希文件名与预压缩
+
+`flask build-assets` 扫描 static/，为每个文件计算内容哈希，生成
+`<原路径去扩展名>.<哈希>.<扩展名>` 形式的访问路径；CSS 中 url() 引用的本地资源
+改写为哈希路径后再计算 CSS 自身的哈希。文本类资源预先生成 .gz（以及安装了
+brotli 时的 .br）版本。结果写入构建目录下的 manifest.json。
+
+运行时 url_for('static', ...) 输出哈希路径，哈希路径的响应可以永久缓存；
+源文件在构建后又被修改的条目会被忽略，退回普通的静态文件处理。
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只生成gzip版本
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.txt', '.html', '.xml', '.map', '.ttf', '.otf', '.eot'}
+# 压缩后不足原大小的这个比例才保留压缩版本
+MIN_COMPRESSION_RATIO = 0.9
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _hashed_name(rel_path, digest):
+    stem, ext = posixpath.splitext(rel_path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def _source_version(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _rewrite_css(content, rel_path, hashed_paths, url_prefix):
+    """把CSS中指向本地静态资源的 url() 改为哈希路径"""
+    base_dir = posixpath.dirname(rel_path)
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        path, sep, suffix = url.partition('?')
+        if path.startswith(url_prefix + '/'):
+            target = path[len(url_prefix) + 1:]
+        elif path.startswith('/'):
+            return match.group(0)
+        else:
+            target = posixpath.normpath(posixpath.join(base_dir, path))
+        if target not in hashed_paths:
+            return match.group(0)
+        return f"url({quote}{url_prefix}/{hashed_paths[target]}{sep}{suffix}{quote})"
+
+    return _CSS_URL.sub(replace, content)
+
+
+def _write_variants(build_dir, hashed, content):
+    """生成预压缩版本，返回 {编码: 构建目录内的相对路径}"""
+    variants = {}
+    candidates = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9))]
+    if brotli is not None:
+        candidates.append(('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    for encoding, suffix, compress in candidates:
+        compressed = compress(content)
+        if len(compressed) < len(content) * MIN_COMPRESSION_RATIO:
+            target = hashed + suffix
+            os.makedirs(os.path.dirname(os.path.join(build_dir, target)), exist_ok=True)
+            with open(os.path.join(build_dir, target), 'wb') as f:
+                f.write(compressed)
+            variants[encoding] = target
+    return variants
+
+
+def build_manifest(static_dir, build_dir, url_prefix='/static'):
+    """生成构建目录与清单，返回清单条目数"""
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    os.makedirs(build_dir)
+
+    files = []
+    for root, dirs, names in os.walk(static_dir):
+        dirs.sort()
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, static_dir).replace(os.sep, '/')
+            files.append((rel, full))
+
+    # CSS 引用其他资源，最后处理
+    files.sort(key=lambda item: item[0].endswith('.css'))
+    hashed_paths = {}
+    entries = {}
+    for rel, full in files:
+        ext = posixpath.splitext(rel)[1].lower()
+        with open(full, 'rb') as f:
+            content = f.read()
+        entry = {'source_version': _source_version(full)}
+
+        if ext == '.css':
+            rewritten = _rewrite_css(content.decode('utf-8'), rel, hashed_paths, url_prefix).encode('utf-8')
+            if rewritten != content:
+                content = rewritten
+                entry['rewritten'] = True
+
+        digest = hashlib.sha256(content).hexdigest()
+        hashed = _hashed_name(rel, digest)
+        hashed_paths[rel] = hashed
+        entry.update({'path': hashed, 'etag': digest[:20]})
+
+        if entry.get('rewritten'):
+            # 内容被改写的文件从构建目录提供
+            os.makedirs(os.path.dirname(os.path.join(build_dir, hashed)), exist_ok=True)
+            with open(os.path.join(build_dir, hashed), 'wb') as f:
+                f.write(content)
+        if ext in COMPRESSIBLE:
+            entry['encodings'] = _write_variants(build_dir, hashed, content)
+        entries[rel] = entry
+
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=1)
+    return len(entries)
+
+
+class AssetManifest:
+    """运行时使用的资源清单"""
+
+    def __init__(self, static_dir, build_dir, entries):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        # 原路径 -> 条目；哈希路径 -> 原路径
+        self.entries = entries
+        self.by_hashed = {entry['path']: rel for rel, entry in entries.items()}
+
+    @classmethod
+    def load(cls, static_dir, build_dir):
+        """读取清单，丢弃构建后源文件又被修改的条目；没有清单时返回None"""
+        path = os.path.join(build_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"静态资源清单不可用: {str(e)}")
+            return None
+
+        fresh = {}
+        for rel, entry in entries.items():
+            try:
+                if _source_version(os.path.join(static_dir, rel)) == entry['source_version']:
+                    fresh[rel] = entry
+            except OSError:
+                continue
+        stale = len(entries) - len(fresh)
+        if stale:
+            logger.warning(f"{stale} 个静态资源在构建清单后被修改，需重新执行 flask build-assets")
+        logger.info(f"已加载静态资源清单，共 {len(fresh)} 个文件")
+        return cls(static_dir, build_dir, fresh)
+
+    def hashed(self, filename):
+        entry = self.entries.get(filename)
+        return entry['path'] if entry else None
+
+    def resolve(self, hashed_path, accept_encodings):
+        """哈希路径 -> (文件路径, 内容编码或None, ETag, 原路径)；不是哈希路径时返回None"""
+        rel = self.by_hashed.get(hashed_path)
+        if rel is None:
+            return None
+        entry = self.entries[rel]
+        encodings = entry.get('encodings', {})
+        for encoding in ('br', 'gzip'):
+            if encoding in encodings and accept_encodings[encoding]:
+                return os.path.join(self.build_dir, encodings[encoding]), encoding, f"{entry['etag']}-{encoding}", rel
+        if entry.get('rewritten'):
+            return os.path.join(self.build_dir, entry['path']), None, entry['etag'], rel
+        return os.path.join(self.static_dir, rel), None, entry['etag'], rel
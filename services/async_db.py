@@ -0,0 +1,163 @@
+"""ASGI 模式下的异步数据库访问
+
+MySQL 使用 aiomysql 连接池，等待数据库时不占用线程；SQLite 或未安装 aiomysql 时
+退回到在线程池中使用同步连接池。两者接口一致，预定义语句与同步层共用 STATEMENTS。
+"""
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager
+
+from services.db import PoolTimeout, statement_sql
+from services.metrics import DB_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _AioMySQLCursor:
+    def __init__(self, raw):
+        self._raw = raw
+
+    async def run(self, statement, params=()):
+        with DB_QUERY_SECONDS.time(statement):
+            await self._raw.execute(statement_sql(statement, 'mysql'), params)
+        return self
+
+    async def fetchone(self):
+        return await self._raw.fetchone()
+
+    async def fetchall(self):
+        return await self._raw.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+
+class AioMySQLDatabase:
+    """基于 aiomysql 的异步连接池，start() 需在事件循环中调用"""
+
+    def __init__(self, params, size=5, max_overflow=5, recycle=300, timeout=10):
+        self.params = params
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.pool = None
+
+    async def start(self):
+        import aiomysql
+        self.pool = await aiomysql.create_pool(
+            host=self.params['host'],
+            port=self.params['port'],
+            user=self.params['user'],
+            password=self.params['passwd'],
+            db=self.params['db'],
+            charset=self.params['charset'],
+            connect_timeout=self.params['connect_timeout'],
+            minsize=self.size,
+            maxsize=self.size + self.max_overflow,
+            pool_recycle=self.recycle,
+            autocommit=False
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    @asynccontextmanager
+    async def cursor(self, commit=False):
+        try:
+            conn = await asyncio.wait_for(self.pool.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise PoolTimeout(f"等待数据库连接超时（{self.timeout}秒）")
+        try:
+            async with conn.cursor() as raw:
+                yield _AioMySQLCursor(raw)
+            if commit:
+                await conn.commit()
+            else:
+                await conn.rollback()
+        except BaseException:
+            try:
+                await conn.rollback()
+            except Exception:
+                conn.close()
+            raise
+        finally:
+            self.pool.release(conn)
+
+    def metrics(self):
+        if self.pool is None:
+            return {'backend': 'aiomysql', 'started': False}
+        return {
+            'backend': 'aiomysql',
+            'size': self.pool.size,
+            'idle': self.pool.freesize,
+            'in_use': self.pool.size - self.pool.freesize,
+            'maxsize': self.pool.maxsize
+        }
+
+
+class _ThreadedCursor:
+    def __init__(self, cur):
+        self._cur = cur
+
+    async def run(self, statement, params=()):
+        await asyncio.to_thread(self._cur.run, statement, params)
+        return self
+
+    async def fetchone(self):
+        return await asyncio.to_thread(self._cur.fetchone)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(self._cur.fetchall)
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+
+class ThreadedDatabase:
+    """在线程池中调用同步 Database，供没有异步驱动的后端使用"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def cursor(self, commit=False):
+        context = self.db.cursor(commit=commit)
+        cur = await asyncio.to_thread(context.__enter__)
+        try:
+            yield _ThreadedCursor(cur)
+        except BaseException:
+            if not await asyncio.to_thread(context.__exit__, *sys.exc_info()):
+                raise
+        else:
+            await asyncio.to_thread(context.__exit__, None, None, None)
+
+    def metrics(self):
+        return {**self.db.metrics(), 'backend': f'{self.db.backend.name} (threaded)'}
+
+
+def create_async_database(db):
+    """按同步 Database 的配置创建对应的异步数据库入口"""
+    backend = db.backend
+    if backend.name == 'mysql':
+        try:
+            import aiomysql  # noqa: F401
+        except ImportError:
+            logger.warning("未安装 aiomysql，ASGI 模式下数据库访问将在线程池中执行")
+        else:
+            pool = db.pool
+            return AioMySQLDatabase(backend.params, size=pool.size, max_overflow=pool.max_overflow,
+                                    recycle=pool.recycle, timeout=pool.timeout)
+    return ThreadedDatabase(db)
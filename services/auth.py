@@ -0,0 +1,130 @@
+"""登录注册的开销控制
+
+- bcrypt 计算交给固定大小的线程池（bcrypt 计算期间释放GIL），排队数有上限，
+  超出时直接拒绝，突发的登录请求不会让所有工作线程都卡在哈希计算上
+- 哈希强度可配置；登录成功时发现已存哈希的强度与配置不同，透明地重新哈希
+- 按IP、按邮箱的令牌桶限流，在查询数据库和计算哈希之前拒绝
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusy(Exception):
+    """哈希线程池与排队均已满，或等待超时"""
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, workers=2, max_queue=16, timeout=10):
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        # 正在计算与排队中的任务总数上限
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+        self._stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise HasherBusy("当前登录人数过多，请稍后再试")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # 任务仍会在线程池中完成并释放名额，请求这边不再等待
+            self._count('timeouts')
+            raise HasherBusy("当前登录人数过多，请稍后再试")
+
+    def hash(self, password):
+        """返回 bcrypt 哈希字符串"""
+        hashed = self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)))
+        self._count('hashed')
+        return hashed.decode('utf-8')
+
+    def verify(self, password, hashed):
+        """校验密码，返回 (是否匹配, 是否需要按当前强度重新哈希)"""
+        if isinstance(hashed, str):
+            hashed = hashed.encode('utf-8')
+        try:
+            ok = self._run(bcrypt.checkpw, password.encode('utf-8'), hashed)
+        except ValueError:
+            logger.warning("数据库中的密码哈希格式无效")
+            return False, False
+        self._count('verified')
+        return ok, ok and self.cost(hashed) != self.rounds
+
+    def verify_missing(self, password):
+        """用户不存在时也做一次同等开销的校验，避免通过响应时间判断邮箱是否已注册"""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash('\0')
+        self.verify(password, self._dummy_hash)
+
+    def count_rehash(self):
+        self._count('rehashed')
+
+    @staticmethod
+    def cost(hashed):
+        if isinstance(hashed, bytes):
+            hashed = hashed.decode('ascii', 'replace')
+        try:
+            return int(hashed.split('$')[2])
+        except (IndexError, ValueError):
+            return None
+
+    def metrics(self):
+        with self._lock:
+            return {'rounds': self.rounds, **self._stats}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RateLimiter:
+    """按键计数的令牌桶：容量 capacity，每秒补充 rate 个；只保留最近活跃的 max_keys 个键"""
+
+    def __init__(self, capacity, rate, max_keys=10000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        # 键 -> (剩余令牌, 上次更新时间)，按最近使用排列
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def acquire(self, key):
+        """取一个令牌；成功返回0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                self.limited += 1
+                wait = (1 - tokens) / self.rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def metrics(self):
+        with self._lock:
+            return {'keys': len(self._buckets), 'limited': self.limited}
@@ -0,0 +1,37 @@
+"""不依赖pandas的CSV读取
+
+按列读取并推断类型：整列都是整数时转为 int，都是数值时转为 float，否则保留字符串；
+空单元格为 None。数据文件规模下标准库 csv 已足够快，大数据量走二进制快照。
+"""
+import csv
+
+
+def _infer(values):
+    present = [v for v in values if v != '']
+    for cast in (int, float):
+        try:
+            converted = {v: cast(v) for v in set(present)}
+        except ValueError:
+            continue
+        return [converted[v] if v != '' else None for v in values]
+    return [v if v != '' else None for v in values]
+
+
+def read_columns(path, usecols=None):
+    """返回 {列名: 值列表}，列顺序与文件一致"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        wanted = [i for i, name in enumerate(header) if usecols is None or name in usecols]
+        columns = [[] for _ in wanted]
+        for row in reader:
+            if not row:
+                continue
+            for column, i in zip(columns, wanted):
+                column.append(row[i] if i < len(row) else '')
+    return {header[i]: _infer(column) for i, column in zip(wanted, columns)}
+
+
+def to_records(columns):
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
@@ -0,0 +1,149 @@
+"""传统文化索引
+
+traditional_cultures.json 每个数据版本只建一次索引：按 id、分类、地域、
+时间轴时期建立字典。地域字段是"景德镇、龙泉、磁州等"这样的自由文本，
+拆分后逐个归类；年代字段（如"约公元前5世纪-1911年"）解析为起止年份，
+与时间轴各时期的区间有重叠即归入该时期。筛选、分面计数与时间段查询都直接由索引回答。
+"""
+import re
+
+# 列表接口只返回概要字段，详情字段通过 /api/cultures/<id> 获取
+SUMMARY_FIELDS = ('id', 'name', 'category', 'dynasty', 'time_period', 'region', 'img', 'intro')
+FILTERS = ('category', 'region', 'era')
+
+_REGION_SEPARATORS = re.compile(r'[、，,]')
+_REGION_ALIASES = {'全国各地': '全国'}
+_YEAR = re.compile(r'^(约)?(公元)?(前)?(\d+)(年|世纪)$')
+
+
+def parse_year(text, end=False):
+    """'前221年' -> -221，'约12世纪' -> 1101（作为终点时为1200）；无法解析时返回None"""
+    match = _YEAR.match(text.strip())
+    if not match:
+        return None
+    number = int(match.group(4))
+    before_era = match.group(3) is not None
+    if match.group(5) == '世纪':
+        # 公元前5世纪为前500年至前401年
+        first, last = (number - 1) * 100 + 1, number * 100
+        if before_era:
+            first, last = -last, -first
+        return last if end else first
+    return -number if before_era else number
+
+
+def parse_period(text):
+    """'前2070年-公元220年' -> (-2070, 220)；无法解析时返回 (None, None)"""
+    start, sep, end = (text or '').partition('-')
+    if not sep:
+        return None, None
+    return parse_year(start), parse_year(end, end=True)
+
+
+def split_regions(text):
+    regions = []
+    for part in _REGION_SEPARATORS.split(text or ''):
+        part = part.strip()
+        for suffix in ('等地', '等'):
+            if part.endswith(suffix) and len(part) > len(suffix):
+                part = part[:-len(suffix)]
+                break
+        part = _REGION_ALIASES.get(part, part)
+        if part and part not in regions:
+            regions.append(part)
+    return regions
+
+
+def _add(index, key, culture_id):
+    index.setdefault(key, []).append(culture_id)
+
+
+class CultureIndex:
+    def __init__(self, data):
+        self.categories = {category['id']: category for category in data.get('categories', [])}
+        self.ids = []
+        self.by_id = {}
+        self.by_category = {}
+        self.by_region = {}
+        self.by_era = {}
+        # id -> (起始年份, 结束年份)
+        self.spans = {}
+        self.eras = []
+
+        for period in data.get('timeline', []):
+            try:
+                start, end = int(period['start_year']), int(period['end_year'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.eras.append({**period, 'start_year': start, 'end_year': end})
+            self.by_era[period['period']] = []
+
+        for item in data.get('cultures', []):
+            culture_id = item['id']
+            self.ids.append(culture_id)
+            self.by_id[culture_id] = item
+            _add(self.by_category, item.get('category'), culture_id)
+            for region in split_regions(item.get('region')):
+                _add(self.by_region, region, culture_id)
+            start, end = parse_period(item.get('time_period'))
+            if start is not None and end is not None:
+                self.spans[culture_id] = (start, end)
+                for era in self.eras:
+                    # 仅端点相接（如止于220年与始于220年）不算重叠
+                    if start < era['end_year'] and end > era['start_year']:
+                        self.by_era[era['period']].append(culture_id)
+
+        self._dimensions = {'category': self.by_category, 'region': self.by_region, 'era': self.by_era}
+        self._sets = {
+            dimension: {key: frozenset(ids) for key, ids in index.items()}
+            for dimension, index in self._dimensions.items()
+        }
+
+    def summary(self, culture_id):
+        item = self.by_id[culture_id]
+        return {field: item[field] for field in SUMMARY_FIELDS if field in item}
+
+    def is_valid(self, dimension, value):
+        return value in self._dimensions[dimension]
+
+    def _matching(self, filters, skip=None):
+        matched = None
+        for dimension, value in filters.items():
+            if value is None or dimension == skip:
+                continue
+            ids = self._sets[dimension].get(value, frozenset())
+            matched = ids if matched is None else matched & ids
+        return matched
+
+    def query(self, filters, offset=0, limit=None):
+        """按分类、地域、时期筛选（均可为None），返回 (总数, 当页id列表)，保持文件中的顺序"""
+        matched = self._matching(filters)
+        ids = self.ids if matched is None else [i for i in self.ids if i in matched]
+        return len(ids), ids[offset:None if limit is None else offset + limit]
+
+    def facets(self, filters):
+        """各筛选维度下每个取值的条数，计数时应用其余维度的筛选条件"""
+        result = {}
+        for dimension, index in self._dimensions.items():
+            others = self._matching(filters, skip=dimension)
+            counts = {}
+            for key, ids in index.items():
+                count = len(ids) if others is None else len(self._sets[dimension][key] & others)
+                if count:
+                    counts[key] = count
+            result[dimension] = counts
+        return result
+
+    def timeline(self, year_from=None, year_to=None):
+        """与 [year_from, year_to] 有重叠的时间轴时期，附带各时期的文化概要"""
+        slices = []
+        for era in self.eras:
+            if year_from is not None and era['end_year'] <= year_from:
+                continue
+            if year_to is not None and era['start_year'] >= year_to:
+                continue
+            slices.append({
+                **era,
+                'cultures': [self.summary(culture_id) for culture_id in self.by_era[era['period']]]
+            })
+        return slices
@@ -0,0 +1,183 @@
+"""数据目录的二进制快照
+
+`flask build-snapshot` 把 data/ 下各数据集加载并后处理后的结果编译成一个文件：
+
+    魔数(8) | 格式版本 u32 | 头部长度 u32 | 头部CRC32 u32 | 头部JSON | 各数据段（64字节对齐）
+
+头部记录每个数据集对应源文件的版本 (mtime_ns, size) 与各数据段的位置和 CRC32。
+普通数据集序列化为一个数据段（安装了 msgpack 时使用 msgpack，否则为 JSON）；
+提供 to_arrays()/from_arrays() 的列式数据（如价格表）按原始内存布局保存数组，
+加载时通过 mmap 直接映射，无需解析，多个 worker 经操作系统页缓存共享同一份内存。
+
+某个数据集的源文件版本与快照不一致时，该数据集退回到从源文件加载。
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from services.prices import PriceSeries
+
+try:
+    import msgpack
+except ImportError:  # msgpack为可选依赖，未安装时数据段使用JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TEASNAP\x00'
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct('<8sIII')
+_ALIGN = 64
+
+# 以数组形式保存的列式类型
+COLUMNAR_TYPES = {'PriceSeries': PriceSeries}
+
+
+class SnapshotError(Exception):
+    """快照文件损坏或格式不兼容"""
+
+
+def _encode(value, codec):
+    if codec == 'msgpack':
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _decode(data, codec):
+    if codec == 'msgpack':
+        if msgpack is None:
+            raise SnapshotError("快照使用 msgpack 编码，但当前环境未安装 msgpack")
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    return json.loads(bytes(data))
+
+
+def build_snapshot(data_store, path):
+    """从源文件加载全部数据集并写入快照，写完后原子替换旧文件，返回写入的数据集名"""
+    codec = 'msgpack' if msgpack is not None else 'json'
+    sections = []
+    datasets = {}
+    offset = 0
+
+    def add_section(data):
+        nonlocal offset
+        start = offset
+        sections.append((start, data))
+        offset += len(data)
+        offset += -offset % _ALIGN
+        return {'offset': start, 'length': len(data), 'crc': zlib.crc32(data)}
+
+    for name in data_store.names():
+        dataset = data_store.dataset(name)
+        version = dataset.source_version()
+        if version is None:
+            logger.warning(f"数据文件不存在，快照中跳过数据集 {name}")
+            continue
+        value = dataset.loader(dataset.path)
+        entry = {'source_version': list(version)}
+        type_name = type(value).__name__
+        if type_name in COLUMNAR_TYPES:
+            meta, arrays = value.to_arrays()
+            entry['type'] = type_name
+            entry['meta'] = add_section(_encode(meta, codec))
+            entry['arrays'] = {}
+            for column, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                entry['arrays'][column] = {
+                    'dtype': array.dtype.str,
+                    'shape': list(array.shape),
+                    **add_section(array.tobytes())
+                }
+        else:
+            entry['value'] = add_section(_encode(value, codec))
+        datasets[name] = entry
+
+    header = json.dumps({
+        'codec': codec,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'datasets': datasets
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = _PREFIX.size + len(header)
+    data_start += -data_start % _ALIGN
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header), zlib.crc32(header)))
+        f.write(header)
+        for start, data in sections:
+            f.seek(data_start + start)
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    # 原子替换：正在映射旧文件的进程不受影响
+    os.replace(tmp_path, path)
+    return list(datasets)
+
+
+class DataSnapshot:
+    """已打开的快照文件，各数据集在首次访问时才解码"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _PREFIX.size:
+            raise SnapshotError("快照文件过短")
+        magic, version, header_length, header_crc = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError(f"快照格式不兼容（版本 {version}）")
+        header = self._mmap[_PREFIX.size:_PREFIX.size + header_length]
+        if zlib.crc32(header) != header_crc:
+            raise SnapshotError("快照头部校验失败")
+        header = json.loads(header)
+        self.codec = header['codec']
+        self.created_at = header['created_at']
+        self.datasets = header['datasets']
+        self._data_start = _PREFIX.size + header_length + (-(_PREFIX.size + header_length) % _ALIGN)
+
+    @classmethod
+    def open(cls, path):
+        """打开快照；文件不存在或不可用时返回None"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            snapshot = cls(path)
+        except (OSError, ValueError, SnapshotError) as e:
+            logger.warning(f"数据快照不可用，将从源文件加载: {str(e)}")
+            return None
+        logger.info(f"已打开数据快照 {path}（生成于 {snapshot.created_at}）")
+        return snapshot
+
+    def _section(self, section):
+        start = self._data_start + section['offset']
+        view = memoryview(self._mmap)[start:start + section['length']]
+        if zlib.crc32(view) != section['crc']:
+            raise SnapshotError("数据段校验失败")
+        return start, view
+
+    def load(self, name, version):
+        """源文件版本与快照一致时返回快照中的数据，否则返回None"""
+        entry = self.datasets.get(name)
+        if entry is None or tuple(entry['source_version']) != tuple(version):
+            return None
+        try:
+            if 'type' in entry:
+                _, meta = self._section(entry['meta'])
+                arrays = {}
+                for column, spec in entry['arrays'].items():
+                    start, _ = self._section(spec)
+                    dtype = np.dtype(spec['dtype'])
+                    count = spec['length'] // dtype.itemsize
+                    arrays[column] = np.frombuffer(self._mmap, dtype=dtype, count=count,
+                                                   offset=start).reshape(spec['shape'])
+                return COLUMNAR_TYPES[entry['type']].from_arrays(_decode(meta, self.codec), arrays)
+            _, data = self._section(entry['value'])
+            return _decode(data, self.codec)
+        except (SnapshotError, ValueError, KeyError) as e:
+            logger.warning(f"快照中的数据集 {name} 不可用，将从源文件加载: {str(e)}")
+            return None
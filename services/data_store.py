@@ -0,0 +1,233 @@
+"""按数据集懒加载、可热更新的数据仓库
+
+每个数据文件对应一个 Dataset：首次访问时才解析；之后按 (mtime, size) 判断文件
+是否变化，变化时在后台线程重新加载，成功后整体替换，失败时保留旧数据，
+不会影响其他数据集。配置了二进制快照时，源文件版本与快照一致的数据集直接取自快照。
+"""
+import logging
+import os
+import threading
+import time
+
+from services.metrics import DATA_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _version_token(version):
+    if version is None:
+        return '0'
+    return '%x-%x' % version
+
+
+class Dataset:
+    """单个数据文件的加载状态"""
+
+    def __init__(self, name, path, loader, default=dict, check_interval=2.0, on_reload=None, precompiled=None):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        # precompiled(name, version) 返回快照中对应版本的数据，没有时返回None
+        self.precompiled = precompiled
+        self.default = default
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.error = None
+        # (数据, 文件版本) 作为一个整体替换，读取方不会看到新旧混杂的状态
+        self._state = None
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._last_check = 0.0
+        # 派生结构缓存：key -> (对应的 _state, 派生结果)
+        self._derived = {}
+
+    def source_version(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, version):
+        started = time.perf_counter()
+        source = '快照'
+        try:
+            value = self.precompiled(self.name, version) if self.precompiled else None
+            if value is None:
+                source = '源文件'
+                value = self.loader(self.path)
+        except Exception as e:
+            logger.error(f"加载数据集 {self.name} 失败 {self.path}: {str(e)}", exc_info=True)
+            self.error = str(e)
+            self._failed_version = version
+            return False
+
+        self._state = (value, version)
+        self._failed_version = None
+        self.error = None
+        elapsed = time.perf_counter() - started
+        DATA_LOAD_SECONDS.observe(elapsed, self.name, 'snapshot' if source == '快照' else 'source')
+        logger.info(f"数据集 {self.name} 从{source}加载完成，耗时 {elapsed * 1000:.1f}ms")
+        if self.on_reload:
+            try:
+                self.on_reload(self.name, value)
+            except Exception as e:
+                logger.error(f"数据集 {self.name} 的重载回调出错: {str(e)}", exc_info=True)
+        return True
+
+    def _initial_load(self):
+        with self._lock:
+            if self._state is not None:
+                return
+            version = self.source_version()
+            if version is None:
+                logger.warning(f"数据文件不存在: {self.path}，使用默认数据")
+                self._state = (self.default(), None)
+            elif not self._load(version):
+                # 首次加载失败时退回默认数据，文件修复后会按版本变化自动重试
+                self._state = (self.default(), version)
+            self._last_check = time.monotonic()
+
+    def _background_reload(self, version):
+        try:
+            self._load(version)
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def check(self, force=False):
+        """检查文件是否变化，变化时启动后台重载，返回是否触发了重载"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        version = self.source_version()
+        if version is None or version == self._state[1] or version == self._failed_version:
+            return False
+
+        with self._lock:
+            if self._reloading:
+                return False
+            self._reloading = True
+        threading.Thread(
+            target=self._background_reload,
+            args=(version,),
+            name=f"dataset-reload-{self.name}",
+            daemon=True
+        ).start()
+        return True
+
+    def get(self):
+        if self._state is None:
+            self._initial_load()
+        else:
+            self.check()
+        return self._state[0]
+
+    def snapshot(self):
+        """同时返回数据与其版本标识，二者保证来自同一次加载"""
+        self.get()
+        value, version = self._state
+        return value, _version_token(version)
+
+    def derive(self, key, builder, value=None):
+        """返回由当前数据构建的派生结构（如索引），每个数据版本只构建一次
+
+        value 为先前 snapshot() 取得的数据时，返回由这份数据构建的派生结构，
+        与按该版本缓存的响应保持一致
+        """
+        self.get()
+        state = self._state
+        cached = self._derived.get(key)
+        if value is not None and value is not state[0]:
+            # 取得 value 之后数据集已经重载，为旧数据单独构建，不放入缓存
+            if cached is not None and cached[0][0] is value:
+                return cached[1]
+            return builder(value)
+        if cached is not None and cached[0] is state:
+            return cached[1]
+        with self._lock:
+            cached = self._derived.get(key)
+            if cached is None or cached[0] is not state:
+                cached = (state, builder(state[0]))
+                self._derived[key] = cached
+        return cached[1]
+
+    @property
+    def loaded(self):
+        return self._state is not None
+
+    @property
+    def version(self):
+        """当前数据对应的文件版本标识，可用于缓存键
+
+        与 get() 一样按间隔检查文件是否变化：页面缓存命中时只取版本而不取数据，
+        不在这里检查的话文件修改后缓存会一直命中旧版本
+        """
+        self.get()
+        return _version_token(self._state[1])
+
+
+class DataStore:
+    """数据集注册表"""
+
+    def __init__(self, data_dir, check_interval=2.0, snapshot=None):
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self.data_snapshot = snapshot
+        self._datasets = {}
+        self._listeners = []
+
+    def register(self, name, filename, loader, default=dict):
+        self._datasets[name] = Dataset(
+            name,
+            os.path.join(self.data_dir, filename),
+            loader,
+            default=default,
+            check_interval=self.check_interval,
+            on_reload=self._notify,
+            precompiled=self.data_snapshot.load if self.data_snapshot else None
+        )
+
+    def subscribe(self, callback):
+        """注册数据集重载回调，签名为 callback(name, value)"""
+        self._listeners.append(callback)
+
+    def _notify(self, name, value):
+        for callback in self._listeners:
+            callback(name, value)
+
+    def dataset(self, name):
+        return self._datasets[name]
+
+    def get(self, name):
+        return self._datasets[name].get()
+
+    def version(self, name):
+        return self._datasets[name].version
+
+    def snapshot(self, name):
+        return self._datasets[name].snapshot()
+
+    def derive(self, name, key, builder, value=None):
+        return self._datasets[name].derive(key, builder, value)
+
+    def names(self):
+        return list(self._datasets)
+
+    def preload(self):
+        """预先加载全部数据集（开发服务器启动时使用）"""
+        for dataset in self._datasets.values():
+            dataset.get()
+
+    def status(self):
+        return {
+            name: {
+                'loaded': dataset.loaded,
+                'version': dataset.version if dataset.loaded else None,
+                'error': dataset.error
+            }
+            for name, dataset in self._datasets.items()
+        }
@@ -0,0 +1,104 @@
+"""各数据文件的解析函数与默认数据，以及数据仓库的装配"""
+import json
+
+from services.csv_table import read_columns, to_records
+from services.data_store import DataStore
+from services.prices import PriceSeries, load_price_series
+from services.tea_areas import TeaAreaIndex
+
+
+# 简化版JSON加载函数
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_csv_records(path):
+    return to_records(read_columns(path))
+
+
+def default_routes():
+    return {"nodes": [], "links": []}
+
+
+def default_spread():
+    return {
+        'title': "中华茶文化全球传播路线",
+        'period': "7-19世纪",
+        'data_source': "《丝绸之路考古纪年》+《海疆通志》",
+        'nodes': [],
+        'routes': [],
+        'historical_events': []
+    }
+
+
+def default_tea_areas():
+    return {
+        "title": "中国历史茶叶产区变迁与对比",
+        "description": "从唐朝到现代的中国主要茶叶产区变化与特点对比",
+        "dynasties": [],
+        "comparison": {
+            "area_expansion": "",
+            "tea_types": "",
+            "production_methods": "",
+            "major_shifts": []
+        },
+        "visualization_data": {
+            "map_coordinates": {}
+        }
+    }
+
+
+def default_traditional_cultures():
+    return {
+        "title": "中国传统文化数字展览馆",
+        "subtitle": "1911年前非物质文化遗产保护与传承",
+        "description": "集中展示1911年前的中国传统文化与非物质文化遗产",
+        "categories": [],
+        "cultures": [],
+        "timeline": [],
+        "regions": []
+    }
+
+
+def default_tea_quiz():
+    return {
+        "title": "中华茶文化知识答题系统",
+        "description": "测试您对1911年前中国茶文化的了解程度",
+        "questions": []
+    }
+
+
+def load_spread(path):
+    spread = load_json(path)
+
+    # 保证基本字段存在
+    for key, value in default_spread().items():
+        spread.setdefault(key, value)
+
+    # 路线几何（大圆插值、按缩放简化、共享样式）由 services.geometry 按数据版本派生
+    return spread
+
+
+def load_tea_areas(path):
+    historical_tea_areas = load_json(path)
+
+    # 地图散点通过索引关联茶类信息，不再逐点遍历全部朝代和产区
+    index = TeaAreaIndex(historical_tea_areas)
+    visualization_data = historical_tea_areas.get('visualization_data', {})
+    historical_tea_areas['visualization_data'] = {**visualization_data, 'map_coordinates': index.map_coordinates()}
+    return historical_tea_areas
+
+
+def create_data_store(data_dir, check_interval=2.0, snapshot=None):
+    """创建并注册全部数据集；snapshot 为 DataSnapshot 时优先从快照加载"""
+    store = DataStore(data_dir, check_interval=check_interval, snapshot=snapshot)
+    store.register('prices', 'historical_prices.csv', load_price_series, default=PriceSeries.empty)
+    store.register('routes', 'tea_routes.json', load_json, default=default_routes)
+    store.register('spread', 'culture_spread.json', load_spread, default=default_spread)
+    store.register('song_production', 'song_tea_production.csv', load_csv_records, default=list)
+    store.register('historical_tea_areas', 'historical_tea_areas.json', load_tea_areas, default=default_tea_areas)
+    store.register('tea_process', 'tea_process.json', load_json, default=list)
+    store.register('traditional_cultures', 'traditional_cultures.json', load_json, default=default_traditional_cultures)
+    store.register('tea_quiz', 'tea_quiz.json', load_json, default=default_tea_quiz)
+    return store
@@ -0,0 +1,425 @@
+"""数据库访问层：有界连接池 + 可替换的后端
+
+取代 flask_mysqldb 每个请求新建连接的做法。连接池支持健康检查、按时间回收、
+溢出上限与等待超时，并记录使用指标；后端可在 MySQL 与 SQLite 之间切换，
+便于在没有 MySQL 服务的环境下做本地压测。
+"""
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from services.metrics import DB_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """等待可用连接超时"""
+
+
+class IntegrityError(Exception):
+    """违反唯一约束等完整性约束；各驱动的 IntegrityError 统一转换为此异常"""
+
+
+# 热点查询统一在这里定义，各后端只转换一次参数风格；
+# 语法不通用的语句以 {后端名: SQL} 的形式分别给出
+STATEMENTS = {
+    'user_by_email': "SELECT id, name, password FROM users WHERE email = %s",
+    # 拆成两个各自走索引的查询，避免 OR 条件退化为全表扫描
+    'user_exists': (
+        "SELECT id FROM users WHERE name = %s "
+        "UNION ALL SELECT id FROM users WHERE email = %s LIMIT 1"
+    ),
+    'insert_user': "INSERT INTO users (name, email, password) VALUES (%s, %s, %s)",
+    'update_password': "UPDATE users SET password = %s WHERE id = %s",
+    'insert_quiz_score': "INSERT INTO quiz_scores (user_name, score, total, date_taken) VALUES (%s, %s, %s, %s)",
+    # 以下两条按 (created_at, id) 做键集分页，走 (user_name, created_at) 索引
+    'quiz_scores_first_page': (
+        "SELECT id, score, total, date_taken, created_at FROM quiz_scores "
+        "WHERE user_name = %s ORDER BY created_at DESC, id DESC LIMIT %s"
+    ),
+    'quiz_scores_next_page': (
+        "SELECT id, score, total, date_taken, created_at FROM quiz_scores "
+        "WHERE user_name = %s AND (created_at < %s OR (created_at = %s AND id < %s)) "
+        "ORDER BY created_at DESC, id DESC LIMIT %s"
+    ),
+    # 答题进度：每个用户一行，修改时按 step 做条件更新
+    'quiz_attempt': "SELECT state, step FROM quiz_attempts WHERE user_name = %s",
+    'upsert_quiz_attempt': {
+        'mysql': (
+            "INSERT INTO quiz_attempts (user_name, state, step) VALUES (%s, %s, 0) "
+            "ON DUPLICATE KEY UPDATE state = VALUES(state), step = step + 1"
+        ),
+        'sqlite': (
+            "INSERT INTO quiz_attempts (user_name, state, step) VALUES (%s, %s, 0) "
+            "ON CONFLICT(user_name) DO UPDATE SET state = excluded.state, step = step + 1"
+        ),
+    },
+    'update_quiz_attempt': "UPDATE quiz_attempts SET state = %s, step = step + 1 WHERE user_name = %s AND step = %s",
+    'quiz_user_stats': "SELECT attempts, best_score, score_sum, total_sum FROM quiz_user_stats WHERE user_name = %s",
+    'upsert_quiz_user_stats': {
+        'mysql': (
+            "INSERT INTO quiz_user_stats (user_name, attempts, best_score, score_sum, total_sum) "
+            "VALUES (%s, 1, %s, %s, %s) ON DUPLICATE KEY UPDATE "
+            "attempts = attempts + 1, best_score = GREATEST(best_score, VALUES(best_score)), "
+            "score_sum = score_sum + VALUES(score_sum), total_sum = total_sum + VALUES(total_sum)"
+        ),
+        'sqlite': (
+            "INSERT INTO quiz_user_stats (user_name, attempts, best_score, score_sum, total_sum) "
+            "VALUES (%s, 1, %s, %s, %s) ON CONFLICT(user_name) DO UPDATE SET "
+            "attempts = attempts + 1, best_score = MAX(best_score, excluded.best_score), "
+            "score_sum = score_sum + excluded.score_sum, total_sum = total_sum + excluded.total_sum"
+        ),
+    },
+}
+
+
+def statement_sql(statement, backend_name):
+    """取出预定义语句在指定后端下的SQL"""
+    sql = STATEMENTS[statement]
+    if isinstance(sql, dict):
+        sql = sql[backend_name]
+    return sql
+
+
+class MySQLBackend:
+    name = 'mysql'
+
+    def __init__(self, host='localhost', user='root', password='', database='', port=3306, connect_timeout=5):
+        self.params = {
+            'host': host,
+            'user': user,
+            'passwd': password,
+            'db': database,
+            'port': port,
+            'connect_timeout': connect_timeout,
+            'charset': 'utf8mb4'
+        }
+
+    def connect(self):
+        import MySQLdb
+        return MySQLdb.connect(**self.params)
+
+    @property
+    def integrity_error(self):
+        import MySQLdb
+        return MySQLdb.IntegrityError
+
+    def ping(self, conn):
+        conn.ping()
+
+    def translate(self, sql):
+        return sql
+
+
+class SQLiteBackend:
+    name = 'sqlite'
+    integrity_error = sqlite3.IntegrityError
+
+    def __init__(self, path='app.sqlite3'):
+        self.path = path
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def ping(self, conn):
+        conn.execute('SELECT 1')
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def translate(sql):
+        # 把MySQL风格的SQL转换为SQLite可执行的形式
+        sql = sql.replace('%s', '?')
+        sql = re.sub(r'INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT', sql)
+        sql = re.sub(r'DROP INDEX (\w+) ON \w+', r'DROP INDEX \1', sql)
+        return sql
+
+
+class _PooledConnection:
+    __slots__ = ('raw', 'created_at', 'last_used')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class Cursor:
+    """对驱动游标的轻量封装，统一参数风格并支持按名称执行预定义语句"""
+
+    def __init__(self, raw, backend):
+        self._raw = raw
+        self._backend = backend
+
+    def execute(self, sql, params=()):
+        return self._execute('sql', sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._execute_many('sql', sql, seq_of_params)
+
+    def run(self, statement, params=()):
+        return self._execute(statement, statement_sql(statement, self._backend.name), params)
+
+    def run_many(self, statement, seq_of_params):
+        return self._execute_many(statement, statement_sql(statement, self._backend.name), seq_of_params)
+
+    # 耗时按预定义语句名统计，直接执行的SQL统一记为 sql
+    def _execute(self, label, sql, params):
+        with DB_QUERY_SECONDS.time(label):
+            try:
+                self._raw.execute(self._backend.translate(sql), params)
+            except self._backend.integrity_error as e:
+                raise IntegrityError(str(e)) from e
+        return self
+
+    def _execute_many(self, label, sql, seq_of_params):
+        with DB_QUERY_SECONDS.time(label):
+            try:
+                self._raw.executemany(self._backend.translate(sql), seq_of_params)
+            except self._backend.integrity_error as e:
+                raise IntegrityError(str(e)) from e
+        return self
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    def close(self):
+        self._raw.close()
+
+
+class ConnectionPool:
+    """有界连接池
+
+    常驻 size 个连接，最多再临时创建 max_overflow 个；连接池耗尽时最多等待
+    timeout 秒。连接存活超过 recycle 秒会被重建，空闲超过 ping_interval 秒的
+    连接在借出前先做一次 ping。
+    """
+
+    def __init__(self, backend, size=5, max_overflow=5, recycle=300, timeout=10, ping_interval=30):
+        self.backend = backend
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        # 后进先出，优先复用刚归还的热连接
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._total = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = {
+            'acquired': 0,
+            'created': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0
+        }
+
+    def _create(self):
+        conn = _PooledConnection(self.backend.connect())
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._total -= 1
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._total < self.size + self.max_overflow:
+                self._total += 1
+                return True
+            return False
+
+    def _checkout_idle(self, block):
+        try:
+            return self._idle.get(block=block, timeout=self.timeout if block else None)
+        except queue.Empty:
+            return None
+
+    def _ensure_healthy(self, conn):
+        now = time.monotonic()
+        if now - conn.created_at > self.recycle:
+            with self._lock:
+                self._stats['recycled'] += 1
+            return self._replace(conn)
+        if now - conn.last_used > self.ping_interval:
+            try:
+                self.backend.ping(conn.raw)
+            except Exception as e:
+                logger.warning(f"数据库连接健康检查失败，重新建立连接: {str(e)}")
+                with self._lock:
+                    self._stats['ping_failures'] += 1
+                return self._replace(conn)
+        return conn
+
+    def _replace(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        try:
+            return self._create()
+        except Exception:
+            with self._lock:
+                self._total -= 1
+            raise
+
+    def acquire(self):
+        started = time.perf_counter()
+        conn = self._checkout_idle(block=False)
+        if conn is None:
+            if self._reserve_slot():
+                try:
+                    conn = self._create()
+                except Exception:
+                    with self._lock:
+                        self._total -= 1
+                    raise
+            else:
+                with self._lock:
+                    self._waiting += 1
+                conn = self._checkout_idle(block=True)
+                waited = time.perf_counter() - started
+                with self._lock:
+                    self._waiting -= 1
+                    self._stats['waits'] += 1
+                    self._stats['wait_seconds'] += waited
+                    self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+                    if conn is None:
+                        self._stats['timeouts'] += 1
+                if conn is None:
+                    raise PoolTimeout(f"等待数据库连接超过{self.timeout}秒")
+
+        conn = self._ensure_healthy(conn)
+        with self._lock:
+            self._in_use += 1
+            self._stats['acquired'] += 1
+        return conn
+
+    def release(self, conn, broken=False):
+        with self._lock:
+            self._in_use -= 1
+            # 没有等待者时溢出连接用完即关闭，池中只保留 size 个常驻连接
+            overflow = self._total > self.size and self._waiting == 0
+        if broken or overflow:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics.update({
+                'backend': self.backend.name,
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'total': self._total,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize()
+            })
+        return metrics
+
+
+class Database:
+    """应用使用的数据库入口"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @property
+    def backend(self):
+        return self.pool.backend
+
+    @classmethod
+    def from_config(cls, config):
+        if config.get('DB_BACKEND', 'mysql') == 'sqlite':
+            backend = SQLiteBackend(config.get('SQLITE_PATH', 'app.sqlite3'))
+        else:
+            backend = MySQLBackend(
+                host=config.get('MYSQL_HOST', 'localhost'),
+                user=config.get('MYSQL_USER', 'root'),
+                password=config.get('MYSQL_PASSWORD', ''),
+                database=config.get('MYSQL_DB', ''),
+                port=config.get('MYSQL_PORT', 3306)
+            )
+        pool = ConnectionPool(
+            backend,
+            size=config.get('MYSQL_POOL_SIZE', 5),
+            max_overflow=config.get('MYSQL_POOL_MAX_OVERFLOW', 5),
+            recycle=config.get('MYSQL_POOL_RECYCLE', 300),
+            timeout=config.get('MYSQL_POOL_TIMEOUT', 10)
+        )
+        return cls(pool)
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            yield conn.raw
+        except Exception:
+            try:
+                conn.raw.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.pool.release(conn, broken=broken)
+
+    @contextmanager
+    def cursor(self, commit=False):
+        """借出连接并返回游标，退出时关闭游标、归还连接
+
+        commit=True 时正常退出会提交事务，出现异常则回滚。
+        """
+        with self.connection() as raw:
+            cur = Cursor(raw.cursor(), self.backend)
+            try:
+                yield cur
+                if commit:
+                    raw.commit()
+                else:
+                    # 只读操作也结束事务，避免连接归还后仍持有旧的一致性快照
+                    raw.rollback()
+            finally:
+                cur.close()
+
+    def metrics(self):
+        return self.pool.metrics()
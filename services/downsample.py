@@ -0,0 +1,121 @@
+"""时间序列降采样与多分辨率金字塔
+
+图表只需要与像素宽度相当的点数。每条序列按 x 排序后预先逐级用 min-max 降采样
+（每级点数约为上一级的 1/factor，保留峰谷），查询时取可见窗口内点数仍足够的最粗一级，
+再用 LTTB 或 min-max 精确降到目标点数，耗时与目标点数成正比，而不是与全量成正比。
+返回的都是原序列中的行号，调用方可据此附带每个点的其余字段。
+"""
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+# 选用的金字塔级别在可见窗口内至少要有目标点数的这么多倍，给最终降采样留出挑选余地
+OVERSAMPLE = 4
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets：保留视觉形状的降采样，返回选中点的下标"""
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold <= 2:
+        return np.array([0, n - 1])
+
+    # 第0个与最后一个点固定保留，中间 n-2 个点均分为 threshold-2 个桶
+    every = (n - 2) / (threshold - 2)
+    bounds = (np.arange(threshold - 1) * every).astype(np.intp) + 1
+    bounds[-1] = n - 1
+    # 用前缀和求每个桶的平均点
+    cum_x = np.r_[0.0, np.cumsum(x)]
+    cum_y = np.r_[0.0, np.cumsum(y)]
+    sizes = np.diff(bounds)
+    mean_x = (cum_x[bounds[1:]] - cum_x[bounds[:-1]]) / sizes
+    mean_y = (cum_y[bounds[1:]] - cum_y[bounds[:-1]]) / sizes
+    mean_x = np.r_[mean_x, x[n - 1]]
+    mean_y = np.r_[mean_y, y[n - 1]]
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        ax, ay = x[a], y[a]
+        # 与上一个选中点、下一个桶的平均点构成的三角形面积最大的点
+        area = np.abs((ax - mean_x[i + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i + 1] - ay))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x, y, threshold):
+    """每个桶保留最小值和最大值所在的点，适合尖峰较多的序列"""
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    buckets = max(threshold // 2 - 1, 1)
+    bounds = np.linspace(1, n - 1, buckets + 1).astype(np.intp)
+    picked = [0, n - 1]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end > start:
+            segment = y[start:end]
+            picked.append(start + int(np.argmin(segment)))
+            picked.append(start + int(np.argmax(segment)))
+    return np.unique(picked)
+
+
+def _coarsen(y, factor):
+    """构建金字塔的下一级：每 2*factor 个点保留最小值和最大值（全向量化），首尾点保留"""
+    n = len(y)
+    size = 2 * factor
+    buckets = (n - 2) // size
+    body = y[1:1 + buckets * size].reshape(buckets, size)
+    starts = 1 + np.arange(buckets) * size
+    return np.unique(np.r_[0, starts + body.argmin(axis=1), starts + body.argmax(axis=1),
+                           np.arange(1 + buckets * size, n)])
+
+
+class SeriesPyramid:
+    """一条 (x, y) 序列的多分辨率金字塔"""
+
+    def __init__(self, x, y, factor=4, min_points=256):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        self.order = valid[np.argsort(x[valid], kind='stable')]
+        self.x = x[self.order]
+        self.y = y[self.order]
+
+        # 每一级保存相对排序后序列的下标及对应的 x，便于二分查找可见窗口
+        finest = np.arange(len(self.x))
+        self.levels = [finest]
+        while len(self.levels[-1]) > min_points * factor:
+            level = self.levels[-1]
+            self.levels.append(level[_coarsen(self.y[level], factor)])
+        self.level_x = [self.x[level] for level in self.levels]
+
+    def __len__(self):
+        return len(self.x)
+
+    def _window(self, level, x_from, x_to):
+        xs = self.level_x[level]
+        lo = 0 if x_from is None else np.searchsorted(xs, x_from, side='left')
+        hi = len(xs) if x_to is None else np.searchsorted(xs, x_to, side='right')
+        return lo, hi
+
+    def query(self, points, x_from=None, x_to=None, method='lttb'):
+        """返回 (原序列行号, 使用的金字塔级别, 窗口内的原始点数)"""
+        reduce = minmax if method == 'minmax' else lttb
+        lo, hi = self._window(0, x_from, x_to)
+        in_window = hi - lo
+
+        # 从最粗的一级开始，找到窗口内点数足够的一级
+        chosen = 0
+        for level in range(len(self.levels) - 1, 0, -1):
+            level_lo, level_hi = self._window(level, x_from, x_to)
+            if level_hi - level_lo >= points * OVERSAMPLE:
+                chosen, lo, hi = level, level_lo, level_hi
+                break
+
+        candidates = self.levels[chosen][lo:hi]
+        keep = reduce(self.x[candidates], self.y[candidates], points)
+        return self.order[candidates[keep]], chosen, int(in_window)
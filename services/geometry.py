@@ -0,0 +1,172 @@
+"""文化传播路线的几何预处理
+
+culture_spread.json 每个数据版本只处理一次：相邻两点之间按大圆插值成弧线，
+再对每个缩放级别用 Douglas-Peucker 预先算好保留的点，坐标以 float32 数组保存；
+样式按路线类型共享，每条路线只记样式名。查询时按时代和可见范围筛选路线，
+只返回当前缩放级别需要的点，路线再多，页面收到的点数也只与可见范围和缩放相关。
+"""
+import math
+
+import numpy as np
+
+# 大圆插值的最大步长（度）
+ARC_STEP = 2.0
+# 缩放级别 -> Douglas-Peucker 容差（度）；级别每加一，地图放大一倍，容差减半
+ZOOM_TOLERANCES = tuple(0.5 / 2 ** level for level in range(5))
+MAX_ZOOM = len(ZOOM_TOLERANCES) - 1
+# 输出坐标保留的小数位数，约百米精度
+PRECISION = 3
+
+# 朝代先后，用于 '唐-元' 这类时代区间的判断
+DYNASTIES = ('先秦', '秦', '汉', '三国', '晋', '南北朝', '隋', '唐', '五代', '宋', '元', '明', '清')
+
+# 动效与样式在所有路线间共享，只随结果发送一份
+EFFECT = {
+    'show': True,
+    'period': 6,
+    'trailLength': 0.7,
+    'color': '#fff',
+    'symbolSize': 3
+}
+# 路线类型 -> 线条样式
+STYLES = {
+    '陆路': {'color': '#7b8d6d', 'width': 2},
+    '海路': {'color': '#4a7a96', 'width': 2},
+    '混合路线': {'color': '#a0522d', 'width': 2, 'type': 'dashed'},
+}
+DEFAULT_STYLE = '陆路'
+
+
+def great_circle(path, step=ARC_STEP):
+    """把经纬度折线的每一段按大圆插值，返回 (n, 2) 的 float64 数组"""
+    points = np.radians(np.asarray(path, dtype=np.float64).reshape(-1, 2))
+    lon, lat = points[:, 0], points[:, 1]
+    xyz = np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+    pieces = [xyz[:1]]
+    for a, b in zip(xyz[:-1], xyz[1:]):
+        angle = math.acos(max(-1.0, min(1.0, float(np.dot(a, b)))))
+        steps = max(1, math.ceil(math.degrees(angle) / step))
+        t = np.linspace(0, 1, steps + 1)[1:, None]
+        if angle < 1e-9:
+            pieces.append(np.repeat(b[None, :], steps, axis=0))
+            continue
+        # 球面线性插值
+        pieces.append((np.sin((1 - t) * angle) * a + np.sin(t * angle) * b) / math.sin(angle))
+    xyz = np.concatenate(pieces)
+
+    lon = np.unwrap(np.arctan2(xyz[:, 1], xyz[:, 0]))
+    lat = np.arcsin(np.clip(xyz[:, 2], -1, 1))
+    return np.degrees(np.column_stack((lon, lat)))
+
+
+def significance(coords, min_tolerance=ZOOM_TOLERANCES[-1]):
+    """一趟 Douglas-Peucker 求出每个点在多大容差下仍会保留（首尾为无穷大）
+
+    某个容差下的简化结果即 significance > 容差 的那些点，各缩放级别不必分别重算；
+    低于最小容差的点不再细分，记为0。
+    """
+    n = len(coords)
+    result = np.zeros(n)
+    result[0] = result[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, end, limit = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = coords[start], coords[end]
+        segment = coords[start + 1:end]
+        dx, dy = b - a
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distance = np.hypot(segment[:, 0] - a[0], segment[:, 1] - a[1])
+        else:
+            # 各点到弦的垂直距离
+            distance = np.abs(dx * (segment[:, 1] - a[1]) - dy * (segment[:, 0] - a[0])) / length
+        i = int(np.argmax(distance))
+        if distance[i] <= min_tolerance:
+            continue
+        middle = start + 1 + i
+        # 父段在更小的容差下才会被拆开时，子段的点也不可能更早出现
+        value = min(float(distance[i]), limit)
+        result[middle] = value
+        stack.append((start, middle, value))
+        stack.append((middle, end, value))
+    return result
+
+
+def era_span(era):
+    """'唐-元' -> (7, 10)；不在朝代表中的时代返回 None"""
+    parts = [part.strip() for part in (era or '').split('-')]
+    if not all(part in DYNASTIES for part in parts):
+        return None
+    indexes = [DYNASTIES.index(part) for part in parts]
+    return min(indexes), max(indexes)
+
+
+class RouteGeometry:
+    def __init__(self, spread):
+        self.routes = []
+        # 每条路线：插值后的 float32 坐标、各缩放级别保留的下标、外包框、时代区间
+        self.coords = []
+        self.levels = []
+        self.bboxes = []
+        self.spans = []
+        for route in spread.get('routes', []):
+            path = route.get('path') or []
+            if len(path) < 2:
+                continue
+            dense = great_circle(path)
+            self.routes.append({key: value for key, value in route.items() if key != 'path'})
+            self.coords.append(dense.astype(np.float32))
+            weight = significance(dense)
+            self.levels.append([np.flatnonzero(weight > tolerance) for tolerance in ZOOM_TOLERANCES])
+            self.bboxes.append((*dense.min(axis=0), *dense.max(axis=0)))
+            self.spans.append(era_span(route.get('era')))
+        self.bboxes = np.asarray(self.bboxes, dtype=np.float32).reshape(-1, 4)
+
+    def eras(self):
+        return sorted({route.get('era') for route in self.routes if route.get('era')})
+
+    def _matches_era(self, i, era):
+        if era is None:
+            return True
+        if era == self.routes[i].get('era'):
+            return True
+        span, wanted = self.spans[i], era_span(era)
+        if span is None or wanted is None:
+            return False
+        # 区间有重叠即算该时代在用的路线
+        return wanted[0] <= span[1] and span[0] <= wanted[1]
+
+    def query(self, era=None, bbox=None, zoom=MAX_ZOOM):
+        """按时代与可见范围 (west, south, east, north) 筛选路线，坐标按缩放级别简化"""
+        zoom = max(0, min(int(zoom), MAX_ZOOM))
+        candidates = np.arange(len(self.routes))
+        if bbox is not None and len(candidates):
+            west, south, east, north = bbox
+            b = self.bboxes
+            candidates = np.flatnonzero((b[:, 0] <= east) & (b[:, 2] >= west) & (b[:, 1] <= north) & (b[:, 3] >= south))
+
+        routes = []
+        used_styles = set()
+        points = 0
+        for i in candidates:
+            if not self._matches_era(i, era):
+                continue
+            coords = self.coords[i][self.levels[i][zoom]]
+            style = self.routes[i].get('type') if self.routes[i].get('type') in STYLES else DEFAULT_STYLE
+            used_styles.add(style)
+            points += len(coords)
+            routes.append({
+                **self.routes[i],
+                'style': style,
+                'coords': np.round(coords.astype(np.float64), PRECISION).tolist()
+            })
+        return {
+            'zoom': zoom,
+            'points': points,
+            'effect': EFFECT,
+            'styles': {name: STYLES[name] for name in sorted(used_styles)},
+            'routes': routes
+        }
@@ -0,0 +1,376 @@
+"""图片派生版本与按需缩放
+
+`python fix_image_names.py` 为 static/images 下的每张位图预先生成若干宽度的
+AVIF/WebP 以及原格式版本，清单写入派生目录的 derivatives.json。
+运行时 /img/<name>?w= 按浏览器 Accept 头选择格式，请求宽度向上取整到固定档位
+（不放大原图）：有预生成版本时直接发送，否则现场缩放并写入容量有限、
+按最近使用淘汰的磁盘缓存。模板通过 image_srcset() 输出 srcset。
+
+Pillow 为可选依赖，未安装时不生成派生版本，/img/ 直接转到原图。
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow为可选依赖，未安装时只提供原图
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'derivatives.json'
+RASTER_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+# 宽度档位：请求的宽度向上取整到档位，缓存的组合数量因此有限
+WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+# 按优先顺序排列的现代格式
+MODERN_FORMATS = ('avif', 'webp')
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg', 'png': 'image/png'}
+EXTENSIONS = {'avif': '.avif', 'webp': '.webp', 'jpeg': '.jpg', 'png': '.png'}
+SAVE_OPTIONS = {
+    'avif': {'quality': 50, 'speed': 8},
+    'webp': {'quality': 78, 'method': 6},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'optimize': True}
+}
+
+
+class ImageNotFound(Exception):
+    """图片不存在或不是可缩放的位图"""
+
+
+def supported_formats():
+    """当前 Pillow 能编码的现代格式"""
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in MODERN_FORMATS if features.check(fmt))
+
+
+def _source_version(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _original_format(rel):
+    return 'png' if posixpath.splitext(rel)[1].lower() == '.png' else 'jpeg'
+
+
+def candidate_widths(original_width, widths=WIDTHS):
+    """小于原图宽度的档位，再加上原图宽度本身"""
+    return [w for w in widths if w < original_width] + [original_width]
+
+
+def snap_width(width, original_width, widths=WIDTHS):
+    """请求宽度向上取整到档位；不小于原图宽度时返回原图宽度"""
+    for w in widths:
+        if width <= w < original_width:
+            return w
+    return original_width
+
+
+def render(source_path, width, fmt):
+    """把原图缩放到指定宽度并编码为 fmt，返回字节串"""
+    with Image.open(source_path) as image:
+        if image.format == 'JPEG':
+            # 大幅缩小时让解码器直接按 1/2、1/4、1/8 解码，省去大部分解码开销
+            image.draft('RGB', (width, max(1, image.height * width // image.width)))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if fmt == 'jpeg' or not has_alpha:
+            image = image.convert('RGB')
+        elif image.mode != 'RGBA':
+            image = image.convert('RGBA')
+        if width < image.width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+        return buffer.getvalue()
+
+
+def derivative_name(rel, width, fmt):
+    stem = posixpath.splitext(rel)[0]
+    return f"{stem}-{width}w{EXTENSIONS[fmt]}"
+
+
+def _list_images(images_dir):
+    for root, dirs, names in os.walk(images_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if posixpath.splitext(name)[1].lower() in RASTER_EXTENSIONS:
+                full = os.path.join(root, name)
+                yield os.path.relpath(full, images_dir).replace(os.sep, '/'), full
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_derivatives(images_dir, output_dir, widths=WIDTHS):
+    """为全部位图生成派生版本，源文件未变化的图片沿用上次的结果；返回 (生成数, 沿用数)"""
+    if Image is None:
+        raise RuntimeError("生成图片派生版本需要安装 Pillow")
+    formats = supported_formats()
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    entries = {}
+    built = reused = 0
+    for rel, full in _list_images(images_dir):
+        version = _source_version(full)
+        old = previous.get(rel)
+        if (old and old['source_version'] == version and list(old['widths']) == candidate_widths(old['width'], widths)
+                and all(fmt in old['formats'] for fmt in formats)):
+            entries[rel] = old
+            reused += 1
+            continue
+        try:
+            with Image.open(full) as image:
+                original_width, original_height = ImageOps.exif_transpose(image).size
+            entry_formats = list(formats) + [_original_format(rel)]
+            entry_widths = candidate_widths(original_width, widths)
+            for width in entry_widths:
+                for fmt in entry_formats:
+                    _write(os.path.join(output_dir, derivative_name(rel, width, fmt)), render(full, width, fmt))
+        except (OSError, ValueError) as e:
+            logger.warning(f"图片 {rel} 无法生成派生版本: {str(e)}")
+            continue
+        entries[rel] = {
+            'source_version': version,
+            'width': original_width,
+            'height': original_height,
+            'widths': entry_widths,
+            'formats': entry_formats
+        }
+        built += 1
+
+    _write(manifest_path, json.dumps(entries, ensure_ascii=False, indent=1).encode('utf-8'))
+    return built, reused
+
+
+class DiskCache:
+    """容量有限的磁盘缓存，超出容量时删除最久未使用的文件
+
+    每个进程各自维护使用顺序；其他进程生成的文件直接复用，删除了的文件按未命中处理。
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 文件名 -> 字节数，按最近使用排列
+        self._entries = OrderedDict()
+        self._size = 0
+        # 同一文件只由一个线程生成
+        self._building = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        existing = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.tmp'):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            existing.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        # 至少保留刚写入的文件，单个文件超过容量时也能发送
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _lookup(self, name):
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                if name in self._entries:
+                    self._size -= self._entries.pop(name)
+                return None
+            if name not in self._entries:
+                # 其他进程生成的文件
+                self._entries[name] = size
+                self._size += size
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return path
+
+    def get_or_create(self, name, produce):
+        """返回缓存文件路径，不存在时调用 produce() 生成内容后写入"""
+        path = self._lookup(name)
+        if path is not None:
+            return path
+
+        with self._lock:
+            building = self._building.setdefault(name, threading.Lock())
+        try:
+            with building:
+                path = self._lookup(name)
+                if path is not None:
+                    return path
+                data = produce()
+                path = os.path.join(self.directory, name)
+                _write(path, data)
+                with self._lock:
+                    self.misses += 1
+                    self._size -= self._entries.pop(name, 0)
+                    self._entries[name] = len(data)
+                    self._size += len(data)
+                    self._evict()
+                return path
+        finally:
+            with self._lock:
+                self._building.pop(name, None)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class ImagePipeline:
+    def __init__(self, images_dir, derivatives_dir, cache_dir, max_cache_bytes):
+        self.images_dir = images_dir
+        self.derivatives_dir = derivatives_dir
+        self.formats = supported_formats()
+        self.enabled = Image is not None
+        self.cache = DiskCache(cache_dir, max_cache_bytes) if self.enabled else None
+        self.derivatives = self._load_manifest()
+        # 原路径 -> (源文件版本, 原图宽度)，只读取图片头部
+        self._widths = {}
+        self._lock = threading.Lock()
+
+    def _load_manifest(self):
+        """读取预生成清单，丢弃生成后源文件又被修改的条目"""
+        path = os.path.join(self.derivatives_dir, MANIFEST_NAME)
+        if not self.enabled or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"图片派生清单不可用: {str(e)}")
+            return {}
+        fresh = {}
+        for rel, entry in entries.items():
+            try:
+                if _source_version(os.path.join(self.images_dir, rel)) == entry['source_version']:
+                    fresh[rel] = entry
+            except OSError:
+                continue
+        logger.info(f"已加载图片派生清单，共 {len(fresh)} 张图片")
+        return fresh
+
+    def source_path(self, rel):
+        """校验图片名并返回原图路径"""
+        rel = posixpath.normpath(rel)
+        if rel.startswith(('..', '/')) or posixpath.splitext(rel)[1].lower() not in RASTER_EXTENSIONS:
+            raise ImageNotFound(rel)
+        path = os.path.join(self.images_dir, *rel.split('/'))
+        if not os.path.isfile(path):
+            raise ImageNotFound(rel)
+        return rel, path
+
+    def original_width(self, rel, path):
+        version = _source_version(path)
+        entry = self.derivatives.get(rel)
+        if entry is not None and entry['source_version'] == version:
+            return entry['width']
+        with self._lock:
+            cached = self._widths.get(rel)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        try:
+            with Image.open(path) as image:
+                width = ImageOps.exif_transpose(image).width
+        except (OSError, ValueError):
+            raise ImageNotFound(rel)
+        with self._lock:
+            self._widths[rel] = (version, width)
+        return width
+
+    def widths(self, rel):
+        """srcset 可用的宽度档位；无法缩放时返回空列表"""
+        if not self.enabled:
+            return []
+        try:
+            rel, path = self.source_path(rel)
+            return candidate_widths(self.original_width(rel, path))
+        except (ImageNotFound, OSError):
+            return []
+
+    def negotiate(self, rel, accept_mimetypes):
+        """按 Accept 头选择格式，浏览器都不支持时使用原格式
+
+        只认明确列出的类型：*/* 不代表浏览器能解码 AVIF/WebP。
+        """
+        listed = {value for value, quality in accept_mimetypes if quality > 0}
+        for fmt in self.formats:
+            if MIMETYPES[fmt] in listed:
+                return fmt
+        return _original_format(rel)
+
+    def get(self, rel, width, fmt):
+        """返回 (文件路径, MIME类型, ETag)"""
+        rel, path = self.source_path(rel)
+        version = _source_version(path)
+        width = snap_width(width, self.original_width(rel, path))
+        etag = hashlib.sha1(f"{rel}:{version}:{width}:{fmt}".encode('utf-8')).hexdigest()[:20]
+
+        entry = self.derivatives.get(rel)
+        if entry is not None and entry['source_version'] == version and width in entry['widths'] \
+                and fmt in entry['formats']:
+            prebuilt = os.path.join(self.derivatives_dir, derivative_name(rel, width, fmt))
+            if os.path.exists(prebuilt):
+                return prebuilt, MIMETYPES[fmt], etag
+
+        # 缓存文件名包含源文件版本，原图修改后旧版本自然被淘汰
+        name = f"{hashlib.sha1(rel.encode('utf-8')).hexdigest()[:16]}-{version[0]}-{version[1]}-{width}{EXTENSIONS[fmt]}"
+        cached = self.cache.get_or_create(name, lambda: render(path, width, fmt))
+        return cached, MIMETYPES[fmt], etag
+
+    def metrics(self):
+        if not self.enabled:
+            return {'enabled': False}
+        return {
+            'enabled': True,
+            'formats': list(self.formats),
+            'prebuilt_images': len(self.derivatives),
+            'cache': self.cache.metrics()
+        }
@@ -0,0 +1,375 @@
+"""大模型流式问答代理
+
+- 复用 keep-alive 连接的 HTTP 会话，设置连接/读取超时
+- 每个进程限制同时进行的上游请求数，超出时排队，排队已满或等待超时返回 429
+- 以标准 SSE 格式（data: ...\\n\\n）转发给浏览器
+- 对归一化后相同的问题缓存完整答案（TTL + LRU）
+- ASGI 模式下由 AsyncLLMProxy 以协程方式转发，共用同一份配置、缓存与统计
+"""
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.metrics import LLM_FIRST_TOKEN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """并发已满且排队已满或等待超时"""
+
+
+def sse_event(data):
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?？!！。.,，~～]+$')
+
+
+def normalize_question(question):
+    """归一化问题文本，用作答案缓存的键"""
+    text = unicodedata.normalize('NFKC', question).strip().lower()
+    text = _WHITESPACE.sub(' ', text)
+    return _TRAILING_PUNCTUATION.sub('', text)
+
+
+class AnswerCache:
+    """带过期时间的LRU答案缓存"""
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, answer):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class _Stream:
+    """SSE响应体；无论是否被迭代，close() 时都会释放并发名额"""
+
+    def __init__(self, generator, release):
+        self._generator = generator
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return self._generator
+
+    def close(self):
+        try:
+            self._generator.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class LLMProxy:
+    def __init__(self, url, api_key, model, system_prompt='', max_tokens=4096, temperature=0.5, top_k=4,
+                 pool_size=10, connect_timeout=5, read_timeout=60,
+                 max_concurrent=8, max_queue=16, queue_timeout=5,
+                 cache_entries=256, cache_ttl=3600):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.cache = AnswerCache(cache_entries, cache_ttl)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+        self._stats = {'requests': 0, 'rejected': 0, 'upstream_errors': 0, 'cache_hits': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    # ---------- 并发控制 ----------
+
+    def _acquire(self):
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            # 没有空闲名额时排队等待，排队人数有上限
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self._stats['rejected'] += 1
+                    raise Overloaded("当前提问人数过多，请稍后再试")
+                self._waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        if not acquired:
+            self._count('rejected')
+            raise Overloaded("当前提问人数过多，请稍后再试")
+        with self._lock:
+            self._active += 1
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
+
+    # ---------- 问答 ----------
+
+    def _payload(self, question):
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        messages.append({"role": "user", "content": question})
+        return {
+            "max_tokens": self.max_tokens,
+            "top_k": self.top_k,
+            "temperature": self.temperature,
+            "messages": messages,
+            "model": self.model,
+            "stream": True  # 启用流式传输
+        }
+
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def _parse_line(line):
+        """解析上游的一行SSE，返回 (文本片段, 是否结束)"""
+        if not line.startswith('data:'):
+            return '', False
+        body = line[5:].strip()
+        if body == '[DONE]':
+            return '', True
+        json_data = json.loads(body)
+        choices = json_data.get('choices') or [{}]
+        content = choices[0].get('delta', {}).get('content', '')
+        return content, bool(choices[0].get('finish_reason'))
+
+    def _upstream_failed(self, e):
+        self._count('upstream_errors')
+        logger.error(f"大模型接口请求失败: {str(e)}")
+        return sse_event({"error": f"API请求失败: {str(e)}"})
+
+    def _upstream(self, question, cache_key):
+        """请求上游并转发为SSE事件，完整答案写入缓存"""
+        parts = []
+        finished = False
+        started = time.perf_counter()
+        try:
+            with self.session.post(self.url, headers=self._headers(), json=self._payload(question),
+                                   stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    content, finished = self._parse_line(line.decode('utf-8'))
+                    if content:
+                        if not parts:
+                            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, 'sync')
+                        parts.append(content)
+                        yield sse_event({"content": content})
+                    if finished:
+                        break
+        except Exception as e:
+            yield self._upstream_failed(e)
+            return
+
+        if finished:
+            self.cache.put(cache_key, ''.join(parts))
+        yield sse_event({"status": "done"})
+
+    def _cached(self, answer):
+        yield sse_event({"content": answer})
+        yield sse_event({"status": "done"})
+
+    def _lookup(self, question):
+        """统计请求并查询答案缓存，返回 (缓存键, 缓存的答案或None)"""
+        self._count('requests')
+        cache_key = normalize_question(question)
+        answer = self.cache.get(cache_key)
+        if answer is not None:
+            self._count('cache_hits')
+        return cache_key, answer
+
+    def stream(self, question):
+        """返回问题答案的SSE响应体；并发已满时抛出 Overloaded"""
+        cache_key, answer = self._lookup(question)
+        if answer is not None:
+            return self._cached(answer)
+
+        self._acquire()
+        return _Stream(self._upstream(question, cache_key), self._release)
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics.update({'active': self._active, 'waiting': self._waiting})
+        metrics['cache'] = self.cache.stats()
+        return metrics
+
+
+class _AsyncStream:
+    """异步SSE响应体；aclose() 时释放并发名额"""
+
+    def __init__(self, generator, release):
+        self._generator = generator
+        self._release = release
+        self._released = False
+
+    def __aiter__(self):
+        return self._generator
+
+    async def aclose(self):
+        try:
+            await self._generator.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class AsyncLLMProxy:
+    """ASGI 模式下的异步问答代理
+
+    上游请求使用 httpx 异步客户端，并发名额是事件循环内的信号量，等待上游时
+    不占用线程，一个进程可以同时保持数百个流式回答。客户端和信号量绑定到
+    事件循环，需在 lifespan 启动时调用 start()。
+    """
+
+    def __init__(self, proxy, max_concurrent=256, max_queue=512, queue_timeout=None):
+        self.proxy = proxy
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = proxy.queue_timeout if queue_timeout is None else queue_timeout
+        self._client = None
+        self._slots = None
+        self._active = 0
+        self._waiting = 0
+
+    async def start(self):
+        import httpx
+        connect_timeout, read_timeout = self.proxy.timeout
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=self.max_concurrent,
+                                max_keepalive_connections=self.max_concurrent)
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _acquire(self):
+        if self._slots.locked():
+            if self._waiting >= self.max_queue:
+                self.proxy._count('rejected')
+                raise Overloaded("当前提问人数过多，请稍后再试")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.proxy._count('rejected')
+                raise Overloaded("当前提问人数过多，请稍后再试")
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+        self._active += 1
+
+    def _release(self):
+        self._active -= 1
+        self._slots.release()
+
+    async def _upstream(self, question, cache_key):
+        proxy = self.proxy
+        parts = []
+        finished = False
+        started = time.perf_counter()
+        try:
+            async with self._client.stream('POST', proxy.url, headers=proxy._headers(),
+                                           json=proxy._payload(question)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    content, finished = proxy._parse_line(line)
+                    if content:
+                        if not parts:
+                            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, 'async')
+                        parts.append(content)
+                        yield sse_event({"content": content})
+                    if finished:
+                        break
+        except Exception as e:
+            yield proxy._upstream_failed(e)
+            return
+
+        if finished:
+            proxy.cache.put(cache_key, ''.join(parts))
+        yield sse_event({"status": "done"})
+
+    async def _cached(self, answer):
+        for event in self.proxy._cached(answer):
+            yield event
+
+    async def stream(self, question):
+        """返回异步迭代的SSE响应体；并发已满时抛出 Overloaded"""
+        cache_key, answer = self.proxy._lookup(question)
+        if answer is not None:
+            return _AsyncStream(self._cached(answer), lambda: None)
+
+        await self._acquire()
+        return _AsyncStream(self._upstream(question, cache_key), self._release)
+
+    def metrics(self):
+        return {'active': self._active, 'waiting': self._waiting, 'max_concurrent': self.max_concurrent}
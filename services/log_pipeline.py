@@ -0,0 +1,209 @@
+"""日志管道
+
+请求线程只把日志记录放入内存队列（QueueHandler），由后台线程（QueueListener）
+写文件和控制台，请求路径上没有阻塞的文件写入。文件按大小或时间轮转，每行一条
+JSON；队列满时丢弃并计数而不是阻塞。同一条 INFO 及以下级别的消息在一个采样
+窗口内只写前几次，其余只计数，下一次写出时附带被省略的条数。
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key in ('method', 'path', 'suppressed'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """在产生日志的线程里记下当前请求的方法与路径（后台线程拿不到请求上下文）"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """同一条消息（按日志器、级别、消息模板区分）每个窗口最多放行 burst 次"""
+
+    def __init__(self, burst=10, interval=60.0, max_level=logging.INFO, max_keys=10000):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self.max_keys = max_keys
+        # 键 -> [窗口起点, 窗口内已放行次数, 被省略次数]，按最近使用排列
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.pop(key, None)
+            if window is None or now - window[0] >= self.interval:
+                skipped = window[2] if window else 0
+                window = [now, 0, 0]
+                if skipped:
+                    record.suppressed = skipped
+            self._windows[key] = window
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录并计数，不阻塞请求线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record):
+        """在当前线程把消息格式化好（参数对象之后可能被修改），异常堆栈单独保留给JSON输出"""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(text):
+    """'werkzeug=WARNING,services.db=DEBUG' -> {'werkzeug': 'WARNING', 'services.db': 'DEBUG'}"""
+    levels = {}
+    for item in (text or '').split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def file_handler(path, max_bytes, backup_count, when):
+    """when 为空按大小轮转，否则按时间轮转（如 midnight、H）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=when, backupCount=backup_count, encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+
+
+class LogPipeline:
+    def __init__(self, level='INFO', console_level=None, path='app.log', max_bytes=10 * 1024 * 1024,
+                 backup_count=5, when='', json_lines=True, levels=None,
+                 queue_size=10000, sample_burst=10, sample_interval=60.0, logger=None):
+        """logger 为挂载的日志器，默认为根日志器"""
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.addFilter(RequestContextFilter())
+        self.sampler = SamplingFilter(sample_burst, sample_interval)
+        self.handler.addFilter(self.sampler)
+
+        handlers = []
+        if path:
+            # 多进程部署时每个进程各写一个文件，避免轮转时互相覆盖
+            target = file_handler(path.format(pid=os.getpid()), max_bytes, backup_count, when)
+            target.setFormatter(JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+            handlers.append(target)
+        console = logging.StreamHandler()
+        console.setLevel(console_level or level)
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console)
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+
+        target_logger = logger or logging.getLogger()
+        for old in target_logger.handlers[:]:
+            target_logger.removeHandler(old)
+            old.close()
+        target_logger.setLevel(level)
+        target_logger.addHandler(self.handler)
+        for name, logger_level in (levels or {}).items():
+            logging.getLogger(name).setLevel(logger_level)
+        self.listener.start()
+        self._closed = False
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        return cls(
+            level=environ.get('LOG_LEVEL', 'INFO').upper(),
+            console_level=environ.get('LOG_CONSOLE_LEVEL', '').upper() or None,
+            path=environ.get('LOG_FILE', 'app.log'),
+            max_bytes=int(environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            backup_count=int(environ.get('LOG_BACKUP_COUNT', 5)),
+            when=environ.get('LOG_ROTATE_WHEN', ''),
+            json_lines=environ.get('LOG_FORMAT', 'json') == 'json',
+            levels=parse_levels(environ.get('LOG_LEVELS', '')),
+            queue_size=int(environ.get('LOG_QUEUE_SIZE', 10000)),
+            sample_burst=int(environ.get('LOG_SAMPLE_BURST', 10)),
+            sample_interval=float(environ.get('LOG_SAMPLE_INTERVAL', 60))
+        )
+
+    def metrics(self):
+        return {
+            'enqueued': self.handler.enqueued,
+            'dropped': self.handler.dropped,
+            'suppressed': self.sampler.suppressed,
+            'queue_size': self.queue.qsize()
+        }
+
+    def close(self):
+        """写完队列中剩余的记录后停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
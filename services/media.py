@@ -0,0 +1,99 @@
+"""视频等大文件的按字节范围发送
+
+每个文件的元数据（大小、修改时间、ETag、MIME类型）缓存在内存中，
+check_interval 秒内不重复 stat。请求按 Range 头只发送需要的字节：
+范围一直到文件末尾时交给服务器的 wsgi.file_wrapper（gunicorn 等会用
+sendfile 零拷贝发送），其余情况通过 mmap 分块输出，每个连接只占用一个块的内存，
+数据来自操作系统页缓存，多个观看者共享。
+"""
+import mimetypes
+import mmap
+import os
+import posixpath
+import threading
+import time
+from collections import namedtuple
+
+MediaInfo = namedtuple('MediaInfo', 'path size mtime etag mimetype checked_at')
+
+
+class MediaNotFound(Exception):
+    """媒体文件不存在"""
+
+
+class MediaLibrary:
+    def __init__(self, media_dir, check_interval=2.0, chunk_size=256 * 1024):
+        self.media_dir = media_dir
+        self.check_interval = check_interval
+        self.chunk_size = chunk_size
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def info(self, name):
+        """文件元数据；check_interval 内直接使用缓存"""
+        name = posixpath.normpath(name)
+        if name.startswith(('..', '/')):
+            raise MediaNotFound(name)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._info.get(name)
+        if cached is not None and now - cached.checked_at < self.check_interval:
+            return cached
+
+        path = os.path.join(self.media_dir, *name.split('/'))
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._info.pop(name, None)
+            raise MediaNotFound(name)
+        if not os.path.isfile(path):
+            raise MediaNotFound(name)
+
+        if cached is not None and (cached.size, cached.mtime) == (st.st_size, st.st_mtime_ns):
+            info = cached._replace(checked_at=now)
+        else:
+            info = MediaInfo(
+                path=path,
+                size=st.st_size,
+                mtime=st.st_mtime_ns,
+                etag='%x-%x' % (st.st_mtime_ns, st.st_size),
+                mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                checked_at=now
+            )
+        with self._lock:
+            self._info[name] = info
+        return info
+
+    def body(self, info, start, end, file_wrapper=None):
+        """返回 [start, end) 字节的响应体迭代器"""
+        f = open(info.path, 'rb')
+        if end == info.size and file_wrapper is not None:
+            f.seek(start)
+            return file_wrapper(f, self.chunk_size)
+        if end <= start:
+            f.close()
+            return iter(())
+        return _MappedRange(f, start, end, self.chunk_size)
+
+
+class _MappedRange:
+    """通过 mmap 分块输出文件的一段，迭代结束或连接关闭时释放映射"""
+
+    def __init__(self, f, start, end, chunk_size):
+        self._file = f
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        position = self.start
+        while position < self.end:
+            stop = min(position + self.chunk_size, self.end)
+            yield self._mmap[position:stop]
+            position = stop
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
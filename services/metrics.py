@@ -0,0 +1,166 @@
+"""运行指标（Prometheus 文本格式）
+
+不依赖 prometheus_client：直方图按标签组合保存各桶计数、总和与次数，记录一次
+只是一次加锁和一次二分查找，可以一直开着。各服务在自己的热点处记录耗时
+（数据集加载、模板渲染、数据库语句、大模型首字延迟），请求级别的耗时由
+routes/metrics_routes.py 的请求钩子记录；已有的 metrics() 字典通过回调
+导出为 gauge。
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各桶计数（不累计）..., +Inf桶计数, 总和]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = (('le', _number(bound)),)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class CallbackGauge:
+    """抓取时调用 collect()，把返回的（可嵌套的）字典中的数值展开为 gauge"""
+
+    def __init__(self, name, documentation, collect):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+
+    def _flatten(self, value, prefix, out):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self._flatten(item, f'{prefix}_{key}' if prefix else str(key), out)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out.append((prefix, value))
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for component, collect in self.collect().items():
+            values = []
+            try:
+                self._flatten(collect(), '', values)
+            except Exception:
+                continue
+            for key, value in values:
+                labels = _labels(('component', 'key'), (component, key))
+                lines.append(f'{self.name}{labels} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', '请求处理耗时（到返回响应对象为止，流式响应体不计）',
+    ('endpoint', 'method'))
+REQUESTS = REGISTRY.counter('http_requests_total', '按状态码统计的请求数', ('endpoint', 'method', 'status'))
+DATA_LOAD_SECONDS = REGISTRY.histogram('data_load_duration_seconds', '数据集加载耗时', ('dataset', 'source'))
+RENDER_SECONDS = REGISTRY.histogram('template_render_duration_seconds', 'Jinja模板渲染耗时', ('template',),
+                                    buckets=FAST_BUCKETS)
+DB_QUERY_SECONDS = REGISTRY.histogram('db_query_duration_seconds', '数据库语句执行耗时', ('statement',),
+                                      buckets=FAST_BUCKETS)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    'llm_time_to_first_token_seconds', '大模型从发出请求到收到第一段内容的耗时', ('mode',),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60))
@@ -0,0 +1,96 @@
+"""数据库结构迁移
+
+每个迁移有递增的版本号，已执行的版本记录在 schema_migrations 表中，
+启动时只执行尚未应用的迁移。
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+MIGRATIONS = [
+    (1, '创建用户表与答题分数表', [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL UNIQUE,
+            password VARCHAR(100) NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS quiz_scores (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_name VARCHAR(100) NOT NULL,
+            score INT NOT NULL,
+            total INT NOT NULL,
+            date_taken VARCHAR(20) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, '为答题记录添加 (user_name, created_at) 组合索引', [
+        'CREATE INDEX idx_quiz_scores_user_created ON quiz_scores (user_name, created_at)',
+    ]),
+    (3, '创建按用户汇总的答题统计表并回填历史数据', [
+        '''
+        CREATE TABLE IF NOT EXISTS quiz_user_stats (
+            user_name VARCHAR(100) NOT NULL PRIMARY KEY,
+            attempts INT NOT NULL DEFAULT 0,
+            best_score INT NOT NULL DEFAULT 0,
+            score_sum BIGINT NOT NULL DEFAULT 0,
+            total_sum BIGINT NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        INSERT INTO quiz_user_stats (user_name, attempts, best_score, score_sum, total_sum)
+        SELECT user_name, COUNT(*), MAX(score), SUM(score), SUM(total)
+        FROM quiz_scores GROUP BY user_name
+        ''',
+    ]),
+    (4, '为用户名添加索引，注册时的重名检查不再全表扫描（邮箱已有唯一索引）', [
+        'CREATE INDEX idx_users_name ON users (name)',
+    ]),
+    (5, '创建答题进度表，答题状态不再保存在会话cookie中', [
+        '''
+        CREATE TABLE IF NOT EXISTS quiz_attempts (
+            user_name VARCHAR(100) NOT NULL PRIMARY KEY,
+            state TEXT NOT NULL,
+            step INT NOT NULL DEFAULT 0
+        )
+        ''',
+    ]),
+    (6, '用户名改为唯一索引，并发注册同名用户时由数据库拒绝', [
+        'DROP INDEX idx_users_name ON users',
+        'CREATE UNIQUE INDEX uq_users_name ON users (name)',
+    ]),
+]
+
+
+def migrate(db):
+    """执行尚未应用的迁移，返回本次执行的版本号列表"""
+    with db.cursor(commit=True) as cur:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT NOT NULL PRIMARY KEY,
+                description VARCHAR(200) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cur.execute('SELECT version FROM schema_migrations')
+        applied = {row[0] for row in cur.fetchall()}
+
+    executed = []
+    for version, description, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"执行数据库迁移 {version}: {description}")
+        with db.cursor(commit=True) as cur:
+            for sql in statements:
+                cur.execute(sql)
+            cur.execute(
+                'INSERT INTO schema_migrations (version, description) VALUES (%s, %s)',
+                (version, description)
+            )
+        executed.append(version)
+    return executed
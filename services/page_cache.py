@@ -0,0 +1,84 @@
+"""已渲染页面缓存
+
+可视化页面的输出只有页头的用户名因人而异。页面以占位符代替用户名渲染一次，
+按 (路径, 模板, 数据集版本) 缓存，请求时再把当前用户名填入占位符。
+"""
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup, escape
+
+# 占位符是 Markup，渲染时不会被转义，保证能按原样替换回用户名
+USER_NAME_SLOT = Markup('<!--page-cache:user-name-->')
+_USER_NAME_SLOT_BYTES = str(USER_NAME_SLOT).encode('utf-8')
+
+
+class PageCache:
+    """带容量与内存上限的LRU页面缓存"""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (页面字节, 依赖的数据集)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, body, datasets=()):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, frozenset(datasets))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, dataset=None):
+        """删除依赖指定数据集的页面；不指定时清空全部"""
+        with self._lock:
+            if dataset is None:
+                removed = list(self._entries)
+            else:
+                removed = [key for key, (_, datasets) in self._entries.items() if dataset in datasets]
+            for key in removed:
+                body, _ = self._entries.pop(key)
+                self._bytes -= len(body)
+            self.invalidations += len(removed)
+
+    @staticmethod
+    def fill(body, user_name):
+        """把当前用户名填回页面"""
+        return body.replace(_USER_NAME_SLOT_BYTES, str(escape(user_name or '')).encode('utf-8'))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,118 @@
+"""数据集JSON响应体缓存
+
+每个数据集在每个版本只序列化一次，同时预先生成 gzip / brotli 压缩版本，
+并以内容哈希作为强ETag。
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只提供gzip
+    brotli = None
+
+
+def _json_default(value):
+    # 非JSON原生的数据集（如列式价格表）通过 to_json() 提供可序列化的结构
+    if hasattr(value, 'to_json'):
+        return value.to_json()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps_compact(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+class Payload:
+    """一个数据集版本对应的预序列化响应体"""
+
+    def __init__(self, body):
+        self.body = body
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding):
+        if encoding == 'identity':
+            return self.digest
+        return f"{self.digest}-{encoding}"
+
+    def etags(self):
+        return [self.etag(encoding) for encoding in self.variants]
+
+    def choose(self, accept_encodings):
+        """按客户端的 Accept-Encoding 选择最小的可用版本"""
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings[encoding]:
+                return encoding
+        return 'identity'
+
+
+class PayloadCache:
+    """按 (数据集, 版本) 缓存响应体，数据集更新后旧版本自动被替换
+
+    整个数据集的响应体每个数据集只有一条，不参与淘汰；查询接口的结果以各自的 key
+    缓存，参数由客户端决定，条目总数超过 max_entries 时淘汰最久未用的。序列化在
+    全局锁之外进行，同一个 key 只由一个线程生成。
+    """
+
+    def __init__(self, data_store, serializer=dumps_compact, max_entries=1024):
+        self.data_store = data_store
+        self.serializer = serializer
+        self.max_entries = max_entries
+        self._datasets = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._building = {}
+
+    def _lookup(self, cache_key, named, version):
+        with self._lock:
+            if named:
+                entry = self._datasets.get(cache_key)
+            else:
+                entry = self._entries.get(cache_key)
+                if entry is not None:
+                    self._entries.move_to_end(cache_key)
+        if entry is not None and entry[0] == version:
+            return entry
+        return None
+
+    def _store(self, cache_key, named, entry):
+        with self._lock:
+            if named:
+                self._datasets[cache_key] = entry
+                return
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, name, transform=None, key=None):
+        """返回数据集当前版本的 (版本, Payload)
+
+        transform 可把数据集投影成页面实际需要的结构，此时需提供唯一的 key。
+        """
+        named = key is None
+        cache_key = name if named else key
+        value, version = self.data_store.snapshot(name)
+        entry = self._lookup(cache_key, named, version)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            building = self._building.setdefault((named, cache_key), threading.Lock())
+        try:
+            with building:
+                entry = self._lookup(cache_key, named, version)
+                if entry is None:
+                    body = self.serializer(transform(value) if transform else value)
+                    entry = (version, Payload(body))
+                    self._store(cache_key, named, entry)
+                return entry
+        finally:
+            with self._lock:
+                self._building.pop((named, cache_key), None)
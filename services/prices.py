@@ -0,0 +1,206 @@
+"""历代茶价的列式存储与查询
+
+historical_prices.csv 加载后按列保存为 NumPy 数组：年份、官价为数值列，朝代、
+茶类、出处为分类编码列（类别表另存）。筛选用布尔掩码完成，按朝代统计、
+移动平均、各茶类涨价指数均为向量化计算，不再把整张表逐行交给浏览器处理。
+"""
+import numpy as np
+
+from services.csv_table import read_columns
+
+COLUMNS = ('year', 'dynasty', 'tea_type', 'price_liang', 'source')
+
+
+def _codes(values):
+    """把字符串列编码为 (类别表, 最小整数类型的编码数组)，类别按首次出现的顺序排列"""
+    categories, inverse = np.unique(values, return_inverse=True)
+    first_seen = np.full(len(categories), len(values))
+    np.minimum.at(first_seen, inverse, np.arange(len(values)))
+    order = np.argsort(first_seen, kind='stable')
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    dtype = np.int16 if len(categories) < 2 ** 15 else np.int32
+    return [str(categories[i]) for i in order], remap[inverse].astype(dtype)
+
+
+def _rounded(array, digits=4):
+    return [round(float(x), digits) for x in array]
+
+
+class PriceSeries:
+    def __init__(self, year, price, dynasty, dynasties, tea_type, tea_types, source, sources):
+        self.year = year
+        self.price = price
+        self.dynasty = dynasty
+        self.dynasties = dynasties
+        self.tea_type = tea_type
+        self.tea_types = tea_types
+        self.source = source
+        self.sources = sources
+
+    @classmethod
+    def from_columns(cls, year, dynasty, tea_type, price_liang, source):
+        year = np.asarray(year, dtype=np.int32)
+        price = np.asarray(price_liang, dtype=np.float64)
+        dynasties, dynasty_codes = _codes(np.asarray(dynasty, dtype=str))
+        tea_types, tea_codes = _codes(np.asarray(tea_type, dtype=str))
+        sources, source_codes = _codes(np.asarray(source, dtype=str))
+        return cls(year, price, dynasty_codes, dynasties, tea_codes, tea_types, source_codes, sources)
+
+    # ---------- 二进制快照 ----------
+
+    def to_arrays(self):
+        """拆成 (元数据, 数组)，供二进制快照按原始内存布局保存"""
+        meta = {'dynasties': self.dynasties, 'tea_types': self.tea_types, 'sources': self.sources}
+        arrays = {'year': self.year, 'price': self.price, 'dynasty': self.dynasty,
+                  'tea_type': self.tea_type, 'source': self.source}
+        return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        return cls(arrays['year'], arrays['price'], arrays['dynasty'], meta['dynasties'],
+                   arrays['tea_type'], meta['tea_types'], arrays['source'], meta['sources'])
+
+    @classmethod
+    def empty(cls):
+        return cls.from_columns([], [], [], [], [])
+
+    def __len__(self):
+        return len(self.year)
+
+    # ---------- 筛选 ----------
+
+    def _category_mask(self, codes, categories, wanted):
+        wanted = set(wanted)
+        wanted_codes = [i for i, name in enumerate(categories) if name in wanted]
+        return np.isin(codes, wanted_codes)
+
+    def select(self, dynasties=(), tea_types=(), year_from=None, year_to=None):
+        """返回满足条件的行号（按原始顺序）"""
+        mask = np.ones(len(self), dtype=bool)
+        if dynasties:
+            mask &= self._category_mask(self.dynasty, self.dynasties, dynasties)
+        if tea_types:
+            mask &= self._category_mask(self.tea_type, self.tea_types, tea_types)
+        if year_from is not None:
+            mask &= self.year >= year_from
+        if year_to is not None:
+            mask &= self.year <= year_to
+        return np.flatnonzero(mask)
+
+    def rows(self, rows, offset=0, limit=None):
+        """列式输出选中的行：分类列给出编码，类别表单独给出"""
+        page = rows[offset:None if limit is None else offset + limit]
+        return {
+            'total': int(len(rows)),
+            'offset': offset,
+            'dynasties': self.dynasties,
+            'tea_types': self.tea_types,
+            'sources': self.sources,
+            'columns': {
+                'year': self.year[page].tolist(),
+                'dynasty': self.dynasty[page].tolist(),
+                'tea_type': self.tea_type[page].tolist(),
+                'price_liang': self.price[page].tolist(),
+                'source': self.source[page].tolist()
+            }
+        }
+
+    def to_json(self):
+        """逐行记录格式，供 /api/data/prices 兼容旧的数据接口"""
+        return [
+            {
+                'year': int(self.year[i]),
+                'dynasty': self.dynasties[self.dynasty[i]],
+                'tea_type': self.tea_types[self.tea_type[i]],
+                'price_liang': float(self.price[i]),
+                'source': self.sources[self.source[i]]
+            }
+            for i in range(len(self))
+        ]
+
+    # ---------- 聚合 ----------
+
+    @staticmethod
+    def _group_starts(sorted_codes):
+        if len(sorted_codes) == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+
+    def dynasty_stats(self, rows):
+        """各朝代的记录数与均价、最低价、最高价"""
+        codes = self.dynasty[rows]
+        prices = self.price[rows]
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        sorted_prices = prices[order]
+        starts = self._group_starts(sorted_codes)
+        if len(starts) == 0:
+            return []
+        counts = np.diff(np.r_[starts, len(sorted_codes)])
+        sums = np.add.reduceat(sorted_prices, starts)
+        mins = np.minimum.reduceat(sorted_prices, starts)
+        maxs = np.maximum.reduceat(sorted_prices, starts)
+        return [
+            {
+                'dynasty': self.dynasties[code],
+                'count': int(count),
+                'mean': round(float(total / count), 4),
+                'min': float(low),
+                'max': float(high)
+            }
+            for code, count, total, low, high in zip(sorted_codes[starts], counts, sums, mins, maxs)
+        ]
+
+    def moving_average(self, rows, window):
+        """按年份求均价后，取最近 window 个年份点的移动平均"""
+        years, inverse = np.unique(self.year[rows], return_inverse=True)
+        if len(years) == 0:
+            return {'window': window, 'year': [], 'mean': [], 'moving_average': []}
+        means = np.bincount(inverse, weights=self.price[rows]) / np.bincount(inverse)
+        cumulative = np.r_[0.0, np.cumsum(means)]
+        ends = np.arange(1, len(means) + 1)
+        begins = np.maximum(ends - window, 0)
+        averages = (cumulative[ends] - cumulative[begins]) / (ends - begins)
+        return {
+            'window': window,
+            'year': years.tolist(),
+            'mean': _rounded(means),
+            'moving_average': _rounded(averages)
+        }
+
+    def inflation_indices(self, rows):
+        """各茶类的涨价指数：以该茶类最早一次记录的价格为100"""
+        tea_codes = self.tea_type[rows]
+        order = rows[np.lexsort((self.year[rows], tea_codes))]
+        sorted_codes = self.tea_type[order]
+        prices = self.price[order]
+        starts = self._group_starts(sorted_codes)
+        if len(starts) == 0:
+            return []
+        bounds = np.r_[starts, len(order)]
+        base = np.repeat(prices[starts], np.diff(bounds))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            index = np.where(base > 0, prices / base * 100, np.nan)
+
+        result = []
+        for code, start, end in zip(sorted_codes[starts], bounds[:-1], bounds[1:]):
+            if not np.isfinite(index[start]):
+                continue
+            result.append({
+                'tea_type': self.tea_types[code],
+                'base_price': float(prices[start]),
+                'year': self.year[order[start:end]].tolist(),
+                'index': _rounded(index[start:end], 2)
+            })
+        return result
+
+
+def load_price_series(path):
+    columns = read_columns(path, usecols=COLUMNS)
+    # 年份或价格缺失的行不参与查询
+    keep = [i for i, (year, price) in enumerate(zip(columns['year'], columns['price_liang']))
+            if year is not None and price is not None]
+    return PriceSeries.from_columns(*(
+        [columns[name][i] if columns[name][i] is not None else '' for i in keep] for name in COLUMNS
+    ))
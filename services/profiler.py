@@ -0,0 +1,93 @@
+"""按需开启的采样分析器
+
+开启后由一个后台线程每隔 interval 秒读取一次所有线程的调用栈（sys._current_frames），
+持续指定秒数后停止。结果为折叠栈格式（每行 "线程;外层函数;...;内层函数 次数"），
+可直接交给 flamegraph.pl 或 speedscope 生成火焰图。未开启时没有任何开销；开启期间
+只有采样线程在工作，被采样的请求线程不受打扰。每个进程各有一个分析器。
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    # 只保留最后两级路径，火焰图里更易读
+    short = os.sep.join(filename.split(os.sep)[-2:])
+    return f'{code.co_name} ({short}:{code.co_firstlineno})'
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, max_seconds=60):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._thread = None
+        self._deadline = 0.0
+        self._started_at = None
+        self._samples = 0
+        self._result = None
+        self._finished_at = None
+
+    @property
+    def running(self):
+        with self._lock:
+            return self._thread is not None
+
+    def start(self, seconds):
+        """开始采样 seconds 秒；已有一轮在进行时返回 False"""
+        seconds = max(0.1, min(float(seconds), self.max_seconds))
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._deadline = time.monotonic() + seconds
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        # 用栈上各帧的代码对象作键，相同的栈只在最后格式化一次
+        while time.monotonic() < self._deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                stacks[(names.get(ident, str(ident)), tuple(reversed(codes)))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        lines = []
+        for (thread_name, codes), count in stacks.most_common():
+            frames = [thread_name.replace(';', ':')] + [_frame_label(code).replace(';', ':') for code in codes]
+            lines.append(f"{';'.join(frames)} {count}")
+        with self._lock:
+            self._result = '\n'.join(lines) + '\n'
+            self._samples = samples
+            self._finished_at = time.time()
+            self._thread = None
+
+    def status(self):
+        with self._lock:
+            return {
+                'running': self._thread is not None,
+                'remaining': max(0.0, self._deadline - time.monotonic()) if self._thread else 0.0,
+                'started_at': self._started_at,
+                'finished_at': self._finished_at,
+                'samples': self._samples,
+                'interval': self.interval
+            }
+
+    def result(self):
+        """最近一轮的折叠栈文本；尚未完成过任何一轮时返回 None"""
+        with self._lock:
+            return self._result
@@ -0,0 +1,121 @@
+"""服务端答题引擎
+
+题库按 (类别, 难度) 分层建立索引，每个题库版本只构建一次。开始答题时在服务端
+分层抽题，答题状态只记录题目ID、已作答选项和正确题数，保存在服务端
+（services/quiz_state.py）；页面每次只拿到一道题，判分完全在服务端完成。
+"""
+import random
+from collections import defaultdict
+
+POINTS_PER_QUESTION = 10
+DEFAULT_QUESTION_COUNT = 10
+MAX_QUESTION_COUNT = 50
+
+
+class QuizError(ValueError):
+    """答题流程中的非法操作"""
+
+
+class QuestionBank:
+    """题库索引"""
+
+    def __init__(self, quiz_data):
+        questions = quiz_data.get('questions', [])
+        self.by_id = {q['id']: q for q in questions}
+        # (类别, 难度) -> 题目ID列表；题目未标注时归入同一层
+        self.strata = defaultdict(list)
+        for q in questions:
+            self.strata[(q.get('category', ''), q.get('difficulty', ''))].append(q['id'])
+        self.categories = sorted({key[0] for key in self.strata if key[0]})
+        self.difficulties = sorted({key[1] for key in self.strata if key[1]})
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def sample(self, count, category=None, difficulty=None, rng=random):
+        """按各层题量比例分层抽取 count 道题"""
+        strata = [
+            ids for (cat, diff), ids in self.strata.items()
+            if (category is None or cat == category) and (difficulty is None or diff == difficulty)
+        ]
+        available = sum(len(ids) for ids in strata)
+        count = min(count, available)
+        if count <= 0:
+            return []
+
+        # 最大余数法分配各层题数，保证总数正好为 count
+        exact = [len(ids) * count / available for ids in strata]
+        quotas = [int(x) for x in exact]
+        remainders = sorted(range(len(strata)), key=lambda i: exact[i] - quotas[i], reverse=True)
+        for i in remainders[:count - sum(quotas)]:
+            quotas[i] += 1
+
+        picked = []
+        for ids, quota in zip(strata, quotas):
+            picked.extend(rng.sample(ids, quota))
+        rng.shuffle(picked)
+        return picked
+
+    def question(self, question_id):
+        try:
+            return self.by_id[question_id]
+        except KeyError:
+            raise QuizError("题库已更新，请重新开始答题")
+
+
+def start_quiz(bank, count=DEFAULT_QUESTION_COUNT, category=None, difficulty=None):
+    try:
+        count = max(1, min(int(count), MAX_QUESTION_COUNT))
+    except (TypeError, ValueError):
+        raise QuizError("题目数量必须是整数")
+    question_ids = bank.sample(count, category, difficulty)
+    if not question_ids:
+        raise QuizError("没有符合条件的题目")
+    # 紧凑的答题状态：题目ID、已作答选项、正确题数、是否已保存
+    return {'q': question_ids, 'a': [], 'c': 0, 'saved': False}
+
+
+def public_question(bank, state):
+    """当前题目（不含答案和解析）；全部答完时返回None"""
+    index = len(state['a'])
+    if index >= len(state['q']):
+        return None
+    question = bank.question(state['q'][index])
+    return {
+        'index': index,
+        'total': len(state['q']),
+        'question': question['question'],
+        'options': question['options']
+    }
+
+
+def submit_answer(bank, state, index, answer):
+    """对第 index 题作答，每题只能作答一次"""
+    if state.get('saved') or index >= len(state['q']):
+        raise QuizError("答题已结束，请重新开始答题")
+    if index != len(state['a']):
+        raise QuizError("题目顺序不正确或该题已作答")
+    question = bank.question(state['q'][index])
+    correct = answer == question['answer']
+    state['a'].append(answer)
+    if correct:
+        state['c'] += 1
+    return {
+        'correct': correct,
+        'answer': question['answer'],
+        'explanation': question.get('explanation', ''),
+        'score': state['c'] * POINTS_PER_QUESTION,
+        'finished': len(state['a']) == len(state['q'])
+    }
+
+
+def quiz_result(state):
+    """已完成答题的成绩"""
+    if len(state['a']) != len(state['q']):
+        raise QuizError("答题尚未完成")
+    return {
+        'score': state['c'] * POINTS_PER_QUESTION,
+        'total': len(state['q']) * POINTS_PER_QUESTION,
+        'correct': state['c'],
+        'questions': len(state['q'])
+    }
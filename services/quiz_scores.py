@@ -0,0 +1,128 @@
+"""答题成绩的读写：写入记录时同步维护用户汇总，查询按键集分页"""
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([str(created_at), row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def encode_pending_cursor(skip):
+    """第一页被尚未写库的成绩占满时，下一页从第 skip 条未写库成绩继续"""
+    raw = json.dumps([skip], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """返回 (数据库中的位置 (created_at, id) 或 None, 跳过的未写库成绩条数)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if len(value) == 1:
+            return None, int(value[0])
+        created_at, row_id = value
+        return (str(created_at), int(row_id)), 0
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"无效的分页游标: {cursor}") from e
+
+
+def score_statements(user_name, score, total, date):
+    """写入一条成绩需要在同一事务中执行的语句"""
+    return [
+        ('insert_quiz_score', (user_name, score, total, date)),
+        ('upsert_quiz_user_stats', (user_name, score, score, total)),
+    ]
+
+
+def record_score(cur, user_name, score, total, date):
+    """在同一事务中写入成绩并更新用户汇总"""
+    for statement, params in score_statements(user_name, score, total, date):
+        cur.run(statement, params)
+
+
+async def record_score_async(cur, user_name, score, total, date):
+    """record_score 的异步版本，cur 为 services.async_db 的游标"""
+    for statement, params in score_statements(user_name, score, total, date):
+        await cur.run(statement, params)
+
+
+def _page_query(user_name, limit, cursor):
+    """返回 (语句, 参数, 跳过的未写库成绩条数)；游标已进入数据库部分时后者为 None"""
+    position, skip = decode_cursor(cursor) if cursor else (None, 0)
+    # 多取一条用于判断是否还有下一页
+    if position:
+        created_at, row_id = position
+        return 'quiz_scores_next_page', (user_name, created_at, created_at, row_id, limit + 1), None
+    return 'quiz_scores_first_page', (user_name, limit + 1), skip
+
+
+def _build_page(rows, limit, pending, skip):
+    pending = list(pending)[skip:] if skip is not None else []
+    page_pending = pending[:limit]
+    page_rows = rows[:limit - len(page_pending)]
+
+    next_cursor = None
+    if len(pending) > len(page_pending) or len(rows) > len(page_rows):
+        if page_rows:
+            # 游标取自本页实际返回的最后一条记录
+            last = page_rows[-1]
+            next_cursor = encode_cursor(last[4], last[0])
+        else:
+            next_cursor = encode_pending_cursor(skip + len(page_pending))
+
+    scores = [{"score": r['score'], "total": r['total'], "date": r['date']} for r in page_pending]
+    scores += [{"score": row[1], "total": row[2], "date": row[3]} for row in page_rows]
+    return scores, next_cursor
+
+
+def fetch_scores_page(db, user_name, limit=DEFAULT_PAGE_SIZE, cursor=None, pending=()):
+    """按时间倒序返回一页成绩记录和下一页游标（没有更多记录时为None）
+
+    pending 是已提交但尚未写入数据库的成绩（新的在前），排在数据库中的记录前面，
+    与数据库中的记录一起按 limit 分页。
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    statement, params, skip = _page_query(user_name, limit, cursor)
+    with db.cursor() as cur:
+        cur.run(statement, params)
+        rows = cur.fetchall()
+    return _build_page(rows, limit, pending, skip)
+
+
+async def fetch_scores_page_async(adb, user_name, limit=DEFAULT_PAGE_SIZE, cursor=None, pending=()):
+    """fetch_scores_page 的异步版本，adb 为 services.async_db 中的数据库入口"""
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    statement, params, skip = _page_query(user_name, limit, cursor)
+    async with adb.cursor() as cur:
+        await cur.run(statement, params)
+        rows = await cur.fetchall()
+    return _build_page(rows, limit, pending, skip)
+
+
+def fetch_user_stats(db, user_name, pending=()):
+    """读取用户汇总（单行主键查询），并合并尚未写入数据库的成绩"""
+    with db.cursor() as cur:
+        cur.run('quiz_user_stats', (user_name,))
+        row = cur.fetchone()
+
+    attempts, best_score, score_sum, total_sum = row or (0, 0, 0, 0)
+    for r in pending:
+        attempts += 1
+        best_score = max(best_score, r['score'])
+        score_sum += r['score']
+        total_sum += r['total']
+
+    return {
+        "attempts": attempts,
+        "best_score": best_score,
+        "average_score": round(score_sum / attempts, 2) if attempts else 0,
+        "average_ratio": round(score_sum / total_sum, 4) if total_sum else 0
+    }
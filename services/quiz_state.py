@@ -0,0 +1,70 @@
+"""答题进度的服务端存储
+
+答题状态（题目ID、已作答选项、正确题数、是否已保存）保存在数据库中，每个用户一行，
+不放在会话 cookie 里：客户端重发旧 cookie 既不能回到看过答案之前重新作答，也不能
+把同一次成绩保存多次。每次修改都以读取时的 step 做条件更新，同一份状态只有一个
+请求能改成功，其余按过期状态拒绝。
+"""
+import json
+
+from services.quiz_engine import QuizError
+
+
+class StaleQuizState(QuizError):
+    """答题状态已被其他请求修改"""
+
+
+def _dumps(state):
+    return json.dumps(state, separators=(',', ':'))
+
+
+def _parse(row):
+    if not row:
+        raise QuizError("请先开始答题")
+    return json.loads(row[0]), row[1]
+
+
+def _unsaved(state):
+    return _dumps({**state, 'saved': False})
+
+
+def _check_updated(cur):
+    if cur.rowcount != 1:
+        raise StaleQuizState("答题状态已被其他请求更新，请刷新后继续")
+
+
+def begin(cur, user_name, state):
+    """开始新的一轮，替换该用户未完成的答题"""
+    cur.run('upsert_quiz_attempt', (user_name, _dumps(state)))
+
+
+def load(cur, user_name):
+    """返回 (状态, step)"""
+    cur.run('quiz_attempt', (user_name,))
+    return _parse(cur.fetchone())
+
+
+def update(cur, user_name, state, step):
+    """只有状态仍是读取时的 step 才写入，否则抛出 StaleQuizState"""
+    cur.run('update_quiz_attempt', (_dumps(state), user_name, step))
+    _check_updated(cur)
+
+
+def unmark_saved(cur, user_name, state, step):
+    """成绩未能提交时撤销已保存标记，用户可以重试；step 为标记前读取的 step，
+    标记之后状态又被修改（例如已开始新的一轮）时不做改动"""
+    cur.run('update_quiz_attempt', (_unsaved(state), user_name, step + 1))
+
+
+async def load_async(cur, user_name):
+    await cur.run('quiz_attempt', (user_name,))
+    return _parse(await cur.fetchone())
+
+
+async def update_async(cur, user_name, state, step):
+    await cur.run('update_quiz_attempt', (_dumps(state), user_name, step))
+    _check_updated(cur)
+
+
+async def unmark_saved_async(cur, user_name, state, step):
+    await cur.run('update_quiz_attempt', (_unsaved(state), user_name, step + 1))
@@ -0,0 +1,278 @@
+"""答题成绩的异步批量写入（write-behind）
+
+提交成绩时先追加到本地日志文件再放入内存队列，随即返回；后台线程按条数或
+时间间隔把成绩批量写入 quiz_scores。队列有上限，满了会拒绝提交（由调用方
+返回 503）。进程崩溃后，日志中尚未确认写库的成绩会在下次启动时重新写入。
+"""
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，开发环境只有单进程，不需要文件锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WriterBusy(Exception):
+    """写入队列已满"""
+
+
+class ScoreWriter:
+    def __init__(self, db, journal_dir, batch_size=100, flush_interval=0.5,
+                 max_pending=10000, submit_timeout=0.05, fsync=False):
+        self.db = db
+        self.journal_dir = journal_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.submit_timeout = submit_timeout
+        self.fsync = fsync
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._seq = 0
+        # 尚未写入数据库的成绩，按用户索引，供查询接口合并，保证用户能立即看到自己的成绩
+        self._pending = defaultdict(list)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._journal = None
+        self._journal_path = None
+        self._metrics = {
+            'submitted': 0,
+            'rejected': 0,
+            'replayed': 0,
+            'written': 0,
+            'batches': 0,
+            'flush_failures': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0
+        }
+
+    # ---------- 日志文件 ----------
+
+    def _open_journal(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._journal_path = os.path.join(self.journal_dir, f"quiz_scores.{os.getpid()}.journal")
+        self._journal = open(self._journal_path, 'a+', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(self._journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _append_journal(self, record):
+        self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _truncate_journal(self):
+        self._journal.seek(0)
+        self._journal.truncate()
+        self._journal.flush()
+
+    def _claim_orphan_journals(self):
+        """找出已退出进程遗留的日志文件，返回 [(已加锁的文件, 未确认的成绩)]"""
+        claimed = []
+        for path in glob.glob(os.path.join(self.journal_dir, 'quiz_scores.*.journal')):
+            if path == self._journal_path:
+                continue
+            try:
+                f = open(path, 'r+', encoding='utf-8')
+            except OSError:
+                continue
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # 仍被其他存活的进程持有
+                    f.close()
+                    continue
+            if not self._still_linked(f, path):
+                # 打开之后、加锁之前已被其他进程恢复并删除（或换成了新文件），不能再恢复一次
+                f.close()
+                continue
+            claimed.append((f, self._read_unconfirmed(f)))
+        return claimed
+
+    @staticmethod
+    def _still_linked(f, path):
+        opened = os.fstat(f.fileno())
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return opened.st_nlink > 0 and (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+    @staticmethod
+    def _read_unconfirmed(f):
+        entries = {}
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 崩溃时写了一半的最后一行
+                continue
+            if 'commit' in record:
+                for seq in record['commit']:
+                    entries.pop(seq, None)
+            else:
+                entries[record['seq']] = record
+        return list(entries.values())
+
+    # ---------- 生命周期 ----------
+
+    def start(self):
+        self._open_journal()
+        self._thread = threading.Thread(target=self._run, name='quiz-score-writer', daemon=True)
+        self._thread.start()
+
+        # 遗留成绩先转记到本进程的日志中，再删除原文件
+        for f, records in self._claim_orphan_journals():
+            with f:
+                for record in records:
+                    self._enqueue(record['user_name'], record['score'], record['total'], record['date'], timeout=None)
+                os.remove(f.name)
+            if records:
+                with self._lock:
+                    self._metrics['replayed'] += len(records)
+                logger.info(f"从日志 {f.name} 中恢复了 {len(records)} 条未写入数据库的答题成绩")
+
+    def ensure_started(self):
+        """启动后台线程并恢复遗留日志；已启动或已停止时什么也不做"""
+        if self._thread is None and not self._stopping.is_set():
+            with self._start_lock:
+                if self._thread is None and not self._stopping.is_set():
+                    self.start()
+
+    def close(self, timeout=10):
+        """停止接收新成绩，把队列中剩余的成绩全部写入数据库"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # 日志文件保持打开（进程退出时释放锁），剩余成绩由下次启动的进程恢复
+            logger.error(f"答题成绩写入线程未能在{timeout}秒内完成，剩余成绩保留在日志中")
+            return
+        self._thread = None
+        self._journal.close()
+        if os.path.getsize(self._journal_path) == 0:
+            os.remove(self._journal_path)
+
+    # ---------- 提交 ----------
+
+    def _enqueue(self, user_name, score, total, date, timeout):
+        """放入队列并记入日志；队列已满时最多等待 timeout 秒（None 表示一直等待）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._queue.full():
+                    self._seq += 1
+                    record = {'seq': self._seq, 'user_name': user_name, 'score': score, 'total': total, 'date': date}
+                    self._append_journal(record)
+                    self._pending[user_name].append(record)
+                    self._queue.put_nowait(record)
+                    return record
+            # 等待期间不持有锁，后台线程才能继续写库、腾出队列空间
+            if deadline is not None and time.monotonic() >= deadline:
+                with self._lock:
+                    self._metrics['rejected'] += 1
+                raise WriterBusy("答题成绩写入队列已满，请稍后重试")
+            time.sleep(0.005)
+
+    def submit(self, user_name, score, total, date):
+        if self._stopping.is_set():
+            raise WriterBusy("答题成绩写入服务已停止")
+        self.ensure_started()
+        record = self._enqueue(user_name, score, total, date, timeout=self.submit_timeout)
+        with self._lock:
+            self._metrics['submitted'] += 1
+        return record['seq']
+
+    def pending_for(self, user_name):
+        """返回该用户尚未写入数据库的成绩（按提交时间倒序）"""
+        with self._lock:
+            return list(reversed(self._pending.get(user_name, [])))
+
+    # ---------- 后台写入 ----------
+
+    def _collect_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch):
+        started = time.perf_counter()
+        with self.db.cursor(commit=True) as cur:
+            cur.run_many('insert_quiz_score', [(r['user_name'], r['score'], r['total'], r['date']) for r in batch])
+            cur.run_many('upsert_quiz_user_stats', [(r['user_name'], r['score'], r['score'], r['total']) for r in batch])
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._append_journal({'commit': [r['seq'] for r in batch]})
+            for r in batch:
+                pending = self._pending.get(r['user_name'])
+                if pending:
+                    pending.remove(r)
+                    if not pending:
+                        del self._pending[r['user_name']]
+            # 全部确认后清空日志，避免文件无限增长
+            if not self._pending and self._queue.empty():
+                self._truncate_journal()
+            m = self._metrics
+            m['written'] += len(batch)
+            m['batches'] += 1
+            m['last_batch_size'] = len(batch)
+            m['max_batch_size'] = max(m['max_batch_size'], len(batch))
+            m['last_flush_seconds'] = elapsed
+            m['max_flush_seconds'] = max(m['max_flush_seconds'], elapsed)
+            m['total_flush_seconds'] += elapsed
+
+    def _run(self):
+        batch = []
+        backoff = self.flush_interval
+        while True:
+            if not batch:
+                batch = self._collect_batch()
+            if batch:
+                try:
+                    self._write_batch(batch)
+                    batch = []
+                    backoff = self.flush_interval
+                except Exception as e:
+                    # 写库失败时保留这一批，退避后重试；成绩仍在日志中
+                    logger.error(f"批量写入答题成绩失败，{backoff:.1f}秒后重试: {str(e)}")
+                    with self._lock:
+                        self._metrics['flush_failures'] += 1
+                    if self._stopping.wait(backoff):
+                        return
+                    backoff = min(backoff * 2, 30)
+                    continue
+            elif self._stopping.is_set():
+                return
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['queue_depth'] = self._queue.qsize()
+            metrics['avg_batch_size'] = metrics['written'] / metrics['batches'] if metrics['batches'] else 0
+            metrics['avg_flush_seconds'] = (
+                metrics['total_flush_seconds'] / metrics['batches'] if metrics['batches'] else 0
+            )
+        return metrics
@@ -0,0 +1,276 @@
+"""全站全文检索
+
+各数据集先抽取为文档（标题、正文、链接），再按字符 n-gram 分词建立倒排索引：
+连续的汉字切为单字与相邻二字组，字母数字按整词处理，无需中文分词词典。
+每个数据集单独成段，通过 data_store.derive 按数据版本构建，某个数据集更新时
+只重建它自己的段。查询时各段合并按 BM25 打分（标题权重更高），
+全部查询词都命中的文档优先，并在摘要中用 <mark> 标出命中位置。
+"""
+import math
+import re
+import unicodedata
+from html import escape
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 字段权重：命中标题比命中正文更相关
+FIELD_WEIGHTS = {'title': 3.0, 'body': 1.0}
+SNIPPET_RADIUS = 40
+MAX_QUERY_LENGTH = 64
+
+_RUNS = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+|[a-z0-9]+')
+
+
+def normalize(text):
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def query_runs(text):
+    """查询串中连续的汉字串与单词，用于打分和高亮"""
+    return _RUNS.findall(normalize(text))
+
+
+def _is_cjk(run):
+    return '\u3400' <= run[0] <= '\u9fff' or '\uf900' <= run[0] <= '\ufaff'
+
+
+def _run_tokens(run):
+    if not _is_cjk(run) or len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """文档分词：汉字串切为单字与二字组，单词整体作为一个词"""
+    tokens = []
+    for run in query_runs(text):
+        tokens.extend(_run_tokens(run))
+        if len(run) > 1 and _is_cjk(run):
+            tokens.extend(run)
+    return tokens
+
+
+def query_tokens(text):
+    """查询分词：多字的汉字串只用二字组，单个汉字用单字，去重后保持顺序"""
+    tokens = []
+    for run in query_runs(text):
+        tokens.extend(_run_tokens(run))
+    return list(dict.fromkeys(tokens))
+
+
+def _join(*parts):
+    texts = []
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            texts.extend(str(p) for p in part)
+        elif part:
+            texts.append(str(part))
+    return '；'.join(texts)
+
+
+# ---------- 各数据集的文档抽取 ----------
+# 文档字段：key（段内唯一）、title、body、url（可为None）、snippet（摘要取自哪个字段）
+
+def culture_documents(data):
+    return [
+        {
+            'key': item['id'],
+            'title': item.get('name', ''),
+            'body': _join(item.get('dynasty'), item.get('region'), item.get('intro'), item.get('significance'),
+                          item.get('representative_figures'), item.get('landmarks'), item.get('modern_status')),
+            'url': f"/culture/{item['id']}"
+        }
+        for item in data.get('cultures', [])
+    ]
+
+
+def quiz_documents(data):
+    # 解析中包含答案，摘要只取题干，避免检索结果变成答题的答案表
+    return [
+        {
+            'key': str(question.get('id')),
+            'title': question.get('question', ''),
+            'body': question.get('explanation', ''),
+            'url': '/tea_quiz',
+            'snippet': 'title'
+        }
+        for question in data.get('questions', [])
+    ]
+
+
+def spread_documents(data):
+    documents = []
+    for i, event in enumerate(data.get('historical_events', [])):
+        documents.append({
+            'key': f"event-{i}",
+            'title': f"{event.get('year')}年 {event.get('event', '')}",
+            'body': event.get('impact', ''),
+            'url': '/culture_spread'
+        })
+    for i, route in enumerate(data.get('routes', [])):
+        documents.append({
+            'key': f"route-{i}",
+            'title': f"{route.get('era', '')}{route.get('type', '')}",
+            'body': _join(route.get('caravan'), route.get('goods'), route.get('record')),
+            'url': '/culture_spread'
+        })
+    return documents
+
+
+def tea_area_documents(data):
+    documents = []
+    for dynasty in data.get('dynasties', []):
+        name = dynasty.get('name', '')
+        documents.append({
+            'key': name,
+            'title': f"{name}茶区",
+            'body': _join(dynasty.get('period'), dynasty.get('production_scale'), dynasty.get('policy')),
+            'url': None
+        })
+        for area in dynasty.get('tea_areas', []):
+            documents.append({
+                'key': f"{name}/{area.get('region')}",
+                'title': f"{name}·{area.get('region', '')}",
+                'body': _join(area.get('modern_name'), area.get('tea_types'), area.get('famous_gardens'),
+                              area.get('features')),
+                'url': None
+            })
+    return documents
+
+
+def process_documents(data):
+    return [
+        {
+            'key': str(step.get('step', i)),
+            'title': step.get('name', ''),
+            'body': _join(step.get('tool'), step.get('source'), step.get('ancient_text'),
+                          step.get('details'), step.get('analysis')),
+            'url': '/song_production'
+        }
+        for i, step in enumerate(data)
+    ]
+
+
+# 数据集名 -> (结果分组名, 文档抽取函数)
+SOURCES = {
+    'traditional_cultures': ('传统文化', culture_documents),
+    'tea_quiz': ('茶文化题库', quiz_documents),
+    'spread': ('文化传播', spread_documents),
+    'historical_tea_areas': ('历代茶区', tea_area_documents),
+    'tea_process': ('宋茶工艺', process_documents),
+}
+
+
+class Segment:
+    """一个数据集的倒排索引"""
+
+    def __init__(self, dataset, documents):
+        self.dataset = dataset
+        self.documents = documents
+        # 词 -> {文档序号: 加权词频}
+        self.postings = {}
+        self.lengths = []
+        for doc_id, document in enumerate(documents):
+            length = 0
+            for field, weight in FIELD_WEIGHTS.items():
+                tokens = tokenize(document.get(field, ''))
+                length += len(tokens)
+                for token in tokens:
+                    postings = self.postings.setdefault(token, {})
+                    postings[doc_id] = postings.get(doc_id, 0.0) + weight
+            self.lengths.append(length)
+        self.total_length = sum(self.lengths)
+
+
+def build_segment(dataset):
+    """返回 derive 用的构建函数"""
+    extract = SOURCES[dataset][1]
+    return lambda value: Segment(dataset, extract(value))
+
+
+def _highlight(text, runs, radius=SNIPPET_RADIUS):
+    """截取第一个命中位置附近的片段（radius 为None时保留全文），HTML转义后用 <mark> 标出命中的查询串"""
+    normalized = normalize(text)
+    if len(normalized) != len(text):
+        text = normalized
+    # 优先标出完整的查询串，找不到时退回到二字组
+    needles = sorted({run for run in runs if run in normalized}, key=len, reverse=True)
+    if not needles:
+        needles = sorted({token for run in runs for token in _run_tokens(run) if token in normalized},
+                         key=len, reverse=True)
+    positions = [normalized.find(needle) for needle in needles]
+    first = min(positions) if positions else 0
+    if radius is None:
+        start, end = 0, len(text)
+    else:
+        start = max(0, first - radius)
+        end = min(len(text), first + radius * 2)
+
+    spans = []
+    for needle in needles:
+        position = normalized.find(needle, start)
+        while position != -1 and position < end:
+            spans.append((position, min(position + len(needle), end)))
+            position = normalized.find(needle, position + len(needle))
+    spans.sort()
+
+    parts = ['…' if start > 0 else '']
+    cursor = start
+    for span_start, span_end in spans:
+        if span_start < cursor:
+            continue
+        parts.append(escape(text[cursor:span_start]))
+        parts.append(f"<mark>{escape(text[span_start:span_end])}</mark>")
+        cursor = span_end
+    parts.append(escape(text[cursor:end]))
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def search(segments, query, limit=20):
+    """在各段中检索，返回 (命中总数, 排好序的结果列表)"""
+    query = (query or '')[:MAX_QUERY_LENGTH]
+    tokens = query_tokens(query)
+    if not tokens:
+        return 0, []
+
+    doc_count = sum(len(segment.documents) for segment in segments)
+    average_length = sum(segment.total_length for segment in segments) / max(doc_count, 1)
+    frequencies = {token: sum(len(segment.postings.get(token, ())) for segment in segments) for token in tokens}
+
+    scored = []
+    for segment in segments:
+        scores = {}
+        matched = {}
+        for token in tokens:
+            postings = segment.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - frequencies[token] + 0.5) / (frequencies[token] + 0.5))
+            for doc_id, tf in postings.items():
+                norm = K1 * (1 - B + B * segment.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+        for doc_id, score in scores.items():
+            # 命中全部查询词的文档排在只命中部分的文档之前
+            scored.append((matched[doc_id] == len(tokens), score, segment, doc_id))
+
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    runs = query_runs(query)
+    results = []
+    for complete, score, segment, doc_id in scored[:limit]:
+        document = segment.documents[doc_id]
+        snippet_field = document.get('snippet', 'body')
+        results.append({
+            'dataset': segment.dataset,
+            'group': SOURCES[segment.dataset][0],
+            'key': document['key'],
+            'title': _highlight(document['title'], runs, radius=None),
+            'snippet': _highlight(document.get(snippet_field, ''), runs),
+            'url': document['url'],
+            'score': round(score, 4),
+            'complete': complete
+        })
+    return len(scored), results
@@ -0,0 +1,398 @@
+"""会话：共享的签名密钥、可选的服务端会话存储与登录检查
+
+多进程、多节点部署时所有进程必须使用同一组签名密钥，否则一个进程签发的会话
+cookie 会被另一个进程拒绝，重启后所有用户也都会掉线。密钥按以下顺序取得：
+
+- 环境变量 SECRET_KEY（当前密钥）与 SECRET_KEY_FALLBACKS（逗号分隔的旧密钥）
+- 密钥文件 SECRET_KEY_FILE：每行一个密钥，第一行为当前密钥，其余为旧密钥；文件
+  不存在时生成一个，同一台机器上同时启动的多个进程读到的是同一个
+
+旧密钥只用于验证签名，轮换密钥后已登录的用户不会掉线。
+
+SESSION_BACKEND=cookie（默认）时会话内容签名后整体放在 cookie 中；设为 sqlite、
+redis 或 "模块:类名" 时 cookie 中只有签名过的会话id与版本号，内容保存在共享存储中，
+前面有一层进程内LRU缓存。版本号在每次保存时更换；每个请求先向存储查询会话当前的
+版本号（只取版本号，不取内容），缓存只在与之一致时命中，不会读到其他进程已经改写
+过的旧内容，其他进程注销或删除的会话也不会再从缓存中取出。
+"""
+import hashlib
+import importlib
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, render_template, session
+from flask.sessions import SecureCookieSession, SessionInterface, session_json_serializer
+from itsdangerous import BadSignature, Signer
+
+logger = logging.getLogger(__name__)
+
+
+# ---- 签名密钥 ----
+
+def new_key():
+    return secrets.token_urlsafe(32)
+
+
+def _split_keys(text):
+    return [key.strip() for key in (text or '').split(',') if key.strip()]
+
+
+def read_key_file(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _write_keys(path, keys):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(keys) + '\n')
+
+
+def _create_key_file(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    keys = [new_key()]
+    tmp = f'{path}.{os.getpid()}.tmp'
+    _write_keys(tmp, keys)
+    try:
+        # 写完整后再以硬链接放到目标位置：同时启动的进程只有一个能创建成功，
+        # 其余读到的一定是完整的文件
+        os.link(tmp, path)
+        logger.warning(f"已生成会话签名密钥 {path}；多节点部署时各节点须使用同一个密钥文件或设置 SECRET_KEY")
+    except FileExistsError:
+        keys = read_key_file(path)
+    finally:
+        os.unlink(tmp)
+    return keys
+
+
+def load_secret_keys(environ, key_file):
+    """返回 [当前密钥, 旧密钥...]"""
+    current = environ.get('SECRET_KEY', '').strip()
+    if current:
+        return [current] + _split_keys(environ.get('SECRET_KEY_FALLBACKS', ''))
+    try:
+        keys = read_key_file(key_file)
+    except FileNotFoundError:
+        keys = []
+    return keys or _create_key_file(key_file)
+
+
+def rotate_key_file(path, keep=3, mode='rotate'):
+    """轮换密钥文件，只保留最近 keep 个密钥
+
+    rotate：生成新密钥并立即用于签名，适合单节点；
+    stage：新密钥先只用于验证，待所有节点都加载后再 promote 为当前密钥，
+    滚动发布期间新旧节点签发的 cookie 可以互相验证
+    """
+    try:
+        keys = read_key_file(path)
+    except FileNotFoundError:
+        keys = []
+    if mode == 'promote':
+        if len(keys) < 2:
+            raise ValueError("密钥文件中没有待启用的密钥")
+        keys = [keys[1], keys[0]] + keys[2:]
+    elif mode == 'stage':
+        keys = keys[:1] + [new_key()] + keys[1:]
+    else:
+        keys = [new_key()] + keys
+    keys = keys[:max(keep, 2)]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    _write_keys(tmp, keys)
+    os.replace(tmp, path)
+    return keys
+
+
+# ---- 服务端会话存储 ----
+
+class SQLiteSessionBackend:
+    """单机的文件存储，同一台机器上的多个进程共享；用于本地测试与单节点部署"""
+    name = 'sqlite'
+
+    def __init__(self, url, purge_every=1000):
+        self.path = url or 'sessions.sqlite3'
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'sid TEXT PRIMARY KEY, version TEXT NOT NULL, data TEXT NOT NULL, expires REAL NOT NULL)')
+
+    def load(self, sid):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT version, data FROM sessions WHERE sid = ? AND expires > ?', (sid, time.time())).fetchone()
+        return row
+
+    def version(self, sid):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT version FROM sessions WHERE sid = ? AND expires > ?', (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def save(self, sid, version, data, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO sessions (sid, version, data, expires) VALUES (?, ?, ?, ?)',
+                               (sid, version, data, now + ttl))
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._conn.execute('DELETE FROM sessions WHERE expires <= ?', (now,))
+
+    def delete(self, sid):
+        with self._lock:
+            self._conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+
+class RedisSessionBackend:
+    """多节点共享的网络存储，过期由 Redis 按 TTL 清理"""
+    name = 'redis'
+
+    def __init__(self, url, prefix='session:'):
+        import redis  # 可选依赖，只在 SESSION_BACKEND=redis 时需要
+        self.client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.prefix = prefix
+
+    def load(self, sid):
+        value = self.client.get(self.prefix + sid)
+        if value is None:
+            return None
+        version, _, data = value.decode('utf-8').partition('\n')
+        return version, data
+
+    def version(self, sid):
+        # 版本号在值的第一行，只读取开头一段
+        head = self.client.getrange(self.prefix + sid, 0, 63)
+        if not head:
+            return None
+        version, newline, _ = head.decode('utf-8', 'replace').partition('\n')
+        if not newline:
+            stored = self.load(sid)
+            return stored[0] if stored else None
+        return version
+
+    def save(self, sid, version, data, ttl):
+        self.client.set(self.prefix + sid, f'{version}\n{data}'.encode('utf-8'), ex=max(int(ttl), 1))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+BACKENDS = {
+    'sqlite': SQLiteSessionBackend,
+    'redis': RedisSessionBackend,
+}
+
+
+def create_session_backend(name, url):
+    """name 为 sqlite、redis，或 "模块:类名" 形式的自定义存储（构造参数为 url，
+    需提供 load(sid) -> (版本号, 数据) | None、version(sid) -> 版本号 | None、
+    save(sid, 版本号, 数据, ttl)、delete(sid)）"""
+    if ':' in name:
+        module, _, attr = name.partition(':')
+        backend_class = getattr(importlib.import_module(module), attr)
+    elif name in BACKENDS:
+        backend_class = BACKENDS[name]
+    else:
+        raise ValueError(f"未知的会话存储: {name}")
+    return backend_class(url)
+
+
+class SessionCache:
+    """会话id -> (版本号, 序列化后的内容)；保存文本而不是字典，请求修改会话不会改到缓存"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sid, version):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sid)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, sid, version, data):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[sid] = (version, data)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, version=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.version = version
+        # 打开会话时的登录用户，登录或切换账号后保存时更换会话id
+        self.user = self.get('name') if initial else None
+        self.accessed = False
+
+
+class ServerSessionInterface(SessionInterface):
+    salt = 'server-session'
+    serializer = session_json_serializer
+
+    def __init__(self, backend, keys, cache_entries=10000):
+        self.backend = backend
+        self.cache = SessionCache(cache_entries)
+        # itsdangerous 以列表最后一个密钥签名，其余只用于验证
+        self.signer = Signer(list(reversed(keys)), salt=self.salt, digest_method=hashlib.sha256)
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.saves = 0
+
+    def open_session(self, app, request):
+        value = request.cookies.get(self.get_cookie_name(app))
+        if not value:
+            return ServerSession()
+        try:
+            sid, version = self.signer.unsign(value).decode('ascii').split('.', 1)
+        except (BadSignature, ValueError, UnicodeDecodeError):
+            return ServerSession()
+
+        # 以存储中的版本为准：可能比 cookie 新（同一用户的并发请求），旧 cookie 不会
+        # 把会话退回到旧内容；会话已过期或已在其他进程注销时为 None
+        version = self.backend.version(sid)
+        if version is None:
+            self.cache.discard(sid)
+            return ServerSession()
+        data = self.cache.get(sid, version)
+        if data is None:
+            stored = self.backend.load(sid)
+            with self._lock:
+                self.loads += 1
+            if stored is None:
+                return ServerSession()
+            version, data = stored
+            self.cache.put(sid, version, data)
+        return ServerSession(self.serializer.loads(data), sid=sid, version=version)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        cookie = {
+            'domain': self.get_cookie_domain(app),
+            'path': self.get_cookie_path(app),
+            'secure': self.get_cookie_secure(app),
+            'partitioned': self.get_cookie_partitioned(app),
+            'samesite': self.get_cookie_samesite(app),
+            'httponly': self.get_cookie_httponly(app),
+        }
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    self.backend.delete(session.sid)
+                    self.cache.discard(session.sid)
+                response.delete_cookie(name, **cookie)
+                response.vary.add('Cookie')
+            return
+
+        if session.modified:
+            if session.sid is None or session.get('name') != session.user:
+                # 新会话或登录用户变化时换一个会话id，登录前拿到的id随之作废
+                if session.sid:
+                    self.backend.delete(session.sid)
+                    self.cache.discard(session.sid)
+                session.sid = secrets.token_urlsafe(24)
+                session.user = session.get('name')
+            session.version = secrets.token_urlsafe(6)
+            data = self.serializer.dumps(dict(session))
+            self.backend.save(session.sid, session.version, data, app.permanent_session_lifetime.total_seconds())
+            self.cache.put(session.sid, session.version, data)
+            with self._lock:
+                self.saves += 1
+        elif not self.should_set_cookie(app, session):
+            return
+
+        value = self.signer.sign(f'{session.sid}.{session.version}').decode('ascii')
+        response.set_cookie(name, value, expires=self.get_expiration_time(app, session), **cookie)
+        response.vary.add('Cookie')
+
+    def metrics(self):
+        cache = self.cache
+        lookups = cache.hits + cache.misses
+        return {
+            'backend': self.backend.name,
+            'cache_entries': len(cache),
+            'cache_hits': cache.hits,
+            'cache_misses': cache.misses,
+            'cache_hit_ratio': round(cache.hits / lookups, 4) if lookups else 0.0,
+            'loads': self.loads,
+            'saves': self.saves
+        }
+
+
+# ---- 登录检查 ----
+
+def current_user():
+    """当前登录的用户名，未登录时为 None"""
+    return session.get('name')
+
+
+def unauthorized(api):
+    if api:
+        return jsonify({"success": False, "error": "未登录"}), 401
+    return render_template('login.html')
+
+
+def require_login():
+    """接口蓝图的 before_request：未登录时返回 401"""
+    if current_user() is None:
+        return unauthorized(api=True)
+    return None
+
+
+def require_admin():
+    """运行指标与分析接口：只有 ADMIN_USERS 中的用户可以访问"""
+    denied = require_login()
+    if denied:
+        return denied
+    if current_user() not in current_app.config.get('ADMIN_USERS', ()):
+        return jsonify({"success": False, "error": "没有权限"}), 403
+    return None
+
+
+def login_required(view=None, *, api=False):
+    """未登录时页面返回登录页，api=True 的接口返回 401 JSON"""
+    if view is None:
+        return lambda view: login_required(view, api=api)
+
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if current_user() is None:
+            return unauthorized(api)
+        return view(*args, **kwargs)
+
+    return guarded
@@ -0,0 +1,131 @@
+"""历史茶区索引
+
+historical_tea_areas.json 每个数据版本只建一次索引：按朝代、(朝代, 产区) 建立字典，
+产区同时按古称和今名归类，便于查询同一产区在各朝代的变化。地图坐标与茶类的
+关联、朝代图层、产区沿革和朝代对比都直接由索引回答。
+"""
+from collections import defaultdict
+
+
+class TeaAreaIndex:
+    def __init__(self, data):
+        self.dynasty_names = []
+        self.dynasties = {}
+        # (朝代, 产区) -> 产区信息
+        self.areas = {}
+        # 朝代 -> 产区名列表（保持文件中的顺序）
+        self.regions_by_dynasty = {}
+        # 产区古称或今名 -> [(朝代, 产区)]，按朝代先后排列
+        self.by_region = defaultdict(list)
+        # (朝代, 产区) -> 地图坐标 [经度, 纬度, 重要程度]
+        self.coordinates = {}
+        # 朝代 -> 地图散点的产区名列表
+        self.points_by_dynasty = {}
+
+        for dynasty in data.get('dynasties', []):
+            name = dynasty['name']
+            self.dynasty_names.append(name)
+            self.dynasties[name] = {k: v for k, v in dynasty.items() if k != 'tea_areas'}
+            regions = []
+            for area in dynasty.get('tea_areas', []):
+                key = (name, area['region'])
+                self.areas[key] = area
+                regions.append(area['region'])
+                self.by_region[area['region']].append(key)
+                modern_name = area.get('modern_name')
+                if modern_name and modern_name != area['region']:
+                    self.by_region[modern_name].append(key)
+            self.regions_by_dynasty[name] = regions
+
+        map_coordinates = data.get('visualization_data', {}).get('map_coordinates', {})
+        for name, points in map_coordinates.items():
+            self.points_by_dynasty[name] = [point['name'] for point in points]
+            for point in points:
+                self.coordinates[(name, point['name'])] = point['value']
+
+    def map_points(self, dynasty):
+        """某朝代的地图散点，附带该产区的茶类"""
+        points = []
+        for region in self.points_by_dynasty.get(dynasty, []):
+            point = {'name': region, 'value': self.coordinates[(dynasty, region)]}
+            area = self.areas.get((dynasty, region))
+            if area is not None:
+                point['tea_types'] = '、'.join(area['tea_types'])
+            points.append(point)
+        return points
+
+    def map_coordinates(self):
+        """全部朝代的地图散点，结构与原始文件的 map_coordinates 一致"""
+        return {name: self.map_points(name) for name in self.points_by_dynasty}
+
+    def summary(self):
+        return [
+            {**self.dynasties[name], 'area_count': len(self.regions_by_dynasty[name])}
+            for name in self.dynasty_names
+        ]
+
+    def layer(self, dynasty):
+        """一个朝代的图层：朝代概况、产区列表与地图散点；朝代不存在时返回None"""
+        if dynasty not in self.dynasties:
+            return None
+        areas = []
+        for region in self.regions_by_dynasty[dynasty]:
+            area = dict(self.areas[(dynasty, region)])
+            area['coordinate'] = self.coordinates.get((dynasty, region))
+            areas.append(area)
+        return {
+            'dynasty': self.dynasties[dynasty],
+            'areas': areas,
+            'points': self.map_points(dynasty)
+        }
+
+    def region_history(self, region):
+        """产区（古称或今名）在各朝代的记录；没有记录时返回空列表"""
+        return [
+            {
+                'dynasty': name,
+                'period': self.dynasties[name].get('period'),
+                'coordinate': self.coordinates.get((name, area_region)),
+                **self.areas[(name, area_region)]
+            }
+            for name, area_region in self.by_region.get(region, [])
+        ]
+
+    def tea_types(self, dynasty):
+        types = {}
+        for region in self.regions_by_dynasty[dynasty]:
+            types.update(dict.fromkeys(self.areas[(dynasty, region)]['tea_types']))
+        return list(types)
+
+    def diff(self, base, target):
+        """对比两个朝代的产区与茶类；任一朝代不存在时返回None"""
+        if base not in self.dynasties or target not in self.dynasties:
+            return None
+        base_regions = self.regions_by_dynasty[base]
+        target_regions = self.regions_by_dynasty[target]
+        base_types = self.tea_types(base)
+        target_types = self.tea_types(target)
+        base_type_set, target_type_set = set(base_types), set(target_types)
+
+        changed = []
+        for region in target_regions:
+            before = self.areas.get((base, region))
+            if before is None:
+                continue
+            after = self.areas[(target, region)]
+            if before.get('importance') != after.get('importance') or before['tea_types'] != after['tea_types']:
+                changed.append({
+                    'region': region,
+                    'importance': [before.get('importance'), after.get('importance')],
+                    'tea_types': [before['tea_types'], after['tea_types']]
+                })
+
+        return {
+            'from': base,
+            'to': target,
+            'added_regions': [r for r in target_regions if (base, r) not in self.areas],
+            'removed_regions': [r for r in base_regions if (target, r) not in self.areas],
+            'changed_regions': changed,
+            'added_tea_types': [t for t in target_types if t not in base_type_set],
+            'removed_tea_types': [t for t in base_types if t not in target_type_set]
+        }
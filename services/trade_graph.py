@@ -0,0 +1,214 @@
+"""茶马古道贸易网络
+
+tea_routes.json 每个数据版本只建一次有向图：节点编号、每条贸易记录一条边，
+按节点建出入边邻接表，按时代把边分区，并预先汇总各时代每个节点的
+流入/流出量。子图、最短路径（按经过的路段数）与最大流（以贸易量为容量，
+Edmonds-Karp，并分解为若干条路径）都只在对应时代的边上计算。
+"""
+from collections import deque
+
+ALL_ERAS = None
+
+
+class TradeGraph:
+    def __init__(self, data):
+        self.names = []
+        self.ids = {}
+        for node in data.get('nodes', []):
+            self._node(node['name'])
+
+        # 边按列保存：起点、终点、贸易量、时代、出处
+        self.sources = []
+        self.targets = []
+        self.values = []
+        self.edge_eras = []
+        self.records = []
+        self.eras = []
+        # 时代 -> 边编号列表；ALL_ERAS 对应全部边
+        self.edges_by_era = {ALL_ERAS: []}
+        for link in data.get('links', []):
+            source, target = self._node(link['source']), self._node(link['target'])
+            era = link.get('era') or '未知'
+            edge = len(self.sources)
+            self.sources.append(source)
+            self.targets.append(target)
+            self.values.append(float(link.get('value') or 0))
+            self.edge_eras.append(era)
+            self.records.append(link.get('record'))
+            if era not in self.edges_by_era:
+                self.eras.append(era)
+                self.edges_by_era[era] = []
+            self.edges_by_era[era].append(edge)
+            self.edges_by_era[ALL_ERAS].append(edge)
+
+        # 节点 -> 出边/入边编号
+        self.out_edges = [[] for _ in self.names]
+        self.in_edges = [[] for _ in self.names]
+        for edge, (source, target) in enumerate(zip(self.sources, self.targets)):
+            self.out_edges[source].append(edge)
+            self.in_edges[target].append(edge)
+
+        # 时代 -> 各节点 [流入量, 流出量]
+        self.flows = {}
+        for era, edges in self.edges_by_era.items():
+            totals = [[0.0, 0.0] for _ in self.names]
+            for edge in edges:
+                totals[self.targets[edge]][0] += self.values[edge]
+                totals[self.sources[edge]][1] += self.values[edge]
+            self.flows[era] = totals
+
+    def _node(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def has_era(self, era):
+        return era in self.edges_by_era
+
+    def _link(self, edge):
+        return {
+            'source': self.names[self.sources[edge]],
+            'target': self.names[self.targets[edge]],
+            'value': self.values[edge],
+            'era': self.edge_eras[edge],
+            'record': self.records[edge]
+        }
+
+    def era_summary(self):
+        return [
+            {
+                'era': era,
+                'links': len(self.edges_by_era[era]),
+                'volume': sum(self.values[edge] for edge in self.edges_by_era[era])
+            }
+            for era in self.eras
+        ]
+
+    def node_flows(self, era=ALL_ERAS):
+        """各节点在该时代的流入、流出与净流量，按总量从大到小排列"""
+        result = [
+            {'name': name, 'inbound': inbound, 'outbound': outbound, 'net': inbound - outbound}
+            for name, (inbound, outbound) in zip(self.names, self.flows[era])
+            if inbound or outbound
+        ]
+        result.sort(key=lambda item: item['inbound'] + item['outbound'], reverse=True)
+        return result
+
+    def subgraph(self, era=ALL_ERAS, node=None):
+        """该时代的边及其涉及的节点；给出 node 时只保留与它直接相连的边"""
+        edges = self.edges_by_era[era]
+        if node is not None:
+            node_id = self.ids[node]
+            wanted = set(edges)
+            edges = [edge for edge in self.out_edges[node_id] + self.in_edges[node_id] if edge in wanted]
+            edges.sort()
+        touched = sorted({self.sources[edge] for edge in edges} | {self.targets[edge] for edge in edges})
+        flows = self.flows[era]
+        return {
+            'nodes': [
+                {'name': self.names[i], 'inbound': flows[i][0], 'outbound': flows[i][1]}
+                for i in touched
+            ],
+            'links': [self._link(edge) for edge in edges]
+        }
+
+    def _era_filter(self, era):
+        if era is ALL_ERAS:
+            return lambda edge: True
+        return lambda edge: self.edge_eras[edge] == era
+
+    def shortest_path(self, source, target, era=ALL_ERAS):
+        """经过路段最少的贸易路径（有向），不可达时返回None"""
+        start, goal = self.ids[source], self.ids[target]
+        allowed = self._era_filter(era)
+        previous = {start: None}
+        queue = deque([start])
+        while queue and goal not in previous:
+            node = queue.popleft()
+            for edge in self.out_edges[node]:
+                nxt = self.targets[edge]
+                if nxt not in previous and allowed(edge):
+                    previous[nxt] = edge
+                    queue.append(nxt)
+        if goal not in previous:
+            return None
+        edges = []
+        node = goal
+        while previous[node] is not None:
+            edge = previous[node]
+            edges.append(edge)
+            node = self.sources[edge]
+        edges.reverse()
+        return {
+            'path': [source] + [self.names[self.targets[edge]] for edge in edges],
+            'links': [self._link(edge) for edge in edges],
+            'bottleneck': min(self.values[edge] for edge in edges) if edges else 0
+        }
+
+    def max_flow(self, source, target, era=ALL_ERAS):
+        """以贸易量为容量的最大流，返回总流量与分解出的各条路径"""
+        start, goal = self.ids[source], self.ids[target]
+        # 同向的多条记录合并容量
+        capacity = {}
+        for edge in self.edges_by_era[era]:
+            key = (self.sources[edge], self.targets[edge])
+            capacity[key] = capacity.get(key, 0.0) + self.values[edge]
+        neighbours = {}
+        for u, v in capacity:
+            neighbours.setdefault(u, set()).add(v)
+            neighbours.setdefault(v, set()).add(u)
+        # 反向残量用负流量表示：残量 = 容量 - 流量
+        flow = {}
+        total = 0.0
+        if start != goal:
+            while True:
+                # BFS 找最短增广路
+                previous = {start: None}
+                queue = deque([start])
+                while queue and goal not in previous:
+                    u = queue.popleft()
+                    for v in neighbours.get(u, ()):
+                        if v not in previous and capacity.get((u, v), 0.0) - flow.get((u, v), 0.0) > 1e-9:
+                            previous[v] = u
+                            queue.append(v)
+                if goal not in previous:
+                    break
+                path = []
+                v = goal
+                while previous[v] is not None:
+                    path.append((previous[v], v))
+                    v = previous[v]
+                amount = min(capacity.get(edge, 0.0) - flow.get(edge, 0.0) for edge in path)
+                for u, v in path:
+                    flow[(u, v)] = flow.get((u, v), 0.0) + amount
+                    flow[(v, u)] = flow.get((v, u), 0.0) - amount
+                total += amount
+
+        return {'value': total, 'paths': self._decompose(start, goal, flow, capacity)}
+
+    def _decompose(self, start, goal, flow, capacity):
+        """把最大流分解为若干条从起点到终点的路径"""
+        remaining = {edge: amount for edge, amount in flow.items() if amount > 1e-9 and edge in capacity}
+        paths = []
+        while True:
+            previous = {start: None}
+            queue = deque([start])
+            while queue and goal not in previous:
+                u = queue.popleft()
+                for (a, b), amount in remaining.items():
+                    if a == u and b not in previous and amount > 1e-9:
+                        previous[b] = a
+                        queue.append(b)
+            if goal not in previous:
+                return paths
+            hops = []
+            v = goal
+            while previous[v] is not None:
+                hops.append((previous[v], v))
+                v = previous[v]
+            hops.reverse()
+            amount = min(remaining[hop] for hop in hops)
+            for hop in hops:
+                remaining[hop] -= amount
+            paths.append({'path': [self.names[start]] + [self.names[b] for _, b in hops], 'flow': amount})